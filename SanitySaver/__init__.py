@@ -4,12 +4,14 @@ from typing import Any, ClassVar, Dict
 
 from Mods.ModMenu import EnabledSaveType, Mods, ModTypes, Options, RegisterMod, SDKMod
 
-from .compression_handler import update_compression
+from .compression_handler import (COMPRESSED_FORMATS, FORMAT_GZIP, update_compression,
+                                  update_journaling)
 from .console import disable_console_commands, enable_console_commands
-from .helpers import cached_obj_find
+from .helpers import clear_obj_cache
 from .hooks import AllHooks, update_vendor_rerolling
 from .migrations import migrate_all
-from .save_manager import SAVE_VERSION
+from .save_manager import SAVE_VERSION, update_indexing
+from .save_writer import flush_save_writes
 
 
 class SanitySaver(SDKMod):
@@ -19,7 +21,7 @@ class SanitySaver(SDKMod):
         "Disables sanity check, and also saves items which don't serialize, which would have parts"
         " deleted even with it off."
     )
-    Version: str = f"{SAVE_VERSION}.3"
+    Version: str = f"{SAVE_VERSION}.4"
 
     Types: ModTypes = ModTypes.Utility
     SaveEnabledState: EnabledSaveType = EnabledSaveType.LoadWithSettings
@@ -32,6 +34,9 @@ class SanitySaver(SDKMod):
     }
 
     CompressOption: Options.Boolean
+    FormatOption: Options.Spinner
+    JournalOption: Options.Boolean
+    IndexOption: Options.Boolean
     VendorsOption: Options.Boolean
 
     def __init__(self) -> None:
@@ -41,6 +46,30 @@ class SanitySaver(SDKMod):
                 " you may want to turn this off to make doing so easier."
             ), True
         )
+        self.FormatOption = Options.Spinner(
+            "Compression Format", (
+                "How to compress saves. Dictionary uses a dictionary tuned for Sanity Saver's"
+                " saves, roughly halving the size of saves with only a few items, like most banks."
+                " Binary uses a custom format which saves about four times faster than Gzip, and"
+                " loads in a bit over half the time (about as fast as uncompressed saves), but"
+                " makes files about 1.7 times larger. Only Gzip can be opened with normal tools"
+                " like 7zip, use the mod's save tool to convert the others."
+            ), FORMAT_GZIP, COMPRESSED_FORMATS
+        )
+        self.JournalOption = Options.Boolean(
+            "Journal Saves", (
+                "Instead of rewriting the whole save every time an item changes, only write the"
+                " changed items, to a separate journal file. Speeds up saving on characters with a"
+                " lot of items, but makes save editing harder."
+            ), False
+        )
+        self.IndexOption = Options.Boolean(
+            "Index Saves", (
+                "Keep a database of the items across all your saves, including their balances and"
+                " parts, which can be searched with the SanitySaverIndex console command. Requires"
+                " sqlite3."
+            ), False
+        )
         self.VendorsOption = Options.Boolean(
             "Reroll Vendors on Level Transitions", (
                 "Vendors containing unserializable items will get broken if you switch levels."
@@ -48,14 +77,22 @@ class SanitySaver(SDKMod):
                 " such items."
             ), False
         )
-        self.Options = [self.CompressOption, self.VendorsOption]
+        self.Options = [
+            self.CompressOption,
+            self.FormatOption,
+            self.JournalOption,
+            self.IndexOption,
+            self.VendorsOption
+        ]
 
     def Enable(self) -> None:
-        cached_obj_find.cache_clear()
-        update_compression(self.CompressOption.CurrentValue)
+        clear_obj_cache()
+        update_compression(self.CompressOption.CurrentValue, self.FormatOption.CurrentValue)
+        update_journaling(self.JournalOption.CurrentValue)
         update_vendor_rerolling(self.VendorsOption.CurrentValue)
 
         migrate_all()
+        update_indexing(self.IndexOption.CurrentValue)
 
         enable_console_commands()
         for func, hook in AllHooks.items():
@@ -65,16 +102,23 @@ class SanitySaver(SDKMod):
         disable_console_commands()
         for func in AllHooks.keys():
             unrealsdk.RemoveHook(func, self.Name)
+        flush_save_writes()
 
     def SettingsInputPressed(self, action: str) -> None:
         if action == self.CLEAR_CACHE:
-            cached_obj_find.cache_clear()
+            clear_obj_cache()
         else:
             super().SettingsInputPressed(action)
 
     def ModOptionChanged(self, option: Options.Base, new_value: Any) -> None:
         if option == self.CompressOption:
-            update_compression(new_value)
+            update_compression(new_value, self.FormatOption.CurrentValue)
+        elif option == self.FormatOption:
+            update_compression(self.CompressOption.CurrentValue, new_value)
+        elif option == self.JournalOption:
+            update_journaling(new_value)
+        elif option == self.IndexOption:
+            update_indexing(new_value)
         elif option == self.VendorsOption:
             update_vendor_rerolling(new_value)
 
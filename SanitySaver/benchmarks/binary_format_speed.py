@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+import gzip
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import binary_format  # noqa: E402
+import dict_compression  # noqa: E402
+import synthetic_saves  # noqa: E402
+
+"""
+Compares how long it takes to save and load a large save, and how big it ends up, in each of the
+formats `compression_handler` can write.
+
+Saving includes converting the items to json, and loading includes parsing it, since the binary
+format skips json entirely. Neither includes the actual disk io, which is the same for all of them
+given the same size.
+"""
+
+SAVE_SIZE = 10_000
+REPEATS = 10
+
+# Things save editing might leave behind, which need to survive a round trip
+ODD_ITEMS: Dict[int, Any] = {
+    1: {"BalanceDefinition": 5, "GameStage": "80", "SomeNewField": [1, 2]},
+    2: {"_description": None, "_inital": False, "ManufacturerGradeIndex": 1 << 40},
+    3: {"ItemDefinition": "Null\0Byte", "WeaponTypeDefinition": "Both.Layouts"},
+    4: {"_inital": 1, "GameStage": True, "TitleItemNamePartDefinition": "\ud800"},
+    5: {},
+    6: "not an item",
+}
+ODD_KEYS: Dict[str, Any] = {
+    "99999999999": {"ItemDefinition": "Too.Big"},
+    "not a number": {"ItemDefinition": "Bad.Key"},
+}
+
+
+def json_roundtrip(data: Any) -> Any:
+    return json.loads(json.dumps(data))
+
+
+def check_lossless(save: Dict[str, Any]) -> None:
+    assert json_roundtrip(binary_format.decode(binary_format.encode(save))) == json_roundtrip(save)
+
+
+def dumps(save: Dict[str, Any], compress: bool) -> bytes:
+    # Mirrors `compression_handler._serialize`, which can't be imported without the sdk
+    return json.dumps(
+        save,
+        indent=None if compress else 4,
+        separators=(",", ":" if compress else ": ")
+    ).encode("utf8")
+
+
+FORMATS: Dict[str, Any] = {
+    "json": (
+        lambda save: dumps(save, False),
+        json.loads,
+    ),
+    "gzip": (
+        lambda save: gzip.compress(dumps(save, True)),
+        lambda data: json.loads(gzip.decompress(data)),
+    ),
+    "dictionary": (
+        lambda save: dict_compression.compress(dumps(save, True)),
+        lambda data: json.loads(dict_compression.decompress(data)),
+    ),
+    "binary": (
+        binary_format.encode,
+        binary_format.decode,
+    ),
+}
+
+
+def bench(func: Callable[[], Any]) -> float:
+    times: List[float] = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main() -> None:
+    random.seed(0)
+    save = synthetic_saves.make_save(SAVE_SIZE)
+
+    check_lossless(save)
+    odd_save = {"save_version": 2, "extra_key": [None], "items": {**ODD_ITEMS, **ODD_KEYS}}
+    check_lossless(odd_save)
+
+    print(f"{SAVE_SIZE:,} items:")
+    print(f"{'format':<12} {'size':>12} {'save':>10} {'load':>10}")
+    for name, (encode, decode) in FORMATS.items():
+        encoded = encode(save)
+        assert json_roundtrip(decode(encoded)) == json_roundtrip(save)
+
+        print(
+            f"{name:<12} {len(encoded):>12,}"
+            f" {bench(lambda: encode(save)):>8.2f}ms"
+            f" {bench(lambda: decode(encoded)):>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
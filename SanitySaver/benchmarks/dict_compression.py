@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+import gzip
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import dict_compression  # noqa: E402
+import synthetic_saves  # noqa: E402
+
+"""
+Compares the size and speed of gzip, and zlib with our preset dictionary, on saves of a few
+different sizes.
+
+The saves are made up, but shaped like real ones, using real paths from vendor_edit's lists. Those
+lists are also what the dictionary was trained on, so these results are a little optimistic for
+saves with a lot of modded parts.
+"""
+
+SAVE_SIZES = (1, 10, 100, 1_000, 10_000)
+# Aim for roughly the same amount of data per size
+TOTAL_ITEMS = 20_000
+
+
+def make_save(size: int) -> bytes:
+    # Same format as `compression_handler` uses for compressed saves
+    return json.dumps(synthetic_saves.make_save(size), separators=(",", ":")).encode("utf8")
+
+
+def bench(func: Callable[[bytes], bytes], inputs: List[bytes]) -> float:
+    start = time.perf_counter()
+    for data in inputs:
+        func(data)
+    return (time.perf_counter() - start) / len(inputs) * 1000
+
+
+def main() -> None:
+    random.seed(0)
+
+    print(
+        f"{'items':>7} {'json':>10} {'gzip':>10} {'dict':>10} {'ratio':>7}"
+        f" {'gzip enc':>9} {'dict enc':>9} {'gzip dec':>9} {'dict dec':>9}"
+    )
+    for size in SAVE_SIZES:
+        saves = [make_save(size) for _ in range(max(1, TOTAL_ITEMS // size))]
+        gzipped = [gzip.compress(save) for save in saves]
+        dict_compressed = [dict_compression.compress(save) for save in saves]
+
+        for save, gz, dc in zip(saves, gzipped, dict_compressed):
+            assert gzip.decompress(gz) == save
+            assert dict_compression.decompress(dc) == save
+
+        json_size = sum(map(len, saves)) // len(saves)
+        gzip_size = sum(map(len, gzipped)) // len(saves)
+        dict_size = sum(map(len, dict_compressed)) // len(saves)
+
+        print(
+            f"{size:>7,} {json_size:>10,} {gzip_size:>10,} {dict_size:>10,}"
+            f" {dict_size / gzip_size:>7.1%}"
+            f" {bench(gzip.compress, saves):>7.3f}ms"
+            f" {bench(dict_compression.compress, saves):>7.3f}ms"
+            f" {bench(gzip.decompress, gzipped):>7.3f}ms"
+            f" {bench(dict_compression.decompress, dict_compressed):>7.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+import random
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+"""
+Packs a fake 1000 item inventory, to compare how many path name lookups we do with and without the
+path name cache, and with memoized packing.
+
+The fake `PathName` is a lot cheaper than the real one, which has to go through the sdk and build
+the name from the object's outers, so the times here understate the difference - the call counts
+are what matter.
+"""
+
+ITEM_COUNT = 1000
+PART_COUNT = 300
+REPEATS = 20
+
+# ==================================================================================================
+# Stand-in sdk. `helpers.py` only needs a few names to import, and the objects only need `PathName`.
+
+path_name_calls = 0
+
+
+class FakeObject:
+    def __init__(self, path_name: str) -> None:
+        self.path_name = path_name
+
+    def PathName(self, obj: "FakeObject") -> str:
+        global path_name_calls
+        path_name_calls += 1
+        return obj.path_name
+
+
+fake_unrealsdk = types.ModuleType("unrealsdk")
+fake_unrealsdk.UObject = FakeObject  # type: ignore
+fake_unrealsdk.UFunction = object  # type: ignore
+fake_unrealsdk.FStruct = object  # type: ignore
+fake_unrealsdk.Log = print  # type: ignore
+fake_unrealsdk.KeepAlive = lambda obj: None  # type: ignore
+sys.modules["unrealsdk"] = fake_unrealsdk
+
+import helpers  # noqa: E402
+
+
+class FakeDefData:
+    def __init__(self, parts: List[Optional[FakeObject]], unique_id: int) -> None:
+        (
+            self.ItemDefinition,
+            self.BalanceDefinition,
+            self.ManufacturerDefinition,
+            self.AlphaItemPartDefinition,
+            self.BetaItemPartDefinition,
+            self.GammaItemPartDefinition,
+            self.DeltaItemPartDefinition,
+            self.EpsilonItemPartDefinition,
+            self.ZetaItemPartDefinition,
+            self.EtaItemPartDefinition,
+            self.ThetaItemPartDefinition,
+            self.MaterialItemPartDefinition,
+            self.PrefixItemNamePartDefinition,
+            self.TitleItemNamePartDefinition,
+        ) = parts
+        self.ManufacturerGradeIndex = 80
+        self.GameStage = 80
+        self.UniqueId = unique_id
+
+
+# ==================================================================================================
+
+def make_inventory() -> List[FakeDefData]:
+    random.seed(0)
+    parts = [FakeObject(f"GD_Fake.Parts.Part_{i}") for i in range(PART_COUNT)]
+
+    inventory = []
+    for unique_id in range(ITEM_COUNT):
+        item_parts: List[Optional[FakeObject]] = [random.choice(parts) for _ in range(14)]
+        # Not every slot is filled
+        for idx in random.sample(range(3, 14), 3):
+            item_parts[idx] = None
+        inventory.append(FakeDefData(item_parts, unique_id))
+    return inventory
+
+
+def bench(
+    name: str,
+    inventory: List[FakeDefData],
+    before_each: Callable[[], Any],
+    pack: Callable[[FakeDefData], Any] = helpers.pack_item_definition_data
+) -> None:
+    global path_name_calls
+    path_name_calls = 0
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        before_each()
+        for def_data in inventory:
+            pack(def_data)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<28} {elapsed / REPEATS * 1000:>8.2f} ms/inventory"
+        f" {path_name_calls // REPEATS:>8,} PathName calls/inventory"
+    )
+
+
+def main() -> None:
+    inventory = make_inventory()
+
+    original_safe_pathname = helpers.safe_pathname
+    helpers.safe_pathname = lambda obj: None if obj is None else obj.PathName(obj)
+    bench("uncached", inventory, lambda: None)
+    helpers.safe_pathname = original_safe_pathname
+
+    # Simulate a map change before each save, which is the worst case
+    bench("cached, cold", inventory, helpers.invalidate_obj_cache)
+    bench("cached, warm", inventory, lambda: None)
+
+    def pack_memoized(def_data: FakeDefData) -> Any:
+        return helpers.pack_definition_data(def_data, False)
+
+    # Change a few items each time, so not everything gets reused
+    def change_items() -> None:
+        for def_data in random.sample(inventory, ITEM_COUNT // 20):
+            def_data.GameStage += 1
+        helpers.end_pack_memo_save()
+
+    bench("memoized, cold", inventory, helpers.clear_obj_cache, pack_memoized)
+    # The memo survives map changes, only the path names need to be looked up again
+    bench("memoized, map change", inventory, helpers.invalidate_obj_cache, pack_memoized)
+    bench("memoized, 5% changed", inventory, change_items, pack_memoized)
+    helpers.end_pack_memo_save()
+
+    # Make sure the cache didn't mix anything up
+    for def_data in inventory:
+        packed = helpers.pack_item_definition_data(def_data)
+        for key, val in vars(def_data).items():
+            assert packed[key] == (val.path_name if isinstance(val, FakeObject) else val)
+
+    # Make sure the memo didn't either
+    for def_data in inventory:
+        packed = helpers.pack_definition_data(def_data, False)
+        for key, val in vars(def_data).items():
+            assert packed[key] == (val.path_name if isinstance(val, FakeObject) else val)
+
+    print(helpers.path_name_cache_info())
+    print(helpers.pack_memo_info())
+
+
+if __name__ == "__main__":
+    main()
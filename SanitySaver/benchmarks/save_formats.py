@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from journal import JournalRecord, append_journal, apply_journal, read_journal  # noqa: E402
+
+"""
+Compares how long it takes to record a handful of changed items, by rewriting the whole save, vs by
+appending them to a journal, for a few different save sizes.
+"""
+
+SAVE_SIZES = (100, 1_000, 10_000)
+CHANGES_PER_WRITE = 5
+REPEATS = 20
+
+ItemDataDict = Dict[int, Dict[str, Any]]
+
+
+def make_item(unique_id: int) -> Dict[str, Any]:
+    return {
+        "_description": f"Level {random.randint(1, 80)} Rare Fabled Tortoise",
+        "BalanceDefinition": "GD_Shields.A_Item.Shield_Juggernaut",
+        "BetaItemPartDefinition": f"GD_Shields.Body.Body_Anshin_{unique_id % 7}",
+        "GameStage": random.randint(1, 80),
+    }
+
+
+def write_full(items: ItemDataDict, path: Path, compress: bool) -> int:
+    # Mirrors `compression_handler.write_atomic`, which can't be imported without the sdk
+    encoded = json.dumps(
+        {"save_version": 2, "items": items},
+        indent=None if compress else 4,
+        separators=(",", ":" if compress else ": ")
+    ).encode("utf8")
+    if compress:
+        encoded = gzip.compress(encoded)
+
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "wb") as file:
+        file.write(encoded)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+    return len(encoded)
+
+
+def snapshot_signature(path: Path) -> Any:
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def random_changes(items: ItemDataDict) -> List[JournalRecord]:
+    records: List[JournalRecord] = []
+    for _ in range(CHANGES_PER_WRITE):
+        unique_id = random.randrange(len(items) * 2)
+        if random.random() < 0.2:
+            records.append((unique_id, None))
+        else:
+            records.append((unique_id, make_item(unique_id)))
+    return records
+
+
+def bench(name: str, func: Callable[[], int]) -> None:
+    start = time.perf_counter()
+    total_bytes = 0
+    for _ in range(REPEATS):
+        total_bytes += func()
+    elapsed = time.perf_counter() - start
+    print(f"    {name:<16} {elapsed / REPEATS * 1000:>8.2f} ms/write {total_bytes // REPEATS:>10,} B")
+
+
+def run(size: int, save_dir: Path) -> None:
+    items = {unique_id: make_item(unique_id) for unique_id in range(size)}
+    print(f"{size:,} items, {CHANGES_PER_WRITE} changes per write:")
+
+    for compress in (True, False):
+        path = save_dir / ("save.json.gz" if compress else "save.json")
+
+        def full() -> int:
+            apply_journal(items, random_changes(items))
+            return write_full(items, path, compress)
+
+        bench("gzip rewrite" if compress else "json rewrite", full)
+
+    # Journals apply on top of a snapshot, the same way they do in game
+    snapshot_path = save_dir / "save.json.gz"
+    journal_path = save_dir / "save.json.journal"
+    write_full(items, snapshot_path, True)
+    snapshot = snapshot_signature(snapshot_path)
+    expected = dict(items)
+
+    def journal() -> int:
+        records = random_changes(expected)
+        apply_journal(expected, records)
+        return append_journal(journal_path, snapshot, records)
+
+    bench("journal append", journal)
+
+    # Make sure replaying the journal gets back the exact same state
+    replayed = json.loads(gzip.decompress(snapshot_path.read_bytes()))["items"]
+    replayed = {int(unique_id): data for unique_id, data in replayed.items()}
+    records = read_journal(journal_path, snapshot)
+    assert records is not None
+    apply_journal(replayed, records)
+    assert replayed == expected
+
+    journal_path.unlink()
+
+
+def main() -> None:
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as save_dir:
+        for size in SAVE_SIZES:
+            run(size, Path(save_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+"""
+Makes up saves for the benchmarks to use. They're shaped like real ones, using real paths from
+vendor_edit's lists.
+"""
+
+PATHS_DIR = Path(__file__).parent.parent.parent / "vendor_edit" / "zdict_experiments"
+
+ITEM_SLOTS = (
+    "AlphaItemPartDefinition",
+    "BetaItemPartDefinition",
+    "GammaItemPartDefinition",
+    "DeltaItemPartDefinition",
+    "EpsilonItemPartDefinition",
+    "ZetaItemPartDefinition",
+    "EtaItemPartDefinition",
+    "ThetaItemPartDefinition",
+    "MaterialItemPartDefinition",
+    "PrefixItemNamePartDefinition",
+    "TitleItemNamePartDefinition",
+)
+WEAPON_SLOTS = (
+    "BodyPartDefinition",
+    "GripPartDefinition",
+    "BarrelPartDefinition",
+    "SightPartDefinition",
+    "StockPartDefinition",
+    "ElementalPartDefinition",
+    "Accessory1PartDefinition",
+    "Accessory2PartDefinition",
+    "MaterialPartDefinition",
+    "PrefixPartDefinition",
+    "TitlePartDefinition",
+)
+
+
+def load_paths(name: str) -> Dict[str, List[str]]:
+    """ Loads one of the path lists, grouped by package. """
+    by_package: Dict[str, List[str]] = {}
+    for path in (PATHS_DIR / name).read_text().splitlines():
+        by_package.setdefault(path.split(".")[0], []).append(path)
+    return by_package
+
+
+BALANCES = load_paths("unique_balances.txt")
+DEFINITIONS = load_paths("unique_definitions.txt")
+MANUFACTURERS = [path for paths in load_paths("unique_manufacturers.txt").values() for path in paths]
+PARTS = load_paths("unique_parts.txt")
+PART_PACKAGES = sorted(PARTS)
+
+
+def make_item() -> Dict[str, Any]:
+    """ Makes a random item, shaped like a real one. """
+    is_weapon = random.random() < 0.6
+    slots = WEAPON_SLOTS if is_weapon else ITEM_SLOTS
+    # Parts on the same item normally come from the same package
+    package = random.choice(PART_PACKAGES)
+    parts = PARTS[package]
+
+    item: Dict[str, Any] = {"_description": f"Level {random.randint(1, 80)} {package.split('_')[-1]}"}
+
+    # Most items have been loaded before, so only store the few parts which need replacing
+    if random.random() < 0.3:
+        item["_inital"] = True
+        item["WeaponTypeDefinition" if is_weapon else "ItemDefinition"] = random.choice(
+            DEFINITIONS.get(package) or random.choice(list(DEFINITIONS.values()))
+        )
+        item["BalanceDefinition"] = random.choice(
+            BALANCES.get(package) or random.choice(list(BALANCES.values()))
+        )
+        item["ManufacturerDefinition"] = random.choice(MANUFACTURERS)
+        item["ManufacturerGradeIndex"] = random.randint(1, 80)
+        for slot in slots:
+            item[slot] = random.choice(parts) if random.random() < 0.8 else None
+        item["GameStage"] = item["ManufacturerGradeIndex"]
+    else:
+        for slot in random.sample(slots, random.randint(1, 3)):
+            item[slot] = random.choice(parts)
+
+    return item
+
+
+def make_save(size: int) -> Dict[str, Any]:
+    """ Makes a save with the given amount of items. """
+    return {
+        "save_version": 2,
+        "items": {random.randrange(-0x80000000, 0x80000000): make_item() for _ in range(size)},
+    }
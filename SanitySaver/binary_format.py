@@ -0,0 +1,349 @@
+import io
+import json
+import struct
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+"""
+A compact binary encoding for saves.
+
+Most of the time spent loading and saving large saves goes into parsing and emitting json, and then
+gzip. Items are almost entirely made up of the same few hundred paths though, so rather than writing
+each one out in full every time, this stores every string once in a table, and then writes each item
+as a fixed size record of indexes into it. This is both a lot smaller than plain json, and a lot
+quicker to create and read than gzip, since there's nothing to compress.
+
+The file layout is:
+- The magic header, including the format version.
+- The header struct: the size of the string table, how many records there are, and the index of the
+  "document" string.
+- The string table, all strings encoded as utf8, separated by null bytes.
+- The records.
+
+String indexes start at 2 - 0 means the field isn't set, and 1 means it's null. Weapons and items
+use different records, but they're both the same size, so can be stored in a single block.
+
+This is lossless - decoding a file gives back exactly the same json data that was encoded, just with
+int item keys. Anything which doesn't fit into a record (e.g. extra fields, or values of the wrong
+type, from save editing) gets stored as json in the record's extras string. Any items which don't
+fit at all, and any top level keys other than the items, get stored in the document string, which is
+the json of the full save, minus all the items which were stored as records.
+
+This module doesn't depend on the sdk, so that it can be used offline.
+"""
+
+MAGIC: bytes = b"SSB"
+FORMAT_VERSION: int = 1
+HEADER_SIZE: int = len(MAGIC) + 1
+
+ITEMS_KEY: str = "items"
+
+_HEADER = struct.Struct("<III")
+# unique id, flags, description, 14 paths, grade, game stage, extras
+_RECORD = struct.Struct("<iBI14IiiI")
+RECORD_SIZE: int = _RECORD.size
+
+_ABSENT: int = 0
+_NULL: int = 1
+_FIRST_STRING: int = 2
+
+_FLAG_WEAPON: int = 1 << 0
+_FLAG_INITAL: int = 1 << 1
+_FLAG_GRADE: int = 1 << 2
+_FLAG_GAME_STAGE: int = 1 << 3
+
+_ITEM_PATH_FIELDS: Tuple[str, ...] = (
+    "ItemDefinition",
+    "BalanceDefinition",
+    "ManufacturerDefinition",
+    "AlphaItemPartDefinition",
+    "BetaItemPartDefinition",
+    "GammaItemPartDefinition",
+    "DeltaItemPartDefinition",
+    "EpsilonItemPartDefinition",
+    "ZetaItemPartDefinition",
+    "EtaItemPartDefinition",
+    "ThetaItemPartDefinition",
+    "MaterialItemPartDefinition",
+    "PrefixItemNamePartDefinition",
+    "TitleItemNamePartDefinition",
+)
+_WEAPON_PATH_FIELDS: Tuple[str, ...] = (
+    "WeaponTypeDefinition",
+    "BalanceDefinition",
+    "ManufacturerDefinition",
+    "BodyPartDefinition",
+    "GripPartDefinition",
+    "BarrelPartDefinition",
+    "SightPartDefinition",
+    "StockPartDefinition",
+    "ElementalPartDefinition",
+    "Accessory1PartDefinition",
+    "Accessory2PartDefinition",
+    "MaterialPartDefinition",
+    "PrefixPartDefinition",
+    "TitlePartDefinition",
+)
+_WEAPON_ONLY_FIELDS = frozenset(_WEAPON_PATH_FIELDS) - frozenset(_ITEM_PATH_FIELDS)
+
+_DESCRIPTION_KEY: str = "_description"
+_INITAL_KEY: str = "_inital"
+_GRADE_KEY: str = "ManufacturerGradeIndex"
+_GAME_STAGE_KEY: str = "GameStage"
+
+_INT_MIN: int = -0x80000000
+_INT_MAX: int = 0x7FFFFFFF
+
+
+def is_binary(data: bytes) -> bool:
+    """ Checks if the given data is in the binary format. """
+    return data.startswith(MAGIC)
+
+
+def _fits_int(val: Any) -> bool:
+    return type(val) is int and _INT_MIN <= val <= _INT_MAX
+
+
+class Encoder:
+    """
+    Incrementally encodes a save. Records get written to the given file as items are added, since
+    the string table needs to go first, they need to be copied to the output at the end.
+    """
+    _strings: Dict[str, int]
+    _records: IO[bytes]
+    _record_count: int
+
+    def __init__(self, records: IO[bytes]) -> None:
+        self._strings = {}
+        self._records = records
+        self._record_count = 0
+
+    def _new_string(self, val: str) -> int:
+        idx = len(self._strings) + _FIRST_STRING
+        self._strings[val] = idx
+        return idx
+
+    def _index(self, val: Any) -> int:
+        """ Gets the index of a string or null, or 0 if the value can't be stored in the table. """
+        if val is None:
+            return _NULL
+        # Null bytes would break the string table, leave them for the json extras
+        if type(val) is not str or "\0" in val:
+            return _ABSENT
+        # Indexes are never 0, so this can't be tricked
+        return self._strings.get(val) or self._new_string(val)
+
+    def add(self, unique_id: Any, data: Any) -> bool:
+        """
+        Tries to add an item as a record, returns False if it can't be, in which case it needs to be
+        stored in the document.
+        """
+        try:
+            unique_id = int(unique_id)
+        except ValueError:
+            return False
+        if not _fits_int(unique_id) or type(data) is not dict:
+            return False
+
+        is_weapon = not _WEAPON_ONLY_FIELDS.isdisjoint(data)
+        flags = _FLAG_WEAPON if is_weapon else 0
+        stored = 0
+
+        description = _ABSENT
+        if _DESCRIPTION_KEY in data:
+            description = self._index(data[_DESCRIPTION_KEY])
+            if description != _ABSENT:
+                stored += 1
+        if data.get(_INITAL_KEY) is True:
+            flags |= _FLAG_INITAL
+            stored += 1
+
+        fields = _WEAPON_PATH_FIELDS if is_weapon else _ITEM_PATH_FIELDS
+        strings = self._strings
+        try:
+            # Almost every path has been seen before, so try find it directly first
+            paths = [
+                (strings.get(data[field]) or self._index(data[field])) if field in data else _ABSENT
+                for field in fields
+            ]
+        except TypeError:
+            # Unhashable value
+            paths = [self._index(data[field]) if field in data else _ABSENT for field in fields]
+        stored += len(paths) - paths.count(_ABSENT)
+
+        grade = data.get(_GRADE_KEY)
+        if _fits_int(grade):
+            flags |= _FLAG_GRADE
+            stored += 1
+        else:
+            grade = 0
+        game_stage = data.get(_GAME_STAGE_KEY)
+        if _fits_int(game_stage):
+            flags |= _FLAG_GAME_STAGE
+            stored += 1
+        else:
+            game_stage = 0
+
+        extras = _ABSENT
+        if stored != len(data):
+            extras = self._index(json.dumps(
+                self._get_extras(data, flags),
+                separators=(",", ":")
+            ))
+
+        self._records.write(_RECORD.pack(
+            unique_id, flags, description, *paths, grade, game_stage, extras
+        ))
+        self._record_count += 1
+        return True
+
+    def _get_extras(self, data: Dict[str, Any], flags: int) -> Dict[str, Any]:
+        """ Gets all fields which weren't stored in an item's record. """
+        extras = dict(data)
+        if self._index(extras.get(_DESCRIPTION_KEY, 0)) != _ABSENT:
+            del extras[_DESCRIPTION_KEY]
+        if flags & _FLAG_INITAL:
+            del extras[_INITAL_KEY]
+        for field in (_WEAPON_PATH_FIELDS if flags & _FLAG_WEAPON else _ITEM_PATH_FIELDS):
+            if self._index(extras.get(field, 0)) != _ABSENT:
+                del extras[field]
+        if flags & _FLAG_GRADE:
+            del extras[_GRADE_KEY]
+        if flags & _FLAG_GAME_STAGE:
+            del extras[_GAME_STAGE_KEY]
+        return extras
+
+    def finish(self, output: IO[bytes], document: Dict[str, Any]) -> int:
+        """
+        Writes the full encoded save to the given output. `document` should contain all top level
+        keys, and all items which couldn't be added as records. Returns the amount of bytes written.
+        """
+        document_idx = self._index(json.dumps(document, separators=(",", ":")))
+        table = "\0".join(self._strings).encode("utf8", "surrogatepass")
+
+        header = MAGIC + bytes((FORMAT_VERSION,))
+        output.write(header)
+        output.write(_HEADER.pack(len(table), self._record_count, document_idx))
+        output.write(table)
+
+        self._records.seek(0)
+        while True:
+            chunk = self._records.read(RECORD_SIZE * 4096)
+            if not chunk:
+                break
+            output.write(chunk)
+
+        return len(header) + _HEADER.size + len(table) + self._record_count * RECORD_SIZE
+
+
+def encode(data: Dict[str, Any]) -> bytes:
+    """ Encodes a full save. """
+    encoder = Encoder(io.BytesIO())
+    document = dict(data)
+    leftover = {}
+    for unique_id, item in data.get(ITEMS_KEY, {}).items():
+        if not encoder.add(unique_id, item):
+            leftover[unique_id] = item
+    document[ITEMS_KEY] = leftover
+
+    output = io.BytesIO()
+    encoder.finish(output, document)
+    return output.getvalue()
+
+
+class Decoder:
+    """ Decodes a save, which may be done incrementally. """
+    strings: List[Optional[str]]
+    document: Dict[str, Any]
+    record_count: int
+
+    HEADER_SIZE: int = _HEADER.size
+
+    def __init__(self, file_header: bytes, header: bytes, table: bytes) -> None:
+        """
+        Creates a new decoder, given the first `HEADER_SIZE` bytes of the file, the next
+        `Decoder.HEADER_SIZE` bytes, and then the string table. Raises ValueError if invalid.
+        """
+        if len(file_header) != HEADER_SIZE or not file_header.startswith(MAGIC):
+            raise ValueError("File is not in the binary format")
+        if file_header[-1] != FORMAT_VERSION:
+            raise ValueError(f"Unknown binary format version {file_header[-1]}")
+        if len(header) != _HEADER.size:
+            raise ValueError("Binary save was truncated")
+
+        table_size, self.record_count, document_idx = _HEADER.unpack(header)
+        if len(table) != table_size:
+            raise ValueError("Binary save was truncated")
+
+        self.strings = [None, None]
+        if table_size > 0:
+            self.strings += table.decode("utf8", "surrogatepass").split("\0")
+
+        try:
+            document = json.loads(self.strings[document_idx])  # type: ignore
+        except (IndexError, TypeError) as ex:
+            raise ValueError("Binary save is corrupt") from ex
+        if type(document) is not dict:
+            raise ValueError("Binary save is corrupt")
+        self.document = document
+
+    @staticmethod
+    def table_size(header: bytes) -> int:
+        """ Gets the size of the string table, given the header struct. """
+        return _HEADER.unpack(header)[0]
+
+    def iter_records(self, records: bytes) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """ Decodes a block of records. Raises ValueError if they're invalid. """
+        if len(records) % RECORD_SIZE != 0:
+            raise ValueError("Binary save was truncated")
+
+        strings = self.strings
+        try:
+            for record in _RECORD.iter_unpack(records):
+                flags = record[1]
+                item: Dict[str, Any] = {}
+                if record[2] != _ABSENT:
+                    item[_DESCRIPTION_KEY] = strings[record[2]]
+                if flags & _FLAG_INITAL:
+                    item[_INITAL_KEY] = True
+
+                fields = _WEAPON_PATH_FIELDS if flags & _FLAG_WEAPON else _ITEM_PATH_FIELDS
+                for field, idx in zip(fields, record[3:17]):
+                    if idx:
+                        item[field] = strings[idx]
+
+                if flags & _FLAG_GRADE:
+                    item[_GRADE_KEY] = record[17]
+                if flags & _FLAG_GAME_STAGE:
+                    item[_GAME_STAGE_KEY] = record[18]
+                if record[19] != _ABSENT:
+                    item.update(json.loads(strings[record[19]]))  # type: ignore
+
+                yield record[0], item
+        except (IndexError, TypeError) as ex:
+            raise ValueError("Binary save is corrupt") from ex
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """ Decodes a full save. Raises ValueError if it's invalid. """
+    header_end = HEADER_SIZE + Decoder.HEADER_SIZE
+    header = data[HEADER_SIZE:header_end]
+    if len(header) != Decoder.HEADER_SIZE:
+        raise ValueError("Binary save was truncated")
+
+    table_end = header_end + Decoder.table_size(header)
+    decoder = Decoder(data[:HEADER_SIZE], header, data[header_end:table_end])
+
+    records = data[table_end:]
+    if len(records) != decoder.record_count * RECORD_SIZE:
+        raise ValueError("Binary save was truncated")
+
+    document = decoder.document
+    items = dict(decoder.iter_records(records))
+    for unique_id, item in document.get(ITEMS_KEY, {}).items():
+        try:
+            unique_id = int(unique_id)
+        except ValueError:
+            pass
+        items[unique_id] = item
+    document[ITEMS_KEY] = items
+    return document
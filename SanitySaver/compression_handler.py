@@ -1,11 +1,27 @@
+import functools
 import gzip
 import json
+import os
 from pathlib import Path
-from typing import Any, IO, Union, cast
+from typing import Any, Optional, Set, Tuple, Union
 
+from . import binary_format, dict_compression
 from .helpers import log_traceback
+from .journal import JOURNAL_SUFFIX, SnapshotSignature, apply_journal, read_journal
+
+FORMAT_GZIP: str = "Gzip"
+FORMAT_DICTIONARY: str = "Dictionary"
+FORMAT_BINARY: str = "Binary"
+COMPRESSED_FORMATS: Tuple[str, ...] = (FORMAT_GZIP, FORMAT_DICTIONARY, FORMAT_BINARY)
 
 _COMPRESS: bool = True
+# Compressed files use the same suffix in every format, it's detected from the file's header
+_FORMAT: str = FORMAT_GZIP
+_JOURNAL: bool = False
+
+# Files are written to a temp file first, then moved over the real one, so that they're never left
+# half written if the game crashes
+TEMP_SUFFIX: str = ".tmp"
 
 
 def _convert_path(path: Union[str, Path], compress: bool) -> Path:
@@ -22,6 +38,12 @@ def _convert_path(path: Union[str, Path], compress: bool) -> Path:
             return p
 
 
+def journal_path(path: Union[str, Path]) -> Path:
+    """ Gets the path of the journal which goes with the given file. """
+    p = _convert_path(path, False)
+    return p.with_name(p.name + JOURNAL_SUFFIX)
+
+
 def _delete_single_file(path: Path) -> None:
     try:
         path.unlink()
@@ -31,86 +53,272 @@ def _delete_single_file(path: Path) -> None:
         log_traceback()
 
 
-def _dump_file(data: Any, file: IO[str], compress: bool) -> None:
-    json.dump(
+def _serialize(data: Any, compress: bool) -> bytes:
+    if compress and _FORMAT == FORMAT_BINARY:
+        return binary_format.encode(data)
+
+    encoded = json.dumps(
         data,
-        file,
-        indent=None if _COMPRESS else 4,
-        separators=(",", ":" if _COMPRESS else ": ")
-    )
+        indent=None if compress else 4,
+        separators=(",", ":" if compress else ": ")
+    ).encode("utf8")
+    if not compress:
+        return encoded
+    if _FORMAT == FORMAT_DICTIONARY:
+        return dict_compression.compress(encoded)
+    return gzip.compress(encoded)
 
 
-def _update_single_file_compression(path: Path, compress: bool) -> None:
-    try:
-        json_mode, gzip_mode = ("rt", "wt") if compress else ("wt", "rt")
+def _detect_format(data: bytes) -> str:
+    if binary_format.is_binary(data):
+        return FORMAT_BINARY
+    if dict_compression.is_dict_compressed(data):
+        return FORMAT_DICTIONARY
+    return FORMAT_GZIP
 
-        with gzip.open(_convert_path(path, True), gzip_mode, encoding="utf8") as gzip_file:  # noqa: SIM117
-            with open(_convert_path(path, False), json_mode, encoding="utf8") as json_file:
-                file_map = {
-                    json_mode: json_file,
-                    # This cast shouldn't be needed - `gzip mode` is a literal that's a subset
-                    # of the literals typeshed defines as returning IO[str] :/
-                    gzip_mode: cast(IO[str], gzip_file)
-                }
 
-                data = json.load(file_map["rt"])
-                _dump_file(data, file_map["wt"], compress)
+def _read_file(path: Path, compress: bool) -> Any:
+    if not compress:
+        with open(path, "rt", encoding="utf8") as file:
+            return json.load(file)
 
-        path.unlink()
-    # In this version of python, gzip throws base `OSError`s, which also catches file not founds
-    except OSError:
-        log_traceback()
+    with open(path, "rb") as file:
+        data = file.read()
+
+    file_format = _detect_format(data)
+    if file_format == FORMAT_BINARY:
+        return binary_format.decode(data)
+    if file_format == FORMAT_DICTIONARY:
+        return json.loads(dict_compression.decompress(data))
+    return json.loads(gzip.decompress(data))
+
+
+def _has_current_format(path: Path) -> bool:
+    # Only compressed files have different formats
+    with open(path, "rb") as file:
+        magic = file.read(max(binary_format.HEADER_SIZE, dict_compression.HEADER_SIZE))
+    return _detect_format(magic) == _FORMAT
+
+
+def convert_or_raise(path: Union[str, Path]) -> None:
+    """
+    If the given file was last written using the other compression setting, or with the other
+    compressed format, rewrites it using the current one, folding in it's journal.
+
+    Raises OSError or ValueError on failure, without logging anything, so this is safe to call from
+    a background thread.
+    """
+    compress = _COMPRESS
+    correct_file = _convert_path(path, compress)
+    incorrect_file = _convert_path(path, not compress)
+    correct_signature = _single_file_signature(correct_file)
+
+    source_file = incorrect_file
+    source_signature = _single_file_signature(incorrect_file)
+
+    # If the correct file is newer, the other one's just out of date
+    if source_signature is not None and correct_signature is not None:
+        if correct_signature[0] >= source_signature[0]:
+            try:
+                incorrect_file.unlink()
+            except FileNotFoundError:
+                pass
+            source_signature = None
+
+    if source_signature is None:
+        if correct_signature is None or not compress or _has_current_format(correct_file):
+            return
+        source_file = correct_file
+        source_signature = correct_signature
+
+    data = _read_file(source_file, source_file.suffix == ".gz")
+
+    # The journal only applies to the version of the file we just read, so this is our last chance
+    records = read_journal(journal_path(path), source_signature)
+    if records:
+        items = {
+            int(unique_id): val for unique_id, val in data.get(SaveManager.ITEMS_KEY, {}).items()
+        }
+        apply_journal(items, records)
+        data[SaveManager.ITEMS_KEY] = items
+
+    _write_atomic(data, path, compress)
+
+
+def load_or_raise(path: Union[str, Path]) -> Any:
+    """
+    Loads json data (which may be compressed) from the given file.
+
+    Raises OSError or ValueError on failure, without logging anything, so this is safe to call from
+    a background thread.
+    """
+    convert_or_raise(path)
+    return _read_file(_convert_path(path, _COMPRESS), _COMPRESS)
 
 
 def load(path: Union[str, Path]) -> Any:
     """ Loads json data (which may be compressed) from the given file. """
-    correct_file = _convert_path(path, _COMPRESS)
-    incorrect_file = _convert_path(path, not _COMPRESS)
-
-    # If the wrong file is newer than the correct once, convert it and use it instead
-    if incorrect_file.exists():
-        if (
-            not correct_file.exists()
-            or incorrect_file.stat().st_mtime > correct_file.stat().st_mtime
-        ):
-            _update_single_file_compression(correct_file, _COMPRESS)
-        else:
-            _delete_single_file(incorrect_file)
+    try:
+        convert_or_raise(path)
+    except (OSError, ValueError):
+        log_traceback()
 
-    open_func = gzip.open if _COMPRESS else open
+    return _read_file(_convert_path(path, _COMPRESS), _COMPRESS)
 
-    with open_func(correct_file, "rt", encoding="utf8") as file:  # type: ignore
-        return json.load(file)
+
+def write_atomic(data: Any, path: Union[str, Path]) -> int:
+    """
+    Dumps the given json data into the given file, compressing it if required, such that the file
+    always either contains the old or new data, even if the game crashes part way through.
+
+    Returns the size of the written file. Raises OSError on failure, without logging anything, so
+    this is safe to call from a background thread.
+    """
+    return _write_atomic(data, path, _COMPRESS)
 
 
-def dump(data: Any, path: Union[str, Path]) -> None:
-    """ Dumps the given json data into the given file, compressing it if required. """
-    open_func = gzip.open if _COMPRESS else open
+def _write_atomic(data: Any, path: Union[str, Path], compress: bool) -> int:
+    correct_file = _convert_path(path, compress)
+    temp_file = correct_file.with_name(correct_file.name + TEMP_SUFFIX)
 
+    encoded = _serialize(data, compress)
     try:
-        with open_func(_convert_path(path, _COMPRESS), "wt", encoding="utf8") as file:  # type: ignore
-            _dump_file(data, file, _COMPRESS)
+        with open(temp_file, "wb") as file:
+            file.write(encoded)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, correct_file)
+    except OSError:
+        try:
+            temp_file.unlink()
+        except OSError:
+            pass
+        raise
+
+    # The new file contains everything, so any other version of it is now out of date
+    for outdated_file in (_convert_path(path, not compress), journal_path(path)):
+        try:
+            outdated_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    return len(encoded)
+
+
+def dump(data: Any, path: Union[str, Path]) -> Optional[int]:
+    """
+    Dumps the given json data into the given file, compressing it if required. Returns the size of
+    the written file, or None if writing failed.
+    """
+    try:
+        return write_atomic(data, path)
     except OSError:
         log_traceback()
+        return None
+
 
-    _delete_single_file(_convert_path(path, not _COMPRESS))
+FileSignature = Tuple[SnapshotSignature, SnapshotSignature, SnapshotSignature]
+
+
+def _single_file_signature(path: Path) -> SnapshotSignature:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_signature(path: Union[str, Path]) -> FileSignature:
+    """
+    Gets a signature of the file at the given path, which changes whenever either version of it, or
+    it's journal, is written to. Used to tell if a file's been changed since we last loaded it.
+    """
+    return (
+        _single_file_signature(_convert_path(path, True)),
+        _single_file_signature(_convert_path(path, False)),
+        _single_file_signature(journal_path(path))
+    )
+
+
+def snapshot_signature(path: Union[str, Path]) -> SnapshotSignature:
+    """ Gets the signature of the version of the given file which journals get applied to. """
+    return _single_file_signature(_convert_path(path, _COMPRESS))
+
+
+def is_journaling() -> bool:
+    """ Checks if changes to saves should be appended to a journal, rather than rewriting them. """
+    return _JOURNAL
 
 
 def delete(path: Union[str, Path]) -> None:
     """ Deletes the given file, including a version with incorrect compression (if it exists). """
     _delete_single_file(_convert_path(path, True))
     _delete_single_file(_convert_path(path, False))
+    _delete_single_file(journal_path(path))
+
+
+def delete_or_raise(path: Union[str, Path]) -> None:
+    """
+    Deletes the given file, including a version with incorrect compression (if it exists).
+
+    Raises OSError on failure, without logging anything, so this is safe to call from a background
+    thread.
+    """
+    for file in (_convert_path(path, True), _convert_path(path, False), journal_path(path)):
+        try:
+            file.unlink()
+        except FileNotFoundError:
+            pass
 
 
-from .save_manager import _SAVES_DIR  # noqa: E402  # Avoiding circular import
+from .save_manager import _SAVES_DIR, SaveManager, compact_journals  # noqa: E402  # Avoiding circular import
+from .save_writer import flush_save_writes, schedule_background_pass  # noqa: E402
 
 
-def update_compression(compress: bool) -> None:
+def update_compression(compress: bool, compressed_format: str) -> None:
     """
-    Changes if save files will be compressed, and updates any existing files to the correct format.
+    Changes if save files will be compressed, and if so which of `COMPRESSED_FORMATS` they'll use.
+    Existing files with the wrong compression setting get converted in the background. Files which
+    are compressed in a different format get converted the next time they're loaded.
     """
-    global _COMPRESS
+    global _COMPRESS, _FORMAT
+    if compressed_format not in COMPRESSED_FORMATS:
+        raise ValueError(f"Unknown compressed format {compressed_format}")
     _COMPRESS = compress
+    _FORMAT = compressed_format
+
+    # Only queue files with the wrong extension, reading every save on every launch would be wasted.
+    # Temp files are queued too, since they may be from a write which already picked the old setting
+    # - conversion jobs only run after all earlier writes to the same file, so by the time it runs,
+    # that write's finished. Jobs just skip files which are already correct, so if the game closes
+    # part way through, the next pass picks up where this one left off.
+    paths: Set[Path] = set()
+    for file in _SAVES_DIR.iterdir():
+        if not file.is_file() or file.suffix == JOURNAL_SUFFIX:
+            continue
+        if file.suffix == TEMP_SUFFIX:
+            file = file.with_suffix("")
+        elif (file.suffix == ".gz") == compress:
+            continue
+        paths.add(_convert_path(file, False))
+
+    schedule_background_pass(
+        "Converting saves",
+        {path: functools.partial(convert_or_raise, path) for path in paths}
+    )
+
+
+def update_journaling(journal: bool) -> None:
+    """
+    Changes if changes to saves get appended to a journal. If turning them off, folds all existing
+    journals back into their saves.
+    """
+    global _JOURNAL
+
+    # Make sure we see any journals which are still being created
+    if _JOURNAL:
+        flush_save_writes()
+    _JOURNAL = journal
 
-    for file in _SAVES_DIR.glob("*.json" if compress else "*.json.gz"):
-        _update_single_file_compression(file, compress)
+    if not journal:
+        compact_journals()
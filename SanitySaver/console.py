@@ -1,6 +1,12 @@
 import unrealsdk
 import argparse
 
+from . import item_index
+from .helpers import keep_alive_info, obj_cache_info, pack_memo_info, path_name_cache_info
+from .hooks import vendor_reroll_info
+from .memento_store import memento_store
+from .save_manager import rebuild_item_index, save_cache_info, save_write_stats
+
 try:
     from Mods import CommandExtensions
 except ImportError:
@@ -85,9 +91,145 @@ def enable_console_commands() -> None:
         help="Dump weapons."
     )
 
+    def stats_handler(args: argparse.Namespace) -> None:
+        obj_cache = obj_cache_info()
+        unrealsdk.Log(
+            f"Part cache: {obj_cache.hits} hits, {obj_cache.misses} misses"
+            f" ({obj_cache.not_found} not found, {obj_cache.stale} stale),"
+            f" {obj_cache.evictions} evictions, {obj_cache.invalidations} map changes,"
+            f" {obj_cache.size}/{obj_cache.max_size} parts cached"
+        )
+
+        path_names = path_name_cache_info()
+        unrealsdk.Log(
+            f"Path name cache: {path_names.hits} hits, {path_names.misses} misses,"
+            f" {path_names.size}/{path_names.max_size} names cached"
+        )
+
+        kept_alive = keep_alive_info()
+        unrealsdk.Log(
+            f"Keep alive: {kept_alive.calls} objects kept alive, {kept_alive.skipped} redundant"
+            f" calls skipped, {kept_alive.size} objects since the last map change"
+        )
+
+        packing = pack_memo_info()
+        last_save_total = packing.last_save_reused + packing.last_save_repacked
+        last_save_fraction = packing.last_save_repacked / max(last_save_total, 1)
+        unrealsdk.Log(
+            f"Item packing: {packing.reused} reused, {packing.repacked} re-packed,"
+            f" {packing.last_save_repacked}/{last_save_total} ({last_save_fraction:.0%}) re-packed"
+            f" last save, {packing.size}/{packing.max_size} items remembered"
+        )
+
+        mementos = memento_store.info()
+        unrealsdk.Log(
+            f"Mementos: {mementos.in_memory} in memory (~{mementos.in_memory_bytes // 1024}KiB),"
+            f" {mementos.spilled} spilled to disk ({mementos.spilled_bytes // 1024}KiB,"
+            f" {mementos.spill_file_bytes // 1024}KiB file), {mementos.total_spilled} spilled total"
+        )
+
+        save_cache = save_cache_info()
+        unrealsdk.Log(
+            f"Save cache: {save_cache.hits} hits, {save_cache.misses} misses,"
+            f" {save_cache.size} files cached"
+        )
+
+        writes = save_write_stats()
+        unrealsdk.Log(
+            f"Save writes: {writes.writes} written, {writes.skipped_writes} skipped as unchanged,"
+            f" {writes.items_serialized} items serialized, {writes.bytes_written} bytes written,"
+            f" {writes.time_spent * 1000:.1f}ms blocking,"
+            f" {writes.background_time_spent * 1000:.1f}ms in the background"
+        )
+
+        vendors = vendor_reroll_info()
+        unrealsdk.Log(
+            f"Vendor rerolls: {vendors.rerolled} vendors rerolled in {vendors.batches} batches"
+            f" (largest {vendors.largest_batch}), {vendors.merged}/{vendors.requests} requests"
+            f" merged, {vendors.items_created} items created, {vendors.time_spent * 1000:.1f}ms"
+        )
+
+    CommandExtensions.RegisterConsoleCommand(
+        "SanitySaverStats",
+        stats_handler,
+        description="Dumps statistics about Sanity Saver's internal caches, to help debug slowdowns."
+    )
+
+    def index_handler(args: argparse.Namespace) -> None:
+        if not item_index.is_indexing():
+            unrealsdk.Log("The item index is disabled, turn on 'Index Saves' in the mod's options.")
+            return
+
+        if args.action == "rebuild":
+            rebuild_item_index()
+
+        elif args.action == "find":
+            if not args.query:
+                unrealsdk.Log("Please specify what to search for.")
+                return
+
+            found = item_index.find_parts(args.query, args.limit)
+            for part in found:
+                unrealsdk.Log(
+                    f"{part.save}: {part.unique_id} ({part.description}) {part.field}: {part.path}"
+                )
+            if len(found) >= args.limit:
+                unrealsdk.Log(f"Stopped after {args.limit} results.")
+            elif not found:
+                unrealsdk.Log("No matching parts.")
+
+        elif args.action == "check":
+            missing = 0
+            for indexed in item_index.iter_paths():
+                if args.query and args.query.lower() not in indexed.path.lower():
+                    continue
+                # Dynamically generated, we know we won't find these
+                if indexed.path.startswith("Transient"):
+                    continue
+                if unrealsdk.FindObject("Object", indexed.path) is not None:
+                    continue
+
+                missing += 1
+                unrealsdk.Log(
+                    f"{indexed.field}: {indexed.path} is used {indexed.references} times, in"
+                    f" {', '.join(sorted(indexed.saves))}"
+                )
+            unrealsdk.Log(f"Found {missing} parts which don't currently exist.")
+
+    index_parser = CommandExtensions.RegisterConsoleCommand(
+        "SanitySaverIndex",
+        index_handler,
+        description=(
+            "Searches the item index, which covers the balances and parts of items across all your"
+            " saves. Items which haven't been loaded since the index was turned on only include the"
+            " parts Sanity Saver is preserving. 'find' lists all items using a part containing the"
+            " query. 'check' lists all parts which can't"
+            " currently be found - items using them would have those parts deleted if loaded right"
+            " now. 'rebuild' re-indexes any saves which have changed."
+        )
+    )
+    index_parser.add_argument(
+        "action",
+        choices=("find", "check", "rebuild"),
+        help="What to do."
+    )
+    index_parser.add_argument(
+        "query",
+        nargs="?",
+        help="The part to search for. Case insensitive, may be any part of the path name."
+    )
+    index_parser.add_argument(
+        "-n", "--limit",
+        type=int,
+        default=50,
+        help="The maximum amount of items to list when searching."
+    )
+
 
 def disable_console_commands() -> None:
     if CommandExtensions is None:
         return
 
     CommandExtensions.UnregisterConsoleCommand("SanitySaverDump")
+    CommandExtensions.UnregisterConsoleCommand("SanitySaverStats")
+    CommandExtensions.UnregisterConsoleCommand("SanitySaverIndex")
@@ -0,0 +1,96 @@
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+"""
+An alternate compression mode, using zlib with a preset dictionary.
+
+Saves are mostly the same few keys, and the same package paths, repeated over and over. Plain gzip
+has to see each of these once before it can start referencing them, which for a small save (e.g. a
+bank with a few items in it) is most of the file. A preset dictionary gives zlib a head start, by
+pre-loading it with the most common strings. See `tools/gen_zdict.py` for how it's generated.
+
+Files using this start with a magic header, which includes a version, so that we can tell them apart
+from gzip files - which lets them share the same `.gz` suffix, and means existing saves keep loading
+no matter which mode is on. Each dictionary is stored in a `zdict_v{version}` file. If the
+dictionary ever gets retrained, it must be saved under a new version, old files still need the old
+one to decompress. After the header is a regular zlib stream,
+which also records which dictionary it was made with, and has a checksum.
+
+This module doesn't depend on the sdk, so that it can be used offline.
+"""
+
+MAGIC: bytes = b"SSZ"
+DICT_VERSION: int = 1
+HEADER_SIZE: int = len(MAGIC) + 1
+
+_lock = threading.Lock()
+_dicts: Dict[int, bytes] = {}
+_compressor: Optional["zlib._Compress"] = None
+
+
+def dict_path(version: int) -> Path:
+    """ Gets the path the dictionary with the given version is stored at. """
+    return Path(__file__).parent / f"zdict_v{version}"
+
+
+def _get_dict(version: int) -> bytes:
+    with _lock:
+        zdict = _dicts.get(version)
+        if zdict is None:
+            if not 1 <= version <= DICT_VERSION:
+                raise ValueError(f"Unknown compression dictionary version {version}")
+            zdict = dict_path(version).read_bytes()
+            _dicts[version] = zdict
+        return zdict
+
+
+def is_dict_compressed(data: bytes) -> bool:
+    """ Checks if the given data was compressed using a dictionary. """
+    return data.startswith(MAGIC)
+
+
+def compressobj() -> "zlib._Compress":
+    """ Creates a compressor using the latest dictionary. The header must be written separately. """
+    global _compressor
+
+    # Loading the dictionary is relatively slow, so set it up once, then copy it
+    if _compressor is None:
+        _compressor = zlib.compressobj(level=zlib.Z_BEST_COMPRESSION, zdict=_get_dict(DICT_VERSION))
+    return _compressor.copy()
+
+
+def header() -> bytes:
+    """ Gets the header which goes before the output of `compressobj`. """
+    return MAGIC + bytes((DICT_VERSION,))
+
+
+def compress(data: bytes) -> bytes:
+    """ Compresses the given data using the latest dictionary, including the header. """
+    compressor = compressobj()
+    return header() + compressor.compress(data) + compressor.flush()
+
+
+def decompressobj(file_header: bytes) -> "zlib._Decompress":
+    """
+    Creates a decompressor for the data following the given header. Raises ValueError if the header
+    is invalid.
+    """
+    if len(file_header) != HEADER_SIZE or not file_header.startswith(MAGIC):
+        raise ValueError("File was not compressed using a dictionary")
+    return zlib.decompressobj(zdict=_get_dict(file_header[-1]))
+
+
+def decompress(data: bytes) -> bytes:
+    """ Decompresses the given data, including the header. Raises ValueError on failure. """
+    decompressor = decompressobj(data[:HEADER_SIZE])
+    try:
+        decompressed = decompressor.decompress(data[HEADER_SIZE:]) + decompressor.flush()
+    except zlib.error as ex:
+        raise ValueError(str(ex)) from ex
+    if not decompressor.eof:
+        raise ValueError("Compressed data was truncated")
+    if decompressor.unused_data:
+        raise ValueError("Unexpected data after the end of the compressed data")
+    return decompressed
@@ -1,7 +1,7 @@
 import unrealsdk
-import functools
 import traceback
-from typing import Any, Dict, Iterator, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Set, Tuple
 
 JSON = Dict[str, Any]
 DefDataTuple = Tuple[
@@ -25,41 +25,233 @@ DefDataTuple = Tuple[
 ]
 
 
-_any_missing: bool = False
+"""
+Since we deal with the same parts a lot, part lookups are cached.
+
+The cache is bounded, dropping the least recently used objects once full, so it can't grow forever
+over a long session. Objects which couldn't be found aren't cached, since modded parts may just not
+have been created yet. Parts from packages which got unloaded with the last map would leave us
+holding stale objects, so every entry remembers which map it was found on - entries from an older
+map are detected and looked up again, rather than ever being used.
+
+We can't just hold weak references instead, since the sdk creates a new python object each time it
+hands us a UObject - they'd always be dead immediately.
+"""
+
+OBJ_CACHE_MAX_SIZE: int = 4096
+
+
+class _CachedObj(NamedTuple):
+    map_generation: int
+    obj: unrealsdk.UObject
+
+
+_obj_cache: "OrderedDict[Tuple[str, str], _CachedObj]" = OrderedDict()
+_map_generation: int = 0
+# Only warn about each missing object once, since we're not caching them anymore
+_missing_objs: Set[Tuple[str, str]] = set()
+
+
+class ObjCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    not_found: int
+    stale: int
+    evictions: int
+    invalidations: int
+    size: int
+    max_size: int
+
+
+_obj_cache_stats: Dict[str, int] = {
+    "hits": 0,
+    "misses": 0,
+    "not_found": 0,
+    "stale": 0,
+    "evictions": 0,
+    "invalidations": 0,
+}
 
 
-@functools.lru_cache(maxsize=None)
 def cached_obj_find(klass: str, name: str) -> unrealsdk.UObject:
     if name is None or name == "None":
         return None
+
+    key = (klass, name)
+    cached = _obj_cache.get(key)
+    if cached is not None:
+        if cached.map_generation == _map_generation:
+            _obj_cache.move_to_end(key)
+            _obj_cache_stats["hits"] += 1
+            return cached.obj
+        _obj_cache_stats["stale"] += 1
+        del _obj_cache[key]
+
+    _obj_cache_stats["misses"] += 1
     obj = unrealsdk.FindObject(klass, name)
 
-    # Warn about missing objects but still return/cache them
+    # Warn about missing objects, but don't cache them, they might get created later
     if obj is None:
-        unrealsdk.Log(f"[SanitySaver] Couldn't find {klass}'{name}'")
-        global _any_missing
-        _any_missing = True
+        _obj_cache_stats["not_found"] += 1
+        if key not in _missing_objs:
+            _missing_objs.add(key)
+            unrealsdk.Log(f"[SanitySaver] Couldn't find {klass}'{name}'")
+        return None
+
+    _obj_cache[key] = _CachedObj(_map_generation, obj)
+    if len(_obj_cache) > OBJ_CACHE_MAX_SIZE:
+        _obj_cache.popitem(last=False)
+        _obj_cache_stats["evictions"] += 1
 
     return obj
 
 
-_old_cache_clear = cached_obj_find.cache_clear
+def invalidate_obj_cache() -> None:
+    """
+    Marks all cached objects, path names, and kept alive objects as stale, should be called whenever
+    the map changes.
+    """
+    global _map_generation
+    _map_generation += 1
+    _obj_cache_stats["invalidations"] += 1
+
+    _path_name_cache.clear()
+    _kept_alive.clear()
 
 
-def _new_cache_clear() -> None:
-    global _any_missing
-    if _any_missing:
+def clear_obj_cache() -> None:
+    """
+    Completely clears the object, path name, packing, and keep alive caches, including all
+    statistics.
+    """
+    if _missing_objs:
         unrealsdk.Log("[SanitySaver] Cleared Part Cache")
-    _any_missing = False
+    _missing_objs.clear()
+
+    _obj_cache.clear()
+    for stat in _obj_cache_stats:
+        _obj_cache_stats[stat] = 0
+
+    _path_name_cache.clear()
+    for stat in _path_name_cache_stats:
+        _path_name_cache_stats[stat] = 0
+
+    _kept_alive.clear()
+    for stat in _keep_alive_stats:
+        _keep_alive_stats[stat] = 0
+
+    _pack_memo.clear()
+    for stat in _pack_memo_stats:
+        _pack_memo_stats[stat] = 0
+    for stat in _pack_memo_save_start:
+        _pack_memo_save_start[stat] = 0
+
 
-    _old_cache_clear()
+def obj_cache_info() -> ObjCacheInfo:
+    """ Gets statistics about the object cache. """
+    return ObjCacheInfo(
+        size=len(_obj_cache),
+        max_size=OBJ_CACHE_MAX_SIZE,
+        **_obj_cache_stats
+    )
+
+
+"""
+Packing an item looks up the path name of up to 15 objects, and the same parts, manufacturers, and
+balances get looked up over and over across an inventory, so we cache these too.
+
+Since we hold a reference to every object in the cache, the sdk keeps handing us back the same
+python object for them, so we can just key it on the object itself. An object's path name never
+changes, but once it's unloaded, another one might get created in the same place, so this gets
+cleared on map change, alongside invalidating the object cache.
+"""
+
+PATH_NAME_CACHE_MAX_SIZE: int = 4096
 
+_path_name_cache: Dict[unrealsdk.UObject, str] = {}
 
-cached_obj_find.cache_clear = _new_cache_clear  # type: ignore
+
+class PathNameCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+_path_name_cache_stats: Dict[str, int] = {
+    "hits": 0,
+    "misses": 0,
+}
 
 
 def safe_pathname(obj: unrealsdk.UObject) -> Optional[str]:
-    return None if obj is None else obj.PathName(obj)
+    if obj is None:
+        return None
+
+    name = _path_name_cache.get(obj)
+    if name is not None:
+        _path_name_cache_stats["hits"] += 1
+        return name
+
+    _path_name_cache_stats["misses"] += 1
+    name = obj.PathName(obj)
+
+    # Nothing is used often enough to be worth tracking, just drop the oldest entry
+    if len(_path_name_cache) >= PATH_NAME_CACHE_MAX_SIZE:
+        del _path_name_cache[next(iter(_path_name_cache))]
+    _path_name_cache[obj] = name
+
+    return name
+
+
+def path_name_cache_info() -> PathNameCacheInfo:
+    """ Gets statistics about the path name cache. """
+    return PathNameCacheInfo(
+        size=len(_path_name_cache),
+        max_size=PATH_NAME_CACHE_MAX_SIZE,
+        **_path_name_cache_stats
+    )
+
+
+"""
+Every time an item gets created we keep all of it's parts alive, so they don't get unloaded before
+we save them. The same few parts are used by almost every item, so rather than calling into the sdk
+for all of them every time, we remember which ones we've already kept alive.
+
+As with the path name cache, we hold a reference to each object, so they keep the same python
+object. Once a map's unloaded though, a new object might get created in the same place, so this also
+gets cleared on map change.
+"""
+
+_kept_alive: Set[unrealsdk.UObject] = set()
+
+
+class KeepAliveInfo(NamedTuple):
+    calls: int
+    skipped: int
+    size: int
+
+
+_keep_alive_stats: Dict[str, int] = {
+    "calls": 0,
+    "skipped": 0,
+}
+
+
+def keep_alive(obj: unrealsdk.UObject) -> None:
+    """ Keeps the given object alive, if we haven't already done so since the last map change. """
+    if obj in _kept_alive:
+        _keep_alive_stats["skipped"] += 1
+        return
+
+    _keep_alive_stats["calls"] += 1
+    unrealsdk.KeepAlive(obj)
+    _kept_alive.add(obj)
+
+
+def keep_alive_info() -> KeepAliveInfo:
+    """ Gets statistics about how many objects we've kept alive. """
+    return KeepAliveInfo(size=len(_kept_alive), **_keep_alive_stats)
 
 
 def log_traceback() -> None:
@@ -110,6 +302,55 @@ def get_all_items_and_weapons(
                 yield item
 
 
+# The field names of each entry in a def data tuple
+ITEM_DEF_DATA_FIELDS: Tuple[str, ...] = (
+    "ItemDefinition",
+    "BalanceDefinition",
+    "ManufacturerDefinition",
+    "ManufacturerGradeIndex",
+    "AlphaItemPartDefinition",
+    "BetaItemPartDefinition",
+    "GammaItemPartDefinition",
+    "DeltaItemPartDefinition",
+    "EpsilonItemPartDefinition",
+    "ZetaItemPartDefinition",
+    "EtaItemPartDefinition",
+    "ThetaItemPartDefinition",
+    "MaterialItemPartDefinition",
+    "PrefixItemNamePartDefinition",
+    "TitleItemNamePartDefinition",
+    "GameStage",
+    "UniqueId"
+)
+WEAPON_DEF_DATA_FIELDS: Tuple[str, ...] = (
+    "WeaponTypeDefinition",
+    "BalanceDefinition",
+    "ManufacturerDefinition",
+    "ManufacturerGradeIndex",
+    "BodyPartDefinition",
+    "GripPartDefinition",
+    "BarrelPartDefinition",
+    "SightPartDefinition",
+    "StockPartDefinition",
+    "ElementalPartDefinition",
+    "Accessory1PartDefinition",
+    "Accessory2PartDefinition",
+    "MaterialPartDefinition",
+    "PrefixPartDefinition",
+    "TitlePartDefinition",
+    "GameStage",
+    "UniqueId"
+)
+
+
+def pack_definition_tuple(parts: DefDataTuple, is_weapon: bool) -> JSON:
+    """ Packs an already expanded def data tuple, in the same format as the pack functions. """
+    return {
+        field: safe_pathname(val) if isinstance(val, unrealsdk.UObject) else val
+        for field, val in zip(WEAPON_DEF_DATA_FIELDS if is_weapon else ITEM_DEF_DATA_FIELDS, parts)
+    }
+
+
 def expand_item_definition_data(obj: unrealsdk.FStruct) -> DefDataTuple:
     return (
         obj.ItemDefinition,
@@ -240,3 +481,95 @@ def unpack_weapon_definition_data(data: JSON) -> DefDataTuple:
         data["GameStage"],
         data["UniqueId"]
     )
+
+
+"""
+Most items' definition data doesn't change between saves, so there's no need to pack them again
+every time. We remember the last packed version of each item, alongside a fingerprint of the parts
+it was packed from. The fingerprint is just the expanded definition data - comparing it is a lot
+cheaper than looking up every part's path name again.
+
+The fingerprint compares objects by identity, which is only safe as long as none of them can get
+unloaded and replaced by another object in the same place. Every part of every item gets kept alive
+when it's created, and we keep alive everything in a fingerprint when we store it too, in case the
+item hasn't been created yet (e.g. while we're fixing up a save file). Since nothing in the memo can
+be unloaded, unlike the path name cache, it's kept across map changes - so items which haven't
+changed don't need to be packed again on the next map either.
+"""
+
+PACK_MEMO_MAX_SIZE: int = 4096
+
+
+class _PackedDefData(NamedTuple):
+    fingerprint: DefDataTuple
+    packed: JSON
+
+
+_pack_memo: Dict[int, _PackedDefData] = {}
+
+
+class PackMemoInfo(NamedTuple):
+    reused: int
+    repacked: int
+    last_save_reused: int
+    last_save_repacked: int
+    size: int
+    max_size: int
+
+
+_pack_memo_stats: Dict[str, int] = {
+    "reused": 0,
+    "repacked": 0,
+    "last_save_reused": 0,
+    "last_save_repacked": 0,
+}
+# The stats at the start of the current save
+_pack_memo_save_start: Dict[str, int] = {
+    "reused": 0,
+    "repacked": 0,
+}
+
+
+def pack_definition_data(obj: unrealsdk.FStruct, is_weapon: bool) -> JSON:
+    """
+    Packs item or weapon definition data, reusing the last result for the same unique id if none of
+    it's fields changed since. The returned dict is a copy, so is safe to modify.
+    """
+    fingerprint = (
+        expand_weapon_definition_data(obj) if is_weapon else expand_item_definition_data(obj)
+    )
+    unique_id = fingerprint[-1]
+
+    memo = _pack_memo.get(unique_id)
+    if memo is not None and memo.fingerprint == fingerprint:
+        _pack_memo_stats["reused"] += 1
+        return dict(memo.packed)
+
+    _pack_memo_stats["repacked"] += 1
+    packed = pack_weapon_definition_data(obj) if is_weapon else pack_item_definition_data(obj)
+
+    for part in fingerprint:
+        if isinstance(part, unrealsdk.UObject):
+            keep_alive(part)
+
+    if memo is None and len(_pack_memo) >= PACK_MEMO_MAX_SIZE:
+        del _pack_memo[next(iter(_pack_memo))]
+    _pack_memo[unique_id] = _PackedDefData(fingerprint, packed)
+
+    return dict(packed)
+
+
+def end_pack_memo_save() -> None:
+    """ Marks the end of a save, so that the per save packing stats cover the next one. """
+    for stat in _pack_memo_save_start:
+        _pack_memo_stats["last_save_" + stat] = _pack_memo_stats[stat] - _pack_memo_save_start[stat]
+        _pack_memo_save_start[stat] = _pack_memo_stats[stat]
+
+
+def pack_memo_info() -> PackMemoInfo:
+    """ Gets statistics about how many items had to be packed again. """
+    return PackMemoInfo(
+        size=len(_pack_memo),
+        max_size=PACK_MEMO_MAX_SIZE,
+        **_pack_memo_stats
+    )
@@ -1,9 +1,12 @@
 import unrealsdk
-from typing import Callable, Dict
+import time
+from typing import Any, Callable, Dict, NamedTuple, Set
 
 from .helpers import (DefDataTuple, expand_item_definition_data, expand_weapon_definition_data,
-                      get_all_items_and_weapons)
+                      get_all_items_and_weapons, invalidate_obj_cache, keep_alive)
+from .memento_store import memento_store
 from .save_manager import STASH_NAME, SaveManager
+from .save_writer import flush_save_writes
 
 SDKHook = Callable[[unrealsdk.UObject, unrealsdk.UFunction, unrealsdk.FStruct], bool]
 AllHooks: Dict[str, SDKHook] = {}
@@ -21,9 +24,6 @@ def Block(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unre
     return False
 
 
-_memento_save_manager = SaveManager("_mementos")
-
-
 # region Remove sanity check
 
 """
@@ -300,6 +300,10 @@ _initial_launch: bool = True
 # Fixup the items that appear on your character on the main menu
 @hook("WillowGame.WillowPlayerPawnDataManager.LoadPlayerPawnDataAsync")
 def LoadPlayerPawnDataAsync(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unrealsdk.FStruct) -> bool:
+    # We're switching saves, make sure the last one's been completely written. Any background passes
+    # can keep going, loads wait for any jobs on the file they're reading anyway.
+    flush_save_writes()
+
     # Don't do anything on first launch, before modded parts get created - don't want to cache them
     # as not existing if we're auto enabled
     global _initial_launch
@@ -311,7 +315,7 @@ def LoadPlayerPawnDataAsync(caller: unrealsdk.UObject, function: unrealsdk.UFunc
         return True
 
     # Since we know you're on the main menu here, clear map save data
-    _memento_save_manager.clear()
+    memento_store.clear()
 
     save_name = unrealsdk.GetEngine().GamePlayers[0].Actor.GetSaveGameNameFromid(
         params.Payload.SaveGame.SaveGameId
@@ -337,6 +341,14 @@ unrealsdk.RunHook("WillowGame.FrontendGFxMovie.LaunchNewGame", __file__, LaunchN
 unrealsdk.RunHook("WillowGame.FrontendGFxMovie.LaunchSaveGame", __file__, LaunchNewSaveGame)
 
 
+# Packages get unloaded on map change, so anything we found on the last map might not exist anymore
+@hook("WillowGame.WillowPlayerController.WillowClientShowLoadingMovie")
+def WillowClientShowLoadingMovie(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unrealsdk.FStruct) -> bool:
+    invalidate_obj_cache()
+    cancel_vendor_rerolls()
+    return True
+
+
 """
 One complication to our custom save system is that in some situations some parts get unloaded
 *before* the game saves gear.
@@ -355,10 +367,12 @@ def OnCreate(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: u
         all_parts = expand_weapon_definition_data(caller.DefinitionData)
     else:
         all_parts = expand_item_definition_data(caller.DefinitionData)
+    if _is_rerolling:
+        _vendor_reroll_stats["items_created"] += 1
     for part in all_parts:
         if not isinstance(part, unrealsdk.UObject):
             continue
-        unrealsdk.KeepAlive(part)
+        keep_alive(part)
     return True
 
 # endregion
@@ -517,7 +531,7 @@ can't actually call these functions ourselves, cause we can't reconstruct a seri
 @hook("WillowGame.WillowItem.GetMemento")
 @hook("WillowGame.WillowWeapon.GetMemento")
 def GetMemento(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unrealsdk.FStruct) -> bool:
-    _memento_save_manager.add_new_item(caller)
+    memento_store.add_item(caller)
     return True
 
 
@@ -533,14 +547,13 @@ def CreatePickupFromMemento(caller: unrealsdk.UObject, function: unrealsdk.UFunc
     item = params.InventoryThisPickupIsFor
 
     item.InitializeFromDefinitionData(
-        _memento_save_manager.fix_definition_data(
+        memento_store.pop_definition_data(
             item.DefinitionData,
             item.Class.Name == "WillowWeapon"
         ),
         None,
         False
     )
-    _memento_save_manager.remove_item(item)
 
     return True
 
@@ -557,14 +570,13 @@ def CreateSavedInventory(caller: unrealsdk.UObject, function: unrealsdk.UFunctio
     """
     def GiveTo(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unrealsdk.FStruct) -> bool:
         caller.InitializeFromDefinitionData(
-            _memento_save_manager.fix_definition_data(
+            memento_store.pop_definition_data(
                 caller.DefinitionData,
                 caller.Class.Name == "WillowWeapon"
             ),
             None,
             False
         )
-        _memento_save_manager.remove_item(caller)
 
         return True
 
@@ -582,8 +594,40 @@ def CreateSavedInventory(caller: unrealsdk.UObject, function: unrealsdk.UFunctio
 # endregion
 # region Vendor rerolling
 
+"""
+Vendors containing unserializable items break if you switch levels, so the option rerolls them on
+transition instead of letting them keep their old inventory. The game restocks every vendor on the
+map back to back, and sometimes sets the same vendor's featured item more than once, so rather than
+rerolling each one on the spot, we block the call, collect the vendors, and then reroll each of them
+once on the next frame.
+"""
+
+REROLL_HOOK: str = "WillowGame.WillowGameViewportClient.Tick"
+
 _SHOULD_VENDORS_REROLL: bool = False
-_ignore_next_featured_item: bool = False
+_is_rerolling: bool = False
+_pending_vendors: Set[unrealsdk.UObject] = set()
+
+
+class VendorRerollInfo(NamedTuple):
+    requests: int
+    merged: int
+    batches: int
+    rerolled: int
+    items_created: int
+    largest_batch: int
+    time_spent: float
+
+
+_vendor_reroll_stats: Dict[str, Any] = {
+    "requests": 0,
+    "merged": 0,
+    "batches": 0,
+    "rerolled": 0,
+    "items_created": 0,
+    "largest_batch": 0,
+    "time_spent": 0.0,
+}
 
 
 def update_vendor_rerolling(should_reroll: bool) -> None:
@@ -591,19 +635,57 @@ def update_vendor_rerolling(should_reroll: bool) -> None:
     _SHOULD_VENDORS_REROLL = should_reroll
 
 
+def vendor_reroll_info() -> VendorRerollInfo:
+    """ Gets statistics about how many vendors we've rerolled. """
+    return VendorRerollInfo(**_vendor_reroll_stats)
+
+
+def _reroll_pending_vendors(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unrealsdk.FStruct) -> bool:
+    global _is_rerolling
+    unrealsdk.RemoveHook(REROLL_HOOK, __file__)
+
+    vendors = list(_pending_vendors)
+    _pending_vendors.clear()
+    if not vendors:
+        return True
+
+    start = time.perf_counter()
+    # Resetting sets a new featured item, which we need to let through
+    _is_rerolling = True
+    try:
+        for vendor in vendors:
+            vendor.ResetInventory()
+    finally:
+        _is_rerolling = False
+
+    _vendor_reroll_stats["batches"] += 1
+    _vendor_reroll_stats["rerolled"] += len(vendors)
+    _vendor_reroll_stats["largest_batch"] = max(_vendor_reroll_stats["largest_batch"], len(vendors))
+    _vendor_reroll_stats["time_spent"] += time.perf_counter() - start
+    return True
+
+
+def cancel_vendor_rerolls() -> None:
+    """ Drops any vendors waiting to be rerolled, since they're about to be unloaded. """
+    _pending_vendors.clear()
+
+
 @hook("WillowGame.WillowVendingMachine.SetFeaturedItem")
 def SetFeaturedItem(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unrealsdk.FStruct) -> bool:
-    global _ignore_next_featured_item
-
-    if not _SHOULD_VENDORS_REROLL or _ignore_next_featured_item:
+    if not _SHOULD_VENDORS_REROLL or _is_rerolling:
         return True
 
     # Technically, this wastefully rerolls the vendor the very first time you visit the region
     # In practice it doesn't really make a difference
 
-    _ignore_next_featured_item = True
-    caller.ResetInventory()
-    _ignore_next_featured_item = False
+    _vendor_reroll_stats["requests"] += 1
+    if caller in _pending_vendors:
+        _vendor_reroll_stats["merged"] += 1
+        return False
+
+    if not _pending_vendors:
+        unrealsdk.RunHook(REROLL_HOOK, __file__, _reroll_pending_vendors)
+    _pending_vendors.add(caller)
     return False
 
 # endregion
@@ -0,0 +1,348 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from .journal import JournalRecord
+
+try:
+    import sqlite3
+except ImportError:
+    # The sdk doesn't ship with sqlite on all installs
+    sqlite3 = None  # type: ignore
+
+"""
+An optional index of the items in every save, so that we can quickly answer questions like "which
+of my characters has this part", without having to load every single save file.
+
+Once an item's been loaded, the save files only keep the fields which the game got wrong, so they
+can't tell us an item's balance, or any of the parts the game saves fine by itself. Whenever we see
+an item in game though, we've got it's full definition data on hand, so we index that separately, as
+the item's details. The save files are always the source of truth for which items exist - rebuilding
+a save from it's file keeps the details of any items which are still in it, and drops the rest. An
+item which hasn't been seen in game since the index was turned on only has it's replaced parts
+indexed, until the next time it's loaded.
+
+The index is updated from the save writer threads, after each save gets written. Each save's row
+records the signature of the file the index was last updated from - if a write isn't based on that
+exact version of the file (e.g. because the index was turned off for a while, or the save was
+edited), the save's items get fully replaced rather than incrementally updated.
+
+This is kept outside of the saves folder, so nothing tries to load it as a save.
+"""
+
+INDEX_PATH: Path = Path(__file__).parent / "ItemIndex.sqlite3"
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS saves (
+    name TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    save TEXT NOT NULL,
+    unique_id INTEGER NOT NULL,
+    description TEXT,
+    PRIMARY KEY (save, unique_id)
+);
+CREATE TABLE IF NOT EXISTS parts (
+    save TEXT NOT NULL,
+    unique_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (save, unique_id, field)
+);
+CREATE INDEX IF NOT EXISTS parts_by_path ON parts (path);
+CREATE TABLE IF NOT EXISTS details (
+    save TEXT NOT NULL,
+    unique_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (save, unique_id, field)
+);
+CREATE INDEX IF NOT EXISTS details_by_path ON details (path);
+"""
+
+# Every part, from both the save files and the details. Replaced parts override the ones in the
+# details, so the same part is normally in both, only count it once.
+_ALL_PARTS: str = (
+    "(SELECT save, unique_id, field, path FROM parts"
+    " UNION SELECT save, unique_id, field, path FROM details)"
+)
+
+_enabled: bool = False
+_lock = threading.Lock()
+_connection: Optional["sqlite3.Connection"] = None
+# The details we last indexed for each save, so that we only need to touch the ones which changed
+_details_cache: Dict[str, Dict[int, Dict[str, Any]]] = {}
+
+
+class IndexedPart(NamedTuple):
+    save: str
+    unique_id: int
+    description: Optional[str]
+    field: str
+    path: str
+
+
+class IndexedPath(NamedTuple):
+    path: str
+    field: str
+    references: int
+    saves: List[str]
+
+
+def is_available() -> bool:
+    """ Checks if the index can be used at all, i.e. if sqlite is installed. """
+    return sqlite3 is not None
+
+
+def is_indexing() -> bool:
+    """ Checks if saves should currently be indexed. """
+    return _enabled
+
+
+def set_indexing(enabled: bool) -> None:
+    """ Changes if saves get indexed. Does nothing if sqlite isn't available. """
+    global _enabled, _connection
+
+    # Writer threads check this while holding the lock, so can't see it change half way through
+    with _lock:
+        _enabled = enabled and is_available()
+        if not _enabled:
+            _details_cache.clear()
+            if _connection is not None:
+                _connection.close()
+                _connection = None
+
+
+def _connect() -> Optional["sqlite3.Connection"]:
+    # Must be called while holding the lock. Returns None if indexing got turned off in the
+    # meantime, so that we don't reopen the database behind it's back.
+    global _connection
+    if not _enabled:
+        return None
+    if _connection is None:
+        # We only ever use this while holding the lock, so it's safe to share between threads
+        _connection = sqlite3.connect(str(INDEX_PATH), check_same_thread=False)
+        _connection.executescript(_SCHEMA)
+    return _connection
+
+
+def encode_signature(signature: Any) -> str:
+    """ Converts a file signature into the format stored in the index. """
+    return json.dumps(signature)
+
+
+def _insert_item(
+    conn: "sqlite3.Connection",
+    save: str,
+    unique_id: int,
+    data: Dict[str, Any]
+) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO items (save, unique_id, description) VALUES (?, ?, ?)",
+        (save, unique_id, data.get("_description"))
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO parts (save, unique_id, field, path) VALUES (?, ?, ?, ?)",
+        (
+            (save, unique_id, field, val)
+            for field, val in data.items()
+            if field[0] != "_" and isinstance(val, str)
+        )
+    )
+
+
+def _delete_item(conn: "sqlite3.Connection", save: str, unique_id: int) -> None:
+    conn.execute("DELETE FROM items WHERE save = ? AND unique_id = ?", (save, unique_id))
+    conn.execute("DELETE FROM parts WHERE save = ? AND unique_id = ?", (save, unique_id))
+
+
+def _delete_details(conn: "sqlite3.Connection", save: str, unique_id: int) -> None:
+    conn.execute("DELETE FROM details WHERE save = ? AND unique_id = ?", (save, unique_id))
+    _details_cache.get(save, {}).pop(unique_id, None)
+
+
+def _prune_details(conn: "sqlite3.Connection", save: str, unique_ids: Iterable[int]) -> None:
+    existing = set(unique_ids)
+    for (unique_id,) in conn.execute(
+        "SELECT DISTINCT unique_id FROM details WHERE save = ?", (save,)
+    ).fetchall():
+        if unique_id not in existing:
+            _delete_details(conn, save, unique_id)
+
+
+def update_save(
+    save: str,
+    old_signature: Optional[str],
+    new_signature: str,
+    items: Dict[int, Dict[str, Any]],
+    records: Optional[List[JournalRecord]]
+) -> None:
+    """
+    Updates the index after a save gets written.
+
+    If the save was last indexed from the file with the old signature, only applies the given
+    records, otherwise (or if they're None) replaces all of the save's items.
+
+    Safe to call from a background thread. Raises `sqlite3.Error` on failure.
+    """
+    if not _enabled:
+        return
+
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        with conn:
+            row = conn.execute("SELECT signature FROM saves WHERE name = ?", (save,)).fetchone()
+            stored_signature = None if row is None else row[0]
+
+            if stored_signature == new_signature:
+                return
+
+            if records is None or old_signature is None or stored_signature != old_signature:
+                conn.execute("DELETE FROM items WHERE save = ?", (save,))
+                conn.execute("DELETE FROM parts WHERE save = ?", (save,))
+                for unique_id, data in items.items():
+                    _insert_item(conn, save, unique_id, data)
+                _prune_details(conn, save, items.keys())
+            else:
+                for unique_id, maybe_data in records:
+                    _delete_item(conn, save, unique_id)
+                    if maybe_data is None:
+                        _delete_details(conn, save, unique_id)
+                    else:
+                        _insert_item(conn, save, unique_id, maybe_data)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO saves (name, signature) VALUES (?, ?)",
+                (save, new_signature)
+            )
+
+
+def update_details(
+    save: str,
+    unique_ids: Iterable[int],
+    details: Dict[int, Dict[str, Any]]
+) -> None:
+    """
+    Updates the full details of the given items, which should be the packed definition data of each
+    one, with all our replacements applied. Also drops the details of any items not in the given
+    list of all unique ids in the save.
+
+    Safe to call from a background thread. Raises `sqlite3.Error` on failure.
+    """
+    if not _enabled:
+        return
+
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        with conn:
+            cached = _details_cache.get(save)
+            if cached is None:
+                # Don't know what's already in there, so need to check the database
+                _prune_details(conn, save, unique_ids)
+                cached = _details_cache.setdefault(save, {})
+            else:
+                existing = set(unique_ids)
+                for unique_id in [unique_id for unique_id in cached if unique_id not in existing]:
+                    _delete_details(conn, save, unique_id)
+
+            for unique_id, data in details.items():
+                if cached.get(unique_id) == data:
+                    continue
+                _delete_details(conn, save, unique_id)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO details (save, unique_id, field, path)"
+                    " VALUES (?, ?, ?, ?)",
+                    (
+                        (save, unique_id, field, val)
+                        for field, val in data.items()
+                        if field[0] != "_" and isinstance(val, str)
+                    )
+                )
+                cached[unique_id] = data
+
+
+def get_signature(save: str) -> Optional[str]:
+    """ Gets the signature of the file a save was last indexed from, or None if it isn't. """
+    if not _enabled:
+        return None
+
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT signature FROM saves WHERE name = ?", (save,)).fetchone()
+    return None if row is None else row[0]
+
+
+def remove_missing_saves(existing_saves: Iterable[str]) -> None:
+    """ Removes all saves from the index which aren't in the given list. """
+    if not _enabled:
+        return
+
+    existing = set(existing_saves)
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        with conn:
+            for (save,) in conn.execute(
+                "SELECT name FROM saves UNION SELECT DISTINCT save FROM details"
+            ).fetchall():
+                if save in existing:
+                    continue
+                conn.execute("DELETE FROM saves WHERE name = ?", (save,))
+                conn.execute("DELETE FROM items WHERE save = ?", (save,))
+                conn.execute("DELETE FROM parts WHERE save = ?", (save,))
+                conn.execute("DELETE FROM details WHERE save = ?", (save,))
+                _details_cache.pop(save, None)
+
+
+def _like_pattern(pattern: str) -> str:
+    # `_` is a wildcard in LIKE, and is in almost every path name, so needs to be escaped
+    escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "%" + escaped + "%"
+
+
+def find_parts(pattern: str, limit: int) -> List[IndexedPart]:
+    """ Finds all indexed parts whose path contains the given (case insensitive) pattern. """
+    if not _enabled:
+        return []
+
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return []
+        rows = conn.execute(
+            "SELECT parts.save, parts.unique_id, items.description, parts.field, parts.path"
+            f" FROM {_ALL_PARTS} AS parts LEFT JOIN items"
+            " ON parts.save = items.save AND parts.unique_id = items.unique_id"
+            " WHERE parts.path LIKE ? ESCAPE '\\'"
+            " ORDER BY parts.save, parts.unique_id, parts.field LIMIT ?",
+            (_like_pattern(pattern), limit)
+        ).fetchall()
+    return [IndexedPart(*row) for row in rows]
+
+
+def iter_paths() -> List[IndexedPath]:
+    """ Gets every distinct path in the index, alongside where it's used. """
+    if not _enabled:
+        return []
+
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return []
+        rows = conn.execute(
+            "SELECT path, MIN(field), COUNT(*), GROUP_CONCAT(DISTINCT save)"
+            f" FROM {_ALL_PARTS} GROUP BY path"
+        ).fetchall()
+    return [
+        IndexedPath(path, field, references, saves.split(","))
+        for path, field, references, saves in rows
+    ]
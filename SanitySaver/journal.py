@@ -0,0 +1,139 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+"""
+An append-only journal of changes to a save's items, stored next to the save file (the snapshot).
+
+Rewriting the whole save to record a single new item gets slow once you have a lot of them, so in
+journal mode, we instead just append the items which changed. Loading replays the journal on top of
+the snapshot. Every so often the two get folded back together, by writing a new snapshot and
+deleting the journal.
+
+The journal is a text file, with one json value per line. The first line is a header, containing
+the journal version and the mtime/size of the snapshot it applies to. If the snapshot gets changed
+by anything else (e.g. you edited it), the journal's out of date, and gets ignored. Every other line
+is a record, either `[unique_id, item_data]` when an item was added or changed, or `[unique_id]`
+when it was removed.
+
+This module doesn't depend on the sdk, so that it can be used offline.
+"""
+
+JOURNAL_SUFFIX: str = ".journal"
+JOURNAL_VERSION: int = 1
+JOURNAL_VERSION_KEY: str = "journal_version"
+SNAPSHOT_KEY: str = "snapshot"
+
+# The mtime/size of a snapshot file, or None if it doesn't exist
+SnapshotSignature = Optional[Tuple[int, int]]
+# A unique id, and it's new data, or None if it was removed
+JournalRecord = Tuple[int, Optional[Dict[str, Any]]]
+
+
+def _encode_header(snapshot: SnapshotSignature) -> bytes:
+    header = {
+        JOURNAL_VERSION_KEY: JOURNAL_VERSION,
+        SNAPSHOT_KEY: None if snapshot is None else list(snapshot)
+    }
+    return json.dumps(header, separators=(",", ":")).encode("utf8") + b"\n"
+
+
+def _encode_records(records: List[JournalRecord]) -> bytes:
+    return b"".join(
+        json.dumps(
+            [unique_id] if data is None else [unique_id, data],
+            separators=(",", ":")
+        ).encode("utf8") + b"\n"
+        for unique_id, data in records
+    )
+
+
+def _header_matches(line: bytes, snapshot: SnapshotSignature) -> bool:
+    try:
+        header = json.loads(line)
+    except ValueError:
+        return False
+    if not isinstance(header, dict) or header.get(JOURNAL_VERSION_KEY) != JOURNAL_VERSION:
+        return False
+    expected = None if snapshot is None else list(snapshot)
+    return header.get(SNAPSHOT_KEY) == expected
+
+
+def read_journal(path: Path, snapshot: SnapshotSignature) -> Optional[List[JournalRecord]]:
+    """
+    Reads all records from a journal.
+
+    Returns None if the journal doesn't exist, or if it doesn't apply to the given snapshot. Any
+    records which can't be decoded (e.g. if the game crashed half way through writing one) are
+    skipped.
+    """
+    try:
+        with open(path, "rb") as file:
+            if not _header_matches(file.readline(), snapshot):
+                return None
+
+            records: List[JournalRecord] = []
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, list) or not 1 <= len(record) <= 2:
+                    continue
+                unique_id = record[0]
+                data = record[1] if len(record) == 2 else None
+                # Bools are ints too, but we never write them
+                if not isinstance(unique_id, int) or isinstance(unique_id, bool):
+                    continue
+                if data is not None and not isinstance(data, dict):
+                    continue
+                records.append((unique_id, data))
+            return records
+    except FileNotFoundError:
+        return None
+
+
+def apply_journal(items: Dict[int, Any], records: List[JournalRecord]) -> None:
+    """ Applies a list of journal records to a dict of items, in place. """
+    for unique_id, data in records:
+        if data is None:
+            items.pop(unique_id, None)
+        else:
+            items[unique_id] = data
+
+
+def append_journal(path: Path, snapshot: SnapshotSignature, records: List[JournalRecord]) -> int:
+    """
+    Appends records to a journal, creating it if needed, and flushes them to disk.
+
+    If the existing journal doesn't apply to the given snapshot, it's replaced. Returns the amount
+    of bytes written. Raises OSError on failure.
+    """
+    encoded = _encode_records(records)
+
+    try:
+        with open(path, "rb") as file:
+            is_valid = _header_matches(file.readline(), snapshot)
+    except FileNotFoundError:
+        is_valid = False
+
+    if not is_valid:
+        encoded = _encode_header(snapshot) + encoded
+        mode = "wb"
+    else:
+        mode = "a+b"
+
+    with open(path, mode) as file:
+        # If the game crashed half way through writing the last record, make sure ours starts on a
+        # new line, so that only the broken record gets skipped
+        if mode == "a+b":
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                encoded = b"\n" + encoded
+
+        file.write(encoded)
+        file.flush()
+        os.fsync(file.fileno())
+
+    return len(encoded)
@@ -0,0 +1,175 @@
+import unrealsdk
+import json
+import random
+import sys
+import tempfile
+from collections import OrderedDict
+from typing import IO, Dict, NamedTuple, Optional
+
+from .helpers import (DefDataTuple, expand_item_definition_data, expand_weapon_definition_data,
+                      pack_definition_tuple, unpack_item_definition_data,
+                      unpack_weapon_definition_data)
+
+"""
+Every item which drops in the world gets turned into a memento when you leave the map, so a long
+farming run can end up with thousands of them - almost none of which ever get picked up again.
+
+Rather than packing every item as it gets turned into a memento, we just hold onto it's expanded
+definition data. All parts get kept alive as items are created, so these objects are safe to hold
+onto across map changes. We only need the actual part names if we run out of room in memory, at
+which point the oldest mementos get packed and spilled into a temporary file.
+"""
+
+MAX_IN_MEMORY_MEMENTOS: int = 2000
+
+
+class _Memento(NamedTuple):
+    parts: DefDataTuple
+    is_weapon: bool
+
+
+class _SpilledMemento(NamedTuple):
+    offset: int
+    length: int
+    is_weapon: bool
+
+
+class MementoInfo(NamedTuple):
+    in_memory: int
+    in_memory_bytes: int
+    spilled: int
+    spilled_bytes: int
+    spill_file_bytes: int
+    total_spilled: int
+
+
+class MementoStore:
+    """
+    Stores the definition data of items which have been turned into mementos, keyed by their unique
+    id, so they can be restored once the memento gets turned back into an item.
+
+    Holds up to `max_in_memory` items in memory, after which the oldest either get spilled to disk,
+    or just forgotten if `spill` is False.
+    """
+    max_in_memory: int
+    spill: bool
+
+    _in_memory: "OrderedDict[int, _Memento]"
+    _spilled: Dict[int, _SpilledMemento]
+    _spill_file: Optional[IO[bytes]]
+    _total_spilled: int
+
+    def __init__(self, max_in_memory: int = MAX_IN_MEMORY_MEMENTOS, spill: bool = True) -> None:
+        self.max_in_memory = max_in_memory
+        self.spill = spill
+
+        self._in_memory = OrderedDict()
+        self._spilled = {}
+        self._spill_file = None
+        self._total_spilled = 0
+
+    def __contains__(self, unique_id: int) -> bool:
+        return unique_id in self._in_memory or unique_id in self._spilled
+
+    def add_item(self, item: unrealsdk.UObject) -> None:
+        """
+        Adds a new item to the store, rerolling it's unique id if needed.
+        """
+        def_data = item.DefinitionData
+        while def_data.UniqueId in self:
+            def_data.UniqueId = random.randrange(-0x80000000, 0x80000000)
+
+        is_weapon = item.Class.Name == "WillowWeapon"
+        parts = (
+            expand_weapon_definition_data(def_data)
+            if is_weapon else
+            expand_item_definition_data(def_data)
+        )
+        self._in_memory[def_data.UniqueId] = _Memento(parts, is_weapon)
+
+        while len(self._in_memory) > self.max_in_memory:
+            unique_id, memento = self._in_memory.popitem(last=False)
+            if self.spill:
+                self._spill(unique_id, memento)
+
+    def _spill(self, unique_id: int, memento: _Memento) -> None:
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix="SanitySaverMementos")
+
+        encoded = json.dumps(
+            pack_definition_tuple(memento.parts, memento.is_weapon),
+            separators=(",", ":")
+        ).encode("utf8")
+
+        offset = self._spill_file.seek(0, 2)
+        self._spill_file.write(encoded)
+        self._spilled[unique_id] = _SpilledMemento(offset, len(encoded), memento.is_weapon)
+        self._total_spilled += 1
+
+    def _unspill(self, unique_id: int) -> Optional[_Memento]:
+        spilled = self._spilled.pop(unique_id, None)
+        if spilled is None or self._spill_file is None:
+            return None
+
+        self._spill_file.seek(spilled.offset)
+        data = json.loads(self._spill_file.read(spilled.length))
+        parts = (
+            unpack_weapon_definition_data(data)
+            if spilled.is_weapon else
+            unpack_item_definition_data(data)
+        )
+
+        # Nothing left in the file is needed, so might as well start again
+        if not self._spilled:
+            self._spill_file.truncate(0)
+
+        return _Memento(parts, spilled.is_weapon)
+
+    def pop_definition_data(self, def_data: unrealsdk.FStruct, is_weapon: bool) -> DefDataTuple:
+        """
+        Removes an item from the store, and returns what it's definition data tuple should be. If
+        the item isn't in the store, returns it's current definition data.
+        """
+        unique_id = def_data.UniqueId
+        memento = self._in_memory.pop(unique_id, None)
+        if memento is None:
+            memento = self._unspill(unique_id)
+
+        if memento is None or memento.is_weapon != is_weapon:
+            if is_weapon:
+                return expand_weapon_definition_data(def_data)
+            else:
+                return expand_item_definition_data(def_data)
+
+        return memento.parts
+
+    def clear(self) -> None:
+        """ Removes all items from the store. """
+        self._in_memory.clear()
+        self._spilled.clear()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def info(self) -> MementoInfo:
+        """ Gets statistics about what's currently in the store. """
+        in_memory_bytes = sys.getsizeof(self._in_memory) + sum(
+            sys.getsizeof(memento) + sys.getsizeof(memento.parts)
+            for memento in self._in_memory.values()
+        )
+
+        spill_file_bytes = 0
+        if self._spill_file is not None:
+            spill_file_bytes = self._spill_file.seek(0, 2)
+
+        return MementoInfo(
+            in_memory=len(self._in_memory),
+            in_memory_bytes=in_memory_bytes,
+            spilled=len(self._spilled),
+            spilled_bytes=sum(spilled.length for spilled in self._spilled.values()),
+            spill_file_bytes=spill_file_bytes,
+            total_spilled=self._total_spilled
+        )
+
+
+memento_store: MementoStore = MementoStore()
@@ -1,9 +1,12 @@
 import unrealsdk
-import traceback
-from typing import Any, Callable, List
+import functools
+from pathlib import Path
+from typing import Any, Callable, Dict, List
 
-from .compression_handler import dump, load
+from .compression_handler import TEMP_SUFFIX, delete_or_raise, load_or_raise, write_atomic
+from .journal import JOURNAL_SUFFIX
 from .save_manager import _SAVES_DIR, SAVE_VERSION, SAVE_VERSION_KEY
+from .save_writer import WriteJob, schedule_background_pass
 
 
 def _migrate_v1(data: Any) -> Any:
@@ -32,46 +35,82 @@ MIGRATION_FUNCTIONS: List[Callable[[Any], Any]] = [
 ]
 
 
-def migrate_all() -> None:
-    """ Migrates saves from older versions of Sanity Saver up to the current one. """
-    for file in _SAVES_DIR.iterdir():
-        if not file.is_file():
-            continue
+_failed_migrations: List[str] = []
 
-        data = load(file)
 
-        version: int
+def _migrate_or_raise(path: Path) -> None:
+    # Any temp files are left over from a write which got interrupted, the real file still has the
+    # old data. Since this job runs after any other writes to the file, they can't be in use.
+    for suffix in ("", ".gz"):
         try:
-            version = data[SAVE_VERSION_KEY]
-        except KeyError:
-            version = 1
+            path.with_name(path.name + suffix + TEMP_SUFFIX).unlink()
+        except FileNotFoundError:
+            pass
+
+    try:
+        data = load_or_raise(path)
+    except FileNotFoundError:
+        return
+
+    version: int
+    try:
+        version = data[SAVE_VERSION_KEY]
+    except KeyError:
+        version = 1
+
+    if version >= SAVE_VERSION:
+        return
+
+    original_data = data
+    try:
+        for i in range(version, SAVE_VERSION):
+            data = MIGRATION_FUNCTIONS[i - 1](data)
+    except Exception:
+        _failed_migrations.append(path.name)
+        (_SAVES_DIR / "Backup").mkdir(exist_ok=True)
+        write_atomic(original_data, _SAVES_DIR / "Backup" / path.name)
+        delete_or_raise(path)
+        raise
+
+    write_atomic(data, path)
+
+
+def _show_failed_migrations() -> None:
+    for name in _failed_migrations:
+        # I don't want to require UserFeedback just to show this error message
+        # It would simplify this a bit to just:
+        #   `TrainingBox("Sanity Saver", f"Failed...", PausesGame=True).Show()`
+        unrealsdk.GetEngine().GamePlayers[0].Actor.GFxUIManager.ShowTrainingDialog(
+            f"Failed to migrate save {name}. It has been moved to a backup location.",
+            "Sanity Saver",
+            0,
+            0,
+            False
+        ).ApplyLayout()
+    _failed_migrations.clear()
+
 
-        if version >= SAVE_VERSION:
+def migrate_all() -> None:
+    """
+    Migrates saves from older versions of Sanity Saver up to the current one. Runs in the
+    background, each file is migrated on it's own, so if interrupted, the next call picks up from
+    wherever this one stopped.
+    """
+    jobs: Dict[Path, WriteJob] = {}
+
+    for file in _SAVES_DIR.iterdir():
+        if not file.is_file():
             continue
 
-        original_data = data
-        try:
-            for i in range(version, SAVE_VERSION):
-                data = MIGRATION_FUNCTIONS[i - 1](data)
-        except Exception:
-            # I don't want to require UserFeedback just to show this error message
-            # It would simplify this a bit to just:
-            #   `TrainingBox("Sanity Saver", f"Failed...", PausesGame=True).Show()`
-            unrealsdk.GetEngine().GamePlayers[0].Actor.GFxUIManager.ShowTrainingDialog(
-                f"Failed to migrate save {file.name}. It has been moved to a backup location.",
-                "Sanity Saver",
-                0,
-                0,
-                False
-            ).ApplyLayout()
-
-            unrealsdk.Log(f"[Sanity Saver] Exception thrown while migrating {file.name}:")
-            for line in traceback.format_exc().split("\n"):
-                unrealsdk.Log(line)
-
-            (_SAVES_DIR / "Backup").mkdir(exist_ok=True)
-            dump(original_data, _SAVES_DIR / "Backup" / file.name)
-            file.unlink()
+        # Journals only store items, which are always in the latest format
+        if file.suffix == JOURNAL_SUFFIX:
             continue
 
-        dump(data, file)
+        path = file
+        if path.suffix == TEMP_SUFFIX:
+            path = path.with_suffix("")
+        if path.suffix == ".gz":
+            path = path.with_suffix("")
+        jobs[path] = functools.partial(_migrate_or_raise, path)
+
+    schedule_background_pass("Migrating saves", jobs, _show_failed_migrations)
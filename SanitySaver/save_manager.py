@@ -1,15 +1,23 @@
 from __future__ import annotations
 
 import unrealsdk
-import json
+import functools
 import random
+import threading
+import time
 from pathlib import Path
-from typing import ClassVar, Dict, Union, cast
-
-from .compression_handler import delete, dump, load
-from .helpers import (DefDataTuple, expand_item_definition_data, expand_weapon_definition_data,
-                      pack_item_definition_data, pack_weapon_definition_data,
+from typing import ClassVar, Dict, List, NamedTuple, Optional, Set, Union, cast
+
+from . import item_index
+from .compression_handler import (FileSignature, delete_or_raise, file_signature, is_journaling,
+                                  journal_path, load, load_or_raise, snapshot_signature,
+                                  write_atomic)
+from .helpers import (DefDataTuple, end_pack_memo_save, expand_item_definition_data,
+                      expand_weapon_definition_data, pack_definition_data, safe_pathname,
                       unpack_item_definition_data, unpack_weapon_definition_data)
+from .journal import JOURNAL_SUFFIX, JournalRecord, append_journal, apply_journal, read_journal
+from .save_writer import (WriteJob, schedule_background_pass, schedule_job, schedule_write,
+                          wait_for_writes)
 
 SAVE_VERSION: int = 2
 SAVE_VERSION_KEY: str = "save_version"
@@ -24,6 +32,81 @@ ItemData = Dict[str, Union[str, int, None]]
 ItemDataDict = Dict[int, ItemData]
 
 
+# Journals get folded back into the save once they have more records than this, or than the save
+# has items, whichever's larger
+MIN_COMPACTION_RECORDS: int = 500
+
+
+class _CachedSave(NamedTuple):
+    signature: FileSignature
+    items: ItemDataDict
+    journal_records: int = 0
+
+
+"""
+Every map load, and every time you open the bank or stash, we create a new save manager and reload
+the whole file - which can get slow on characters with a lot of items. Since we're normally the only
+thing writing to these files, we keep the last state we loaded or wrote for each file, and only go
+back to disk if the file's changed since then (e.g. because you edited it).
+
+Item dicts are shared between the cache and all save managers loaded from it, so must never be
+modified in place, only replaced.
+
+Since writes happen in the background, entries get removed while a file's being written, then added
+back once it's done. Make sure to wait for any writes to finish before looking at the cache.
+"""
+_save_cache: Dict[Path, _CachedSave] = {}
+_save_cache_hits: int = 0
+_save_cache_misses: int = 0
+
+
+class SaveCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+
+
+def save_cache_info() -> SaveCacheInfo:
+    """ Gets statistics about the parsed save cache. """
+    return SaveCacheInfo(_save_cache_hits, _save_cache_misses, len(_save_cache))
+
+
+def clear_save_cache() -> None:
+    """ Clears the parsed save cache, forcing the next load of each file to go back to disk. """
+    global _save_cache_hits, _save_cache_misses
+    _save_cache.clear()
+    _save_cache_hits = 0
+    _save_cache_misses = 0
+
+
+class SaveWriteStats(NamedTuple):
+    writes: int
+    skipped_writes: int
+    items_serialized: int
+    bytes_written: int
+    # Time spent on the main thread, i.e. the time the game was blocked for
+    time_spent: float
+    # Time spent actually serializing, compressing, and writing files
+    background_time_spent: float
+
+
+_write_stats: SaveWriteStats = SaveWriteStats(0, 0, 0, 0, 0.0, 0.0)
+_write_stats_lock = threading.Lock()
+
+
+def _add_write_stats(**deltas: Union[int, float]) -> None:
+    global _write_stats
+    with _write_stats_lock:
+        _write_stats = _write_stats._replace(**{
+            field: getattr(_write_stats, field) + delta for field, delta in deltas.items()
+        })
+
+
+def save_write_stats() -> SaveWriteStats:
+    """ Gets statistics about all the save writes done so far. """
+    return _write_stats
+
+
 class SaveManager:
     """
     Class that deals with our custom item saving. By default sets up an empty save, call `load()`
@@ -39,17 +122,111 @@ class SaveManager:
     items: ItemDataDict
     ITEMS_KEY: ClassVar[str] = "items"
 
+    """
+    Most writes happen after loading into a map or closing the bank, where nothing's normally
+    changed since last time. To avoid rewriting the whole file in these cases, we keep track of what
+    we think is on disk (the baseline), and which items were added, changed, or removed since then.
+
+    The baseline is normally the cached save, so a fresh save manager can still tell it's rebuilt
+    exactly the same save, without having to load it first. `items` should only be modified through
+    the methods on this class, so that the dirty set stays up to date.
+    """
+    _baseline: Optional[_CachedSave]
+    _has_baseline: bool
+    _dirty: Set[int]
+
+    """
+    The save files only store the fields which the game gets wrong, but the item index wants to know
+    about the rest of the item too. While indexing, whenever an item gets added from the game, we
+    also keep it's full packed definition data, which gets sent to the index after the next write.
+    """
+    _details: ItemDataDict
+
     def __init__(self, save_name: str, is_bank: bool = False) -> None:
         file_name = Path(save_name).stem + ("_Bank" if is_bank else "") + ".json"
         self.file_path = _SAVES_DIR / Path(file_name)
 
         self.items = {}
+        self._baseline = None
+        self._has_baseline = False
+        self._dirty = set()
+        self._details = {}
+
+    def _get_baseline(self) -> Optional[_CachedSave]:
+        # Looked up lazily, since save managers are often created before the file gets loaded
+        if not self._has_baseline:
+            wait_for_writes(self.file_path)
+            self._baseline = _save_cache.get(self.file_path)
+            self._has_baseline = True
+        return self._baseline
+
+    def _set_baseline(self, baseline: Optional[_CachedSave]) -> None:
+        self._baseline = baseline
+        self._has_baseline = True
+        self._dirty.clear()
+
+    def _set_item(self, unique_id: int, data: ItemData) -> None:
+        self.items[unique_id] = data
+
+        baseline = self._get_baseline()
+        if baseline is None:
+            return
+        old_data = baseline.items.get(unique_id)
+        if old_data is data or old_data == data:
+            self._dirty.discard(unique_id)
+        else:
+            self._dirty.add(unique_id)
+
+    def _mark_removed(self, unique_id: int) -> None:
+        baseline = self._get_baseline()
+        if baseline is not None and unique_id in baseline.items:
+            self._dirty.add(unique_id)
+        else:
+            self._dirty.discard(unique_id)
+
+    def _record_details(self, def_data: unrealsdk.FStruct, is_weapon: bool) -> None:
+        if not item_index.is_indexing():
+            return
+        unique_id = def_data.UniqueId
+        if unique_id not in self.items:
+            return
+
+        details = pack_definition_data(def_data, is_weapon)
+        del details["UniqueId"]
+        # Our replacements are the parts the item's actually meant to have
+        details.update(self.items[unique_id])
+        self._details[unique_id] = details
+
+    def has_changes(self) -> bool:
+        """ Checks if the items have changed since they were last loaded or written. """
+        baseline = self._get_baseline()
+        if baseline is None:
+            return True
+        if self._dirty:
+            return True
+        # Catches items which were in the baseline, but which were just never re-added
+        if self.items.keys() != baseline.items.keys():
+            return True
+        return baseline.signature != file_signature(self.file_path)
 
     def load(self) -> None:
         """
         Loads all save data from disk, or loads empty save data if the file does not exist or is
         malformed.
+
+        If the file hasn't changed since it was last loaded or written, uses the cached copy instead.
         """
+        global _save_cache_hits, _save_cache_misses
+
+        wait_for_writes(self.file_path)
+        cached = _save_cache.get(self.file_path)
+        if cached is not None and cached.signature == file_signature(self.file_path):
+            _save_cache_hits += 1
+            self.items = dict(cached.items)
+            self._set_baseline(cached)
+            return
+        _save_cache_misses += 1
+
         try:
             data = load(self.file_path)
             # JSON doesn't allow int keys, dumping converts them to strings, we need to convert back
@@ -57,22 +234,173 @@ class SaveManager:
                 int(unique_id): val for unique_id, val in data.get(self.ITEMS_KEY, {}).items()
             }
 
-        except (OSError, json.JSONDecodeError):
+            # Loading may have converted the file's compression, so need to get the signature after
+            records = read_journal(
+                journal_path(self.file_path),
+                snapshot_signature(self.file_path)
+            )
+            if records is not None:
+                apply_journal(self.items, records)
+
+        except (OSError, ValueError):
             self.items = {}
+            _save_cache.pop(self.file_path, None)
+            self._set_baseline(None)
+            return
+
+        cached = _CachedSave(
+            file_signature(self.file_path),
+            dict(self.items),
+            0 if records is None else len(records)
+        )
+        _save_cache[self.file_path] = cached
+        self._set_baseline(cached)
 
     def write(self) -> None:
-        """ Writes all save data to disk, overwriting existing files. May delete files if empty. """
-        if len(self.items) == 0:
-            delete(self.file_path)
-        else:
-            dump({
-                SAVE_VERSION_KEY: SAVE_VERSION,
-                self.ITEMS_KEY: self.items
-            }, self.file_path)
+        """
+        Writes all save data to disk, overwriting existing files. May delete files if empty. If
+        journaling is on, only appends the items which changed instead, where possible.
+
+        Does nothing if nothing's changed since the save was last loaded or written. The actual
+        write happens in the background, any later loads automatically wait for it to finish.
+        """
+        end_pack_memo_save()
+
+        start_time = time.perf_counter()
+        if not self.has_changes():
+            # We may still have seen parts of the items which aren't indexed yet
+            if self._details and item_index.is_indexing():
+                schedule_job(
+                    self.file_path,
+                    functools.partial(
+                        item_index.update_details,
+                        self.file_path.stem,
+                        list(self.items.keys()),
+                        dict(self._details)
+                    )
+                )
+            _add_write_stats(skipped_writes=1, time_spent=time.perf_counter() - start_time)
+            return
+
+        records = None
+        if is_journaling() or item_index.is_indexing():
+            records = self._get_change_records()
+
+        journal_records = records
+        if not is_journaling() or len(self.items) == 0 or not self._should_append(records):
+            journal_records = None
+
+        self._schedule_write(journal_records, records)
+        _add_write_stats(time_spent=time.perf_counter() - start_time)
+
+    def compact(self) -> None:
+        """ Rewrites the whole save file, folding it's journal back into it. """
+        self._schedule_write(None, None)
+
+    def _get_change_records(self) -> Optional[List[JournalRecord]]:
+        # We can only describe the changes if we know exactly what they're being applied on top of
+        wait_for_writes(self.file_path)
+        baseline = self._get_baseline()
+        if baseline is None or baseline.signature != file_signature(self.file_path):
+            return None
+
+        records: List[JournalRecord] = [
+            (unique_id, self.items.get(unique_id)) for unique_id in self._dirty
+        ]
+        records.extend(
+            (unique_id, None)
+            for unique_id in baseline.items.keys() - self.items.keys()
+            if unique_id not in self._dirty
+        )
+        return records
+
+    def _should_append(self, records: Optional[List[JournalRecord]]) -> bool:
+        baseline = self._get_baseline()
+        if records is None or baseline is None:
+            return False
+        # Once the journal gets long enough, it's faster to just load the whole save again
+        total_records = baseline.journal_records + len(records)
+        return total_records <= max(MIN_COMPACTION_RECORDS, len(self.items))
+
+    def _schedule_write(
+        self,
+        journal_records: Optional[List[JournalRecord]],
+        index_records: Optional[List[JournalRecord]]
+    ) -> None:
+        # Items are never modified in place, so a shallow copy is enough to take a snapshot
+        file_path = self.file_path
+        items = dict(self.items)
+        baseline = self._get_baseline()
+        existing_journal_records = 0 if baseline is None else baseline.journal_records
+        old_index_signature = (
+            None
+            if baseline is None else
+            item_index.encode_signature(baseline.signature)
+        )
+        details = {
+            unique_id: data for unique_id, data in self._details.items() if unique_id in items
+        }
+
+        def write_job() -> None:
+            job_start_time = time.perf_counter()
+            try:
+                if journal_records is not None:
+                    bytes_written = append_journal(
+                        journal_path(file_path),
+                        snapshot_signature(file_path),
+                        journal_records
+                    )
+                elif len(items) == 0:
+                    delete_or_raise(file_path)
+                    bytes_written = 0
+                else:
+                    bytes_written = write_atomic({
+                        SAVE_VERSION_KEY: SAVE_VERSION,
+                        self.ITEMS_KEY: items
+                    }, file_path)
+            except OSError:
+                _save_cache.pop(file_path, None)
+                raise
+
+            # We know exactly what's in the file now, so the next load can skip reading it
+            if journal_records is None:
+                total_journal_records = 0
+                items_serialized = len(items)
+            else:
+                total_journal_records = existing_journal_records + len(journal_records)
+                items_serialized = len(journal_records)
+            signature = file_signature(file_path)
+            _save_cache[file_path] = _CachedSave(signature, items, total_journal_records)
+
+            _add_write_stats(
+                writes=1,
+                items_serialized=items_serialized,
+                bytes_written=bytes_written,
+                background_time_spent=time.perf_counter() - job_start_time
+            )
+
+            # The save's already safely written, so do this last, if it fails we just log it
+            item_index.update_save(
+                file_path.stem,
+                old_index_signature,
+                item_index.encode_signature(signature),
+                items,
+                index_records
+            )
+            item_index.update_details(file_path.stem, items.keys(), details)
+
+        _save_cache.pop(file_path, None)
+        schedule_write(file_path, write_job)
+
+        self._has_baseline = False
+        self._dirty.clear()
 
     def clear(self) -> None:
         """ Clears all save data. """
+        for unique_id in self.items:
+            self._mark_removed(unique_id)
         self.items.clear()
+        self._details.clear()
 
     def _add_new_item_from_def(self, def_data: unrealsdk.FStruct, is_weapon: bool) -> None:
         while def_data.UniqueId in self.items:
@@ -82,19 +410,18 @@ class SaveManager:
             "_description": self._get_description(def_data, is_weapon),
             "_inital": True
         }
-        if is_weapon:
-            packed.update(pack_weapon_definition_data(def_data))
-        else:
-            packed.update(pack_item_definition_data(def_data))
+        packed.update(pack_definition_data(def_data, is_weapon))
         unique_id = cast(int, packed.pop("UniqueId"))
 
-        self.items[unique_id] = packed
+        self._set_item(unique_id, packed)
 
     def add_new_item(self, item: unrealsdk.UObject) -> None:
         """
         Adds a new item to the save, rerolling it's unique id if needed.
         """
-        self._add_new_item_from_def(item.DefinitionData, item.Class.Name == "WillowWeapon")
+        is_weapon = item.Class.Name == "WillowWeapon"
+        self._add_new_item_from_def(item.DefinitionData, is_weapon)
+        self._record_details(item.DefinitionData, is_weapon)
 
     def add_existing_item(self, item: unrealsdk.UObject, existing_save: SaveManager) -> None:
         """
@@ -110,7 +437,8 @@ class SaveManager:
         if known_parts is None or unique_id in self.items:
             self.add_new_item(item)
         else:
-            self.items[unique_id] = known_parts
+            self._set_item(unique_id, known_parts)
+            self._record_details(item.DefinitionData, item.Class.Name == "WillowWeapon")
 
     def update_item(
         self,
@@ -130,14 +458,12 @@ class SaveManager:
         if known_parts is None or unique_id in self.items:
             self._add_new_item_from_def(def_data, is_weapon)
         elif "_inital" not in known_parts:
-            self.items[unique_id] = known_parts
+            self._set_item(unique_id, known_parts)
         else:
             replacements: ItemData = {
                 "_description": known_parts["_description"]
             }
 
-            obj = unrealsdk.GetEngine()  # Just need an arbitrary object
-
             for field, val in known_parts.items():
                 if field[0] == "_":
                     continue
@@ -148,12 +474,14 @@ class SaveManager:
 
                 actual_val = getattr(def_data, field)
                 if isinstance(actual_val, unrealsdk.UObject):
-                    actual_val = obj.PathName(actual_val)
+                    actual_val = safe_pathname(actual_val)
 
                 if actual_val != val:
                     replacements[field] = val
 
-            self.items[unique_id] = replacements
+            self._set_item(unique_id, replacements)
+
+        self._record_details(def_data, is_weapon)
 
     def fix_definition_data(self, def_data: unrealsdk.FStruct, is_weapon: bool) -> DefDataTuple:
         """
@@ -165,23 +493,24 @@ class SaveManager:
             else:
                 return expand_item_definition_data(def_data)
 
+        parts = pack_definition_data(def_data, is_weapon)
+        parts.update(self.items[def_data.UniqueId])
         if is_weapon:
-            parts = pack_weapon_definition_data(def_data)
-            parts.update(self.items[def_data.UniqueId])
             return unpack_weapon_definition_data(parts)
         else:
-            parts = pack_item_definition_data(def_data)
-            parts.update(self.items[def_data.UniqueId])
             return unpack_item_definition_data(parts)
 
     def remove_item(self, item: unrealsdk.UObject) -> None:
         """
         Removes an item from the save, if we're currently saving it.
         """
+        unique_id = item.DefinitionData.UniqueId
         try:
-            del self.items[item.DefinitionData.UniqueId]
+            del self.items[unique_id]
         except KeyError:
-            pass
+            return
+        self._details.pop(unique_id, None)
+        self._mark_removed(unique_id)
 
     @staticmethod
     def _get_description(def_data: unrealsdk.FStruct, is_weapon: bool) -> str:
@@ -212,3 +541,66 @@ class SaveManager:
                     description += " " + def_name
 
         return description
+
+
+def compact_journals() -> None:
+    """ Folds every journal back into it's save file. """
+    for journal in _SAVES_DIR.glob("*" + JOURNAL_SUFFIX):
+        # `Saves/<name>.json.journal` -> `<name>`
+        save = SaveManager(Path(Path(journal.stem).stem).name)
+        save.load()
+        save.compact()
+
+
+def _index_or_raise(path: Path) -> None:
+    if item_index.get_signature(path.stem) == item_index.encode_signature(file_signature(path)):
+        return
+
+    try:
+        data = load_or_raise(path)
+    except FileNotFoundError:
+        data = {}
+    items = {int(unique_id): val for unique_id, val in data.get(SaveManager.ITEMS_KEY, {}).items()}
+
+    records = read_journal(journal_path(path), snapshot_signature(path))
+    if records is not None:
+        apply_journal(items, records)
+
+    # Loading may have converted the file, so need to get the signature after
+    item_index.update_save(
+        path.stem,
+        None,
+        item_index.encode_signature(file_signature(path)),
+        items,
+        None
+    )
+
+
+def rebuild_item_index() -> None:
+    """
+    Brings the item index up to date with every save, in the background. Saves which haven't changed
+    since they were last indexed are skipped.
+    """
+    if not item_index.is_indexing():
+        return
+
+    paths: Set[Path] = set()
+    for file in _SAVES_DIR.glob("*.json*"):
+        if file.suffix == ".gz":
+            file = file.with_suffix("")
+        if file.suffix == ".json":
+            paths.add(file)
+
+    item_index.remove_missing_saves(path.stem for path in paths)
+
+    jobs: Dict[Path, WriteJob] = {path: functools.partial(_index_or_raise, path) for path in paths}
+    schedule_background_pass("Indexing saves", jobs)
+
+
+def update_indexing(index: bool) -> None:
+    """ Changes if saves get added to the item index. If turning it on, indexes all saves. """
+    if index and not item_index.is_available():
+        unrealsdk.Log("[SanitySaver] Can't index saves, sqlite3 isn't available in this install")
+
+    item_index.set_indexing(index)
+    rebuild_item_index()
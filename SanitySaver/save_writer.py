@@ -0,0 +1,280 @@
+import unrealsdk
+import atexit
+import os
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+"""
+Serializing and compressing a save with a lot of items can take long enough to cause a noticable
+hitch, so we do all writes on background threads instead.
+
+Writes are queued per file, and only one thread works on a given file at a time. If a file gets
+written again before the last write to it started, we normally only need to write the latest
+version, so the old one is just dropped. Jobs which don't replace the whole file (e.g. converting
+it) are never dropped, they just run in order with everything else for the same file. Anything
+reading a file must call `wait_for_writes` first, to make sure it doesn't see an old version.
+
+Background passes can queue a job for every single file, so waiting for everything to finish can
+take seconds. When we only care that the latest save data has hit the disk, e.g. when switching
+saves, `flush_save_writes` just waits for the jobs which replace whole files.
+"""
+
+WriteJob = Callable[[], None]
+
+
+class _QueuedJob(NamedTuple):
+    job: WriteJob
+    replaceable: bool
+
+# Most of the work is file io and zlib, which both release the GIL, so a few threads still helps
+WORKER_COUNT: int = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+class _SaveWriter:
+    _cond: threading.Condition
+    _pending: Dict[Path, List[_QueuedJob]]
+    _in_flight: Set[Path]
+    # How many replaceable jobs for each file are either pending or running
+    _replaceable: Dict[Path, int]
+    _errors: List[str]
+    _threads: List[threading.Thread]
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._in_flight = set()
+        self._replaceable = {}
+        self._errors = []
+        self._threads = []
+
+    def schedule(self, path: Path, job: WriteJob, replaceable: bool) -> None:
+        with self._cond:
+            queue = self._pending.setdefault(path, [])
+            if replaceable:
+                kept = [queued for queued in queue if not queued.replaceable]
+                self._replaceable[path] = self._replaceable.get(path, 0) - (len(queue) - len(kept))
+                queue[:] = kept
+                self._replaceable[path] += 1
+            queue.append(_QueuedJob(job, replaceable))
+
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < WORKER_COUNT:
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f"SanitySaverWriter{len(self._threads)}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+            self._cond.notify_all()
+        self.log_errors()
+
+    def wait_for(self, path: Path) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: path not in self._pending and path not in self._in_flight)
+        self.log_errors()
+
+    def flush(self) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending and not self._in_flight)
+        self.log_errors()
+
+    def flush_replaceable(self) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._replaceable)
+        self.log_errors()
+
+    def _next_path(self) -> Optional[Path]:
+        # Saving shouldn't have to wait for a background pass to get through every other file first
+        fallback = None
+        for path, queue in self._pending.items():
+            if path in self._in_flight:
+                continue
+            if any(queued.replaceable for queued in queue):
+                return path
+            if fallback is None:
+                fallback = path
+        return fallback
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._next_path() is not None)
+                path = self._next_path()
+                assert path is not None
+                jobs = self._pending.pop(path)
+                self._in_flight.add(path)
+
+            try:
+                for queued in jobs:
+                    try:
+                        queued.job()
+                    except Exception:
+                        # Logging isn't safe off the main thread, save it for later
+                        with self._cond:
+                            self._errors.append(traceback.format_exc())
+                    finally:
+                        if queued.replaceable:
+                            with self._cond:
+                                self._replaceable[path] -= 1
+                                if self._replaceable[path] == 0:
+                                    del self._replaceable[path]
+                                self._cond.notify_all()
+            finally:
+                with self._cond:
+                    self._in_flight.discard(path)
+                    self._cond.notify_all()
+
+    def log_errors(self) -> None:
+        with self._cond:
+            errors = self._errors
+            self._errors = []
+
+        for error in errors:
+            unrealsdk.Log("[SanitySaver] Exception thrown while writing save:")
+            for line in error.split("\n"):
+                unrealsdk.Log(line)
+
+
+_writer = _SaveWriter()
+
+
+def schedule_write(path: Path, job: WriteJob) -> None:
+    """
+    Schedules a job which writes the whole of the given file, replacing any other such job for the
+    same file which hasn't started yet. The job runs on a background thread, so must not call into
+    unrealsdk.
+    """
+    _writer.schedule(path, job, True)
+
+
+def schedule_job(path: Path, job: WriteJob) -> None:
+    """
+    Schedules a job which touches the given file, but doesn't replace it, so which must run after
+    every earlier write to it. The job runs on a background thread, so must not call into unrealsdk.
+    """
+    _writer.schedule(path, job, False)
+
+
+def wait_for_writes(path: Path) -> None:
+    """ Blocks until there are no more pending writes to the given file. """
+    _writer.wait_for(path)
+
+
+def flush_writes() -> None:
+    """ Blocks until all pending writes have finished, including all background passes. """
+    _writer.flush()
+
+
+def flush_save_writes() -> None:
+    """
+    Blocks until all pending writes of save data have finished. Unlike `flush_writes`, doesn't wait
+    for background passes, other than for the jobs which are queued ahead of one of these writes.
+    """
+    _writer.flush_replaceable()
+
+
+# The threads are daemons so they can't keep the game open, make sure they finish on a clean exit
+atexit.register(flush_writes)
+
+
+"""
+Some operations need to touch every save at once, e.g. changing the compression setting. These are
+run as background passes, which queue a job for each file, and report their progress in console
+while the game keeps running. Each job should leave it's file fully updated, so that if the game
+gets closed part way through, the next pass can just pick up where this one left off.
+"""
+
+PROGRESS_HOOK: str = "WillowGame.WillowGameViewportClient.Tick"
+PROGRESS_INTERVAL: float = 1.0
+
+
+class _BackgroundPass:
+    name: str
+    total: int
+    done: int
+    failed: int
+    on_finish: Optional[Callable[[], None]]
+    last_logged: float
+    has_logged: bool
+    _lock: threading.Lock
+
+    def __init__(self, name: str, total: int, on_finish: Optional[Callable[[], None]]) -> None:
+        self.name = name
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.on_finish = on_finish
+        # Quick passes shouldn't spam console, only start logging once one takes a while
+        self.last_logged = time.perf_counter()
+        self.has_logged = False
+        self._lock = threading.Lock()
+
+    def wrap(self, job: WriteJob) -> WriteJob:
+        def wrapped_job() -> None:
+            try:
+                job()
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.done += 1
+        return wrapped_job
+
+
+_passes: List[_BackgroundPass] = []
+
+
+def _progress_tick(caller: unrealsdk.UObject, function: unrealsdk.UFunction, params: unrealsdk.FStruct) -> bool:
+    _writer.log_errors()
+
+    now = time.perf_counter()
+    for bg_pass in list(_passes):
+        if bg_pass.done >= bg_pass.total:
+            _passes.remove(bg_pass)
+            if bg_pass.has_logged or bg_pass.failed > 0:
+                unrealsdk.Log(
+                    f"[SanitySaver] {bg_pass.name}: finished {bg_pass.total} files,"
+                    f" {bg_pass.failed} failed"
+                )
+            if bg_pass.on_finish is not None:
+                bg_pass.on_finish()
+
+        elif now - bg_pass.last_logged >= PROGRESS_INTERVAL:
+            bg_pass.last_logged = now
+            bg_pass.has_logged = True
+            unrealsdk.Log(f"[SanitySaver] {bg_pass.name}: {bg_pass.done}/{bg_pass.total}")
+
+    if not _passes:
+        unrealsdk.RemoveHook(PROGRESS_HOOK, __file__)
+    return True
+
+
+def schedule_background_pass(
+    name: str,
+    jobs: Dict[Path, WriteJob],
+    on_finish: Optional[Callable[[], None]] = None
+) -> None:
+    """
+    Schedules a job for each of the given files, to be run after any other writes to that file.
+    Progress gets logged to console while the pass runs, and `on_finish` gets called on the main
+    thread once it's done.
+    """
+    if not jobs:
+        if on_finish is not None:
+            on_finish()
+        return
+
+    bg_pass = _BackgroundPass(name, len(jobs), on_finish)
+    if not _passes:
+        unrealsdk.RunHook(PROGRESS_HOOK, __file__, _progress_tick)
+    _passes.append(bg_pass)
+
+    for path, job in jobs.items():
+        _writer.schedule(path, bg_pass.wrap(job), False)
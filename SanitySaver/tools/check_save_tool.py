@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+import gzip
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binary_format  # noqa: E402
+import dict_compression  # noqa: E402
+import save_tool  # noqa: E402
+from journal import JournalRecord, append_journal, apply_journal  # noqa: E402
+
+"""
+Checks `save_tool.py` against made up saves, since it's meant to be run on saves which would be
+painful to lose. Run it after changing the tool, it doesn't need the game or any real saves, and
+only writes to a temporary folder.
+
+    python check_save_tool.py
+
+Every check runs once with a tiny chunk size, so that the streaming readers have to stop part way
+through almost every token, and once with the normal one.
+"""
+
+CHUNK_SIZES = (7, save_tool.CHUNK_SIZE)
+ALL_FORMATS = (
+    save_tool.FORMAT_JSON,
+    save_tool.FORMAT_GZIP,
+    save_tool.FORMAT_DICTIONARY,
+    save_tool.FORMAT_BINARY,
+)
+
+ItemData = Dict[str, Any]
+
+# ==================================================================================================
+
+
+def make_item(index: int) -> ItemData:
+    """ Makes up an item, covering weapons, items, replacement-only items, and non-ascii text. """
+    if index % 3 == 0:
+        return {
+            "_description": f"Level {index} Pistol",
+            "_inital": True,
+            "WeaponTypeDefinition": "GD_Weap_Pistol.A_Weapons.WT_Jakobs_Pistol",
+            "BodyPartDefinition": f"GD_Weap_Pistol.Body.Pistol_Body_{index}",
+            "GameStage": index,
+        }
+    if index % 3 == 1:
+        return {
+            "_description": f"Level {index} Shield é",
+            "ItemDefinition": "GD_Shields.A_Item.Item_Shield",
+            "GameStage": -index,
+        }
+    return {
+        "_description": f"Level {index} Grenade",
+        "BarrelPartDefinition": "GD_Weap_Shared_Names.Prefix._Prefix_Anarchist",
+    }
+
+
+def make_items(count: int) -> Dict[int, ItemData]:
+    return {index: make_item(index) for index in range(-count // 4, count)}
+
+
+def write_save(path: Path, file_format: str, data: Dict[str, Any]) -> None:
+    """ Writes a save the same way the mod does. """
+    if file_format == save_tool.FORMAT_BINARY:
+        path.write_bytes(binary_format.encode(data))
+        return
+
+    compress = file_format != save_tool.FORMAT_JSON
+    encoded = json.dumps(
+        data,
+        indent=None if compress else 4,
+        separators=(",", ":" if compress else ": ")
+    ).encode("utf8")
+    if file_format == save_tool.FORMAT_DICTIONARY:
+        encoded = dict_compression.compress(encoded)
+    elif file_format == save_tool.FORMAT_GZIP:
+        encoded = gzip.compress(encoded)
+    path.write_bytes(encoded)
+
+
+def read_save(path: Path) -> Dict[str, Any]:
+    """ Reads a whole save in one go, the same way the mod does. """
+    data = path.read_bytes()
+    if binary_format.is_binary(data):
+        return binary_format.decode(data)
+    if dict_compression.is_dict_compressed(data):
+        return json.loads(dict_compression.decompress(data))
+    if path.suffix == save_tool.COMPRESSED_SUFFIX:
+        return json.loads(gzip.decompress(data))
+    return json.loads(data)
+
+
+def decompressed(path: Path) -> bytes:
+    """ Reads a save's raw bytes, ignoring gzip's header, since it includes a timestamp. """
+    data = path.read_bytes()
+    if save_tool.detect_format(path) == save_tool.FORMAT_GZIP:
+        return gzip.decompress(data)
+    return data
+
+
+def save_path(folder: Path, name: str, file_format: str) -> Path:
+    if file_format == save_tool.FORMAT_JSON:
+        return folder / (name + save_tool.SAVE_SUFFIX)
+    return folder / (name + save_tool.SAVE_SUFFIX + save_tool.COMPRESSED_SUFFIX)
+
+
+def as_json_items(items: Dict[int, ItemData]) -> Dict[str, ItemData]:
+    return {str(unique_id): data for unique_id, data in items.items()}
+
+
+def expect_read_error(path: Path) -> None:
+    try:
+        save_tool.check_save(save_tool.find_save(path), None)
+    except save_tool.READ_ERRORS:
+        return
+    raise AssertionError(f"{path.name} should have failed to read")
+
+
+# ==================================================================================================
+
+
+def check_streaming(folder: Path) -> None:
+    items = make_items(300)
+    for file_format in ALL_FORMATS:
+        path = save_path(folder, "Streaming", file_format)
+        write_save(path, file_format, {"save_version": 2, "other": [1, 2], "items": items})
+
+        assert save_tool.detect_format(path) == file_format, file_format
+        reader = save_tool.SaveReader(path)
+        assert dict(reader) == items, file_format
+        assert reader.extra == {"save_version": 2, "other": [1, 2]}, file_format
+        path.unlink()
+
+
+def check_byte_identical(folder: Path) -> None:
+    items = make_items(300)
+    for file_format in ALL_FORMATS:
+        path = save_path(folder, "Identical", file_format)
+        write_save(path, file_format, {"save_version": 2, "items": items})
+        original = decompressed(path)
+
+        # A save the mod just wrote can't be made any smaller, so shouldn't change at all
+        save_tool.compact_save(save_tool.find_save(path), None, None)
+        assert decompressed(path) == original, file_format
+        path.unlink()
+
+
+def check_round_trips(folder: Path) -> None:
+    items = make_items(200)
+    # Items which don't fit into a binary record, and have to go in it's json document instead
+    items[5] = {"Odd": [1], "GameStage": "not a number"}
+    items[2 ** 40] = {"ItemDefinition": "GD_Huge.UniqueId"}
+    expected = {"save_version": 2, "keep": 1, "items": as_json_items(items)}
+
+    for start in ALL_FORMATS:
+        path = save_path(folder, "RoundTrip", start)
+        write_save(path, start, {"save_version": 2, "keep": 1, "items": items})
+
+        for file_format in ALL_FORMATS[1:] + ALL_FORMATS:
+            save_tool.compact_save(save_tool.find_save(path), file_format, None)
+            path = save_path(folder, "RoundTrip", file_format)
+            assert sorted(os.listdir(folder)) == [path.name], os.listdir(folder)
+            assert save_tool.detect_format(path) == file_format, (start, file_format)
+
+            data = read_save(path)
+            if file_format != save_tool.FORMAT_BINARY:
+                assert json.loads(json.dumps(data)) == expected, (start, file_format)
+            else:
+                assert data == {"save_version": 2, "keep": 1, "items": items}, (start, file_format)
+        path.unlink()
+
+
+def check_journal_folding(folder: Path) -> None:
+    for file_format in ALL_FORMATS:
+        items = make_items(100)
+        path = save_path(folder, "Journal", file_format)
+        write_save(path, file_format, {"save_version": 2, "items": items})
+
+        stat = path.stat()
+        records: List[JournalRecord] = [
+            (5, None),
+            (1000, make_item(1000)),
+            (7, {"_description": "Changed"}),
+            (1000, None),
+            (1001, make_item(1001)),
+        ]
+        append_journal(folder / "Journal.json.journal", (stat.st_mtime_ns, stat.st_size), records)
+        apply_journal(items, records)
+
+        # An older copy in the other compression setting, and a half written temp file
+        other_format = (
+            save_tool.FORMAT_GZIP
+            if file_format == save_tool.FORMAT_JSON
+            else save_tool.FORMAT_JSON
+        )
+        other = save_path(folder, "Journal", other_format)
+        write_save(other, other_format, {"save_version": 2, "items": {}})
+        os.utime(other, ns=(1, 1))
+        (folder / "Journal.json.tmp").write_text("Half written")
+
+        report = save_tool.check_save(save_tool.find_save(path), None)
+        assert report.items == len(items), report
+        assert report.journal_records == len(records), report
+        assert report.outdated_file and report.temp_files == 1, report
+        assert not report.stale_journal, report
+
+        save_tool.compact_save(save_tool.find_save(path), file_format, None)
+        assert sorted(os.listdir(folder)) == [path.name], os.listdir(folder)
+        assert dict(save_tool.SaveReader(path)) == items, file_format
+        path.unlink()
+
+
+def check_pruning(folder: Path) -> None:
+    items = make_items(50)
+    dump = folder / "Launch.log"
+    dump.write_text("".join(
+        f"[{index}.0] Log: {unique_id}: {data['_description']}\n"
+        for index, (unique_id, data) in enumerate(items.items())
+        if unique_id % 5 != 0
+    ) + "Log: Unrelated line\n")
+    keep_ids = save_tool.read_dumped_ids(dump)
+    dump.unlink()
+    assert keep_ids == {unique_id for unique_id in items if unique_id % 5 != 0}, keep_ids
+
+    path = save_path(folder, "Prune", save_tool.FORMAT_GZIP)
+    write_save(path, save_tool.FORMAT_GZIP, {"save_version": 2, "items": items})
+    report = save_tool.check_save(save_tool.find_save(path), keep_ids)
+    assert report.unreachable_ids == set(items) - keep_ids, report
+
+    save_tool.compact_save(save_tool.find_save(path), None, keep_ids)
+    assert set(dict(save_tool.SaveReader(path))) == keep_ids
+    path.unlink()
+
+    # Dumps don't include the bank or stash, so pruning them would delete everything in them
+    for name in ("Prune_Bank", save_tool.STASH_NAME):
+        path = save_path(folder, name, save_tool.FORMAT_GZIP)
+        write_save(path, save_tool.FORMAT_GZIP, {"save_version": 2, "items": items})
+        original = path.read_bytes()
+        try:
+            save_tool.compact_save(save_tool.find_save(path), None, keep_ids)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{name} should not have been pruned")
+        assert path.read_bytes() == original, name
+        path.unlink()
+
+
+def check_duplicate_ids(folder: Path) -> None:
+    path = folder / "Duplicates.json"
+    path.write_text(
+        '{"save_version": 2, "items": {"1": {"a": 1}, "2": {"b": 2}, "1": {"a": 3}}}'
+    )
+
+    report = save_tool.check_save(save_tool.find_save(path), None)
+    assert report.duplicate_ids == {1} and report.items == 2, report
+
+    # Same as `json.load`, the last one wins
+    save_tool.compact_save(save_tool.find_save(path), None, None)
+    assert json.loads(path.read_text())["items"] == {"2": {"b": 2}, "1": {"a": 3}}
+    path.unlink()
+
+
+def check_stale_journal(folder: Path) -> None:
+    items = make_items(20)
+    path = folder / "Stale.json.gz"
+    write_save(path, save_tool.FORMAT_GZIP, {"save_version": 2, "items": items})
+    append_journal(folder / "Stale.json.journal", (1, 1), [(9999, {"a": 1})])
+
+    report = save_tool.check_save(save_tool.find_save(path), None)
+    assert report.stale_journal and report.items == len(items), report
+
+    save_tool.compact_save(save_tool.find_save(path), None, None)
+    assert sorted(os.listdir(folder)) == [path.name], os.listdir(folder)
+    assert dict(save_tool.SaveReader(path)) == items
+    path.unlink()
+
+
+def check_old_version(folder: Path) -> None:
+    path = folder / "Old.json"
+    original = '{"replacements": {}, "new_items": {"1": {"a": 1}}}'
+    path.write_text(original)
+
+    assert save_tool.check_save(save_tool.find_save(path), None).version == 1
+    try:
+        save_tool.compact_save(save_tool.find_save(path), None, None)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Old saves should not be compacted")
+    assert path.read_text() == original
+    path.unlink()
+
+
+def check_broken_files(folder: Path) -> None:
+    items = make_items(100)
+    for file_format in ALL_FORMATS:
+        path = save_path(folder, "Broken", file_format)
+        write_save(path, file_format, {"save_version": 2, "items": items})
+        data = path.read_bytes()
+
+        for broken in (data[:-10], data[:len(data) // 2], data + b"junk"):
+            path.write_bytes(broken)
+            expect_read_error(path)
+        path.unlink()
+
+    path = folder / "Broken.json.gz"
+    path.write_bytes(gzip.compress(b'{"save_version": 2, "items": {"1": {"a": '))
+    expect_read_error(path)
+    path.write_bytes(b"Not a save at all")
+    expect_read_error(path)
+    path.unlink()
+
+
+# ==================================================================================================
+
+
+CHECKS: Tuple[Callable[[Path], None], ...] = (
+    check_streaming,
+    check_byte_identical,
+    check_round_trips,
+    check_journal_folding,
+    check_pruning,
+    check_duplicate_ids,
+    check_stale_journal,
+    check_old_version,
+    check_broken_files,
+)
+
+
+def main() -> int:
+    original_chunk_size = save_tool.CHUNK_SIZE
+    failed = 0
+    for chunk_size in CHUNK_SIZES:
+        save_tool.CHUNK_SIZE = chunk_size
+        for check in CHECKS:
+            error: Optional[BaseException] = None
+            with tempfile.TemporaryDirectory() as folder:
+                try:
+                    check(Path(folder))
+                except AssertionError as ex:
+                    error = ex
+            status = "ok" if error is None else f"FAILED: {error!r}"
+            print(f"{check.__name__} (chunk size {chunk_size}): {status}")
+            if error is not None:
+                failed += 1
+    save_tool.CHUNK_SIZE = original_chunk_size
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
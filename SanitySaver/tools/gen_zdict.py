@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+import argparse
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import dict_compression  # noqa: E402
+
+"""
+Generates the preset dictionary used by `dict_compression.py`.
+
+For training data, this uses vendor_edit's lists of every unique balance, definition, manufacturer,
+and part across BL2, TPS, and AoDK. We don't have a big collection of real saves to train off, but
+those contain every path an unmodded save could, and modded parts mostly follow the same naming
+conventions.
+
+A dictionary is just some text zlib pretends it's already seen, so we want it to contain the most
+commonly repeated strings, with the most valuable at the end, where they're cheapest to reference.
+This splits every path into words (on `.` and `_`), counts every run of consecutive words, and then
+greedily picks the runs which would save the most bytes, skipping anything already covered.
+
+The json structure of a save gets even more repeats than any path does, so always goes at the very
+end.
+
+    python gen_zdict.py [VERSION]
+
+The dictionary gets written to `zdict_v{VERSION}`, by default the version after the one currently in
+use. Old saves still need the old dictionary, so this refuses to overwrite an existing version. To
+start using a new one, bump `DICT_VERSION` in `dict_compression.py`.
+"""
+
+TRAINING_DIR = Path(__file__).resolve().parent.parent.parent / "vendor_edit" / "zdict_experiments"
+TRAINING_FILES = (
+    "unique_balances.txt",
+    "unique_definitions.txt",
+    "unique_manufacturers.txt",
+    "unique_parts.txt",
+)
+
+# zlib can't look back any further than this, so any more would just be wasted
+DICT_SIZE = 0x8000
+MIN_RUN_LEN = 4
+
+ITEM_KEYS = (
+    "ItemDefinition",
+    "WeaponTypeDefinition",
+    "BalanceDefinition",
+    "ManufacturerDefinition",
+    "ManufacturerGradeIndex",
+    "AlphaItemPartDefinition",
+    "BetaItemPartDefinition",
+    "GammaItemPartDefinition",
+    "DeltaItemPartDefinition",
+    "EpsilonItemPartDefinition",
+    "ZetaItemPartDefinition",
+    "EtaItemPartDefinition",
+    "ThetaItemPartDefinition",
+    "MaterialItemPartDefinition",
+    "PrefixItemNamePartDefinition",
+    "TitleItemNamePartDefinition",
+    "BodyPartDefinition",
+    "GripPartDefinition",
+    "BarrelPartDefinition",
+    "SightPartDefinition",
+    "StockPartDefinition",
+    "ElementalPartDefinition",
+    "Accessory1PartDefinition",
+    "Accessory2PartDefinition",
+    "MaterialPartDefinition",
+    "PrefixPartDefinition",
+    "TitlePartDefinition",
+    "GameStage",
+)
+
+
+def structure_strings() -> List[str]:
+    """ Gets the json fragments which appear in every save, least common first. """
+    strings = [f'"{key}":"' for key in ITEM_KEYS if key not in ("ManufacturerGradeIndex", "GameStage")]
+    strings += [
+        '"ManufacturerGradeIndex":',
+        '"GameStage":',
+        '{"save_version":2,"items":{"',
+        '"_inital":true',
+        '":{"_description":"Level ',
+        '"},"',
+        '},"',
+        '","',
+        '":null,"',
+    ]
+    return strings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generates Sanity Saver's compression dictionary.")
+    parser.add_argument(
+        "version",
+        nargs="?",
+        type=int,
+        default=dict_compression.DICT_VERSION + 1,
+        help="The version to save the dictionary as. Defaults to the next unused one."
+    )
+    args = parser.parse_args()
+
+    output = dict_compression.dict_path(args.version)
+    if output.exists():
+        print(f"{output} already exists, old saves may still need it, pick a new version.")
+        return 1
+
+    paths: List[str] = []
+    for name in TRAINING_FILES:
+        paths += (TRAINING_DIR / name).read_text().splitlines()
+
+    word_pattern = re.compile(r"[^._]+[._]?")
+    runs: Counter = Counter()
+    for path in paths:
+        words = word_pattern.findall(path)
+        # Count each run once per path, a path only ever gets stored once per item
+        runs.update({
+            "".join(words[start:end])
+            for start in range(len(words))
+            for end in range(start + 1, len(words) + 1)
+        })
+
+    structure = "".join(structure_strings())
+    budget = DICT_SIZE - len(structure)
+
+    # A run saves roughly it's length every time it's repeated, after the first time
+    candidates = sorted(
+        (
+            (len(run) * (count - 1), run)
+            for run, count in runs.items()
+            if count > 1 and len(run) >= MIN_RUN_LEN
+        ),
+        reverse=True,
+    )
+
+    chosen: List[str] = []
+    total = 0
+    for _, run in candidates:
+        if total + len(run) > budget:
+            continue
+        if any(run in existing for existing in chosen):
+            continue
+        chosen.append(run)
+        total += len(run)
+
+    # Most valuable at the end
+    zdict = "".join(reversed(chosen)) + structure
+    # Exclusive mode, in case it was created while we were busy
+    with open(output, "xb") as file:
+        file.write(zdict.encode("utf8"))
+    print(f"Wrote {len(zdict)} byte dictionary, using {len(chosen)} runs, to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,810 @@
+#!/usr/bin/env python
+import argparse
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import zlib
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import binary_format  # noqa: E402
+import dict_compression  # noqa: E402
+from journal import JOURNAL_SUFFIX, JournalRecord, SnapshotSignature, read_journal  # noqa: E402
+
+"""
+Inspects and compacts Sanity Saver's save files, without needing to launch the game. Make sure the
+game's closed first, or the mod may overwrite whatever this does.
+
+    python save_tool.py check [--ids DUMP] [SAVE ...]
+    python save_tool.py compact [--compress | --dictionary | --binary | --decompress] [--prune DUMP]
+                                [SAVE ...]
+
+Saves may be given as files, or as folders to process every save in, by default the mod's `Saves`
+folder is used.
+
+Save files only ever get read one item at a time, so this works the same on multi-megabyte saves
+from years of farming as on new ones. Compacting writes a brand new file in the mod's normal format,
+with:
+- Any journal folded in, or deleted if it's out of date.
+- The out of date version of the file, if both a compressed and an uncompressed one exist, deleted.
+- Duplicate unique ids (e.g. from save editing) merged, keeping the last one, like the mod does.
+- Optionally, all items which aren't on the character anymore removed.
+
+This can also convert saves between plain json, gzip, the preset dictionary format, and the binary
+format - which is the easiest way to open saves in the latter two for editing.
+
+The game's own `.sav` files can't practically be read outside of the game, so to find items which
+aren't on the character anymore, load into it and run `SanitySaverDump`, then pass this the log it
+printed (e.g. a copy of `Launch.log`). Only equipped and backpack gear is dumped, so this refuses to
+use one on the bank or stash.
+
+To check this script still works after changing it, run `check_save_tool.py`.
+"""
+
+DEFAULT_SAVES_DIR = Path(__file__).resolve().parent.parent / "Saves"
+
+SAVE_SUFFIX = ".json"
+COMPRESSED_SUFFIX = ".gz"
+TEMP_SUFFIX = ".tmp"
+ITEMS_KEY = "items"
+SAVE_VERSION_KEY = "save_version"
+SAVE_VERSION = 2
+BANK_SUFFIX = "_Bank"
+STASH_NAME = "Stash"
+
+FORMAT_JSON = "json"
+FORMAT_GZIP = "gzip"
+FORMAT_DICTIONARY = "dictionary"
+FORMAT_BINARY = "binary"
+
+CHUNK_SIZE = 1 << 16
+READ_ERRORS = (OSError, ValueError, EOFError, zlib.error)
+
+ItemData = Dict[str, Any]
+
+# ==================================================================================================
+
+
+class _JsonStream:
+    """
+    A minimal incremental json reader. Only objects get streamed, every other value is read in one
+    go - which for saves just means each individual item.
+    """
+    _WHITESPACE = re.compile(r"\s*")
+    _decoder = json.JSONDecoder()
+
+    file: IO[str]
+    buffer: str
+    pos: int
+    eof: bool
+
+    def __init__(self, file: IO[str]) -> None:
+        self.file = file
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.file.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """ Skips whitespace, and returns the next character, or an empty string at eof. """
+        while True:
+            match = self._WHITESPACE.match(self.buffer, self.pos)
+            assert match is not None
+            self.pos = match.end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in save file")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """ Reads the next complete json value. """
+        self.peek()
+        while True:
+            try:
+                val, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number might have been cut off by the end of the buffer
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return val
+
+    def keys(self) -> Iterator[str]:
+        """
+        Iterates through the keys of the next object. After each key, the caller must consume it's
+        value, using either `value()` or `keys()`.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Expected an object key in save file")
+            self.expect(":")
+            yield key
+
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError("Expected ',' or '}' in save file")
+
+
+class _DictDecompressingFile(io.RawIOBase):
+    """ Streams the contents of a file compressed using the preset dictionary. """
+    file: IO[bytes]
+    decompressor: "zlib._Decompress"
+    pending: bytes
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self.file = file
+        self.decompressor = dict_compression.decompressobj(file.read(dict_compression.HEADER_SIZE))
+        self.pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self.pending:
+            if self.decompressor.eof:
+                if self.decompressor.unused_data or self.file.read(1):
+                    raise ValueError("Unexpected data after the end of the compressed data")
+                return 0
+            chunk = self.file.read(CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("Compressed data was truncated")
+            self.pending = self.decompressor.decompress(chunk)
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self) -> None:
+        self.file.close()
+        super().close()
+
+
+class _DictCompressingFile(io.RawIOBase):
+    """ Streams data into a file, compressing it using the preset dictionary. """
+    file: IO[bytes]
+    compressor: "zlib._Compress"
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self.file = file
+        self.compressor = dict_compression.compressobj()
+        file.write(dict_compression.header())
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.file.write(self.compressor.flush())
+            self.file.close()
+        super().close()
+
+
+def _open_text(path: Path, mode: str, file_format: str) -> IO[str]:
+    """ Opens a file in one of the json based formats, in text mode. """
+    if file_format == FORMAT_JSON:
+        return open(path, mode, encoding="utf8")
+    if file_format == FORMAT_GZIP:
+        return gzip.open(path, mode + "t", encoding="utf8")  # type: ignore
+    assert file_format == FORMAT_DICTIONARY
+
+    if mode == "r":
+        return io.TextIOWrapper(
+            io.BufferedReader(_DictDecompressingFile(open(path, "rb"))),
+            encoding="utf8"
+        )
+    return io.TextIOWrapper(
+        io.BufferedWriter(_DictCompressingFile(open(path, "wb"))),
+        encoding="utf8"
+    )
+
+
+def detect_format(path: Path) -> str:
+    """ Works out which format a save file is in. """
+    if path.suffix != COMPRESSED_SUFFIX:
+        return FORMAT_JSON
+    with open(path, "rb") as file:
+        magic = file.read(max(binary_format.HEADER_SIZE, dict_compression.HEADER_SIZE))
+    if binary_format.is_binary(magic):
+        return FORMAT_BINARY
+    if dict_compression.is_dict_compressed(magic):
+        return FORMAT_DICTIONARY
+    return FORMAT_GZIP
+
+
+class SaveReader:
+    """
+    Streams the items out of a save file. Everything other than the items is collected in `extra`,
+    which is only complete once all items have been read.
+    """
+    path: Path
+    extra: "OrderedDict[str, Any]"
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.extra = OrderedDict()
+
+    def __iter__(self) -> Iterator[Tuple[int, ItemData]]:
+        file_format = detect_format(self.path)
+        if file_format == FORMAT_BINARY:
+            yield from self._iter_binary()
+            return
+
+        with _open_text(self.path, "r", file_format) as file:
+            stream = _JsonStream(file)
+            for key in stream.keys():
+                if key != ITEMS_KEY:
+                    self.extra[key] = stream.value()
+                    continue
+                for unique_id in stream.keys():
+                    yield int(unique_id), stream.value()
+            if stream.peek() != "":
+                raise ValueError("Unexpected data after the end of the save file")
+
+    def _iter_binary(self) -> Iterator[Tuple[int, ItemData]]:
+        with open(self.path, "rb") as file:
+            file_header = file.read(binary_format.HEADER_SIZE)
+            header = file.read(binary_format.Decoder.HEADER_SIZE)
+            if len(header) != binary_format.Decoder.HEADER_SIZE:
+                raise ValueError("Binary save was truncated")
+            table = file.read(binary_format.Decoder.table_size(header))
+            decoder = binary_format.Decoder(file_header, header, table)
+
+            # The string table has to be loaded all at once, but records can be streamed
+            remaining = decoder.record_count
+            while remaining > 0:
+                count = min(remaining, max(1, CHUNK_SIZE // binary_format.RECORD_SIZE))
+                records = file.read(count * binary_format.RECORD_SIZE)
+                if len(records) != count * binary_format.RECORD_SIZE:
+                    raise ValueError("Binary save was truncated")
+                yield from decoder.iter_records(records)
+                remaining -= count
+            if file.read(1):
+                raise ValueError("Unexpected data after the end of the save file")
+
+        for key, val in decoder.document.items():
+            if key != ITEMS_KEY:
+                self.extra[key] = val
+                continue
+            # Items which didn't fit in a record
+            for unique_id, data in val.items():
+                yield int(unique_id), data
+
+    @property
+    def version(self) -> int:
+        return self.extra.get(SAVE_VERSION_KEY, 1)
+
+
+# ==================================================================================================
+
+
+class SaveFiles(NamedTuple):
+    """ All the files making up a single save. """
+    name: str
+    # The version of the file the mod would use, if both a compressed and uncompressed one exist
+    current: Optional[Path]
+    outdated: Optional[Path]
+    journal: Path
+    temp_files: List[Path]
+
+
+def _signature(path: Optional[Path]) -> SnapshotSignature:
+    if path is None:
+        return None
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def find_save(path: Path) -> SaveFiles:
+    """ Finds all files related to the save at the given path, which may be any of them. """
+    base = path
+    for suffix in (TEMP_SUFFIX, JOURNAL_SUFFIX, COMPRESSED_SUFFIX):
+        if base.suffix == suffix:
+            base = base.with_suffix("")
+
+    compressed = base.with_name(base.name + COMPRESSED_SUFFIX)
+    candidates = [file for file in (compressed, base) if file.is_file()]
+    # Newest wins, same as when the mod converts them, preferring the compressed one on ties
+    candidates.sort(key=lambda file: -file.stat().st_mtime_ns)
+
+    return SaveFiles(
+        name=base.stem,
+        current=candidates[0] if candidates else None,
+        outdated=candidates[1] if len(candidates) > 1 else None,
+        journal=base.with_name(base.name + JOURNAL_SUFFIX),
+        temp_files=[
+            file.with_name(file.name + TEMP_SUFFIX)
+            for file in (compressed, base)
+            if file.with_name(file.name + TEMP_SUFFIX).is_file()
+        ]
+    )
+
+
+def find_saves(paths: List[Path]) -> List[SaveFiles]:
+    """ Finds all saves in the given list of files and folders. """
+    bases: "OrderedDict[Path, None]" = OrderedDict()
+    for path in paths:
+        files = sorted(path.glob("*" + SAVE_SUFFIX + "*")) if path.is_dir() else [path]
+        for file in files:
+            if file.is_dir():
+                continue
+            save = find_save(file)
+            if save.current is None and not save.journal.is_file():
+                continue
+            bases[file.parent / (save.name + SAVE_SUFFIX)] = None
+    return [find_save(base) for base in bases]
+
+
+def read_valid_journal(save: SaveFiles) -> Tuple[Optional[List[JournalRecord]], bool]:
+    """
+    Reads the save's journal. Returns it's records (or None), and if the journal is out of date.
+    """
+    records = read_journal(save.journal, _signature(save.current))
+    return records, records is None and save.journal.is_file()
+
+
+def read_dumped_ids(path: Path) -> Set[int]:
+    """ Reads all unique ids from the output of `SanitySaverDump`. """
+    pattern = re.compile(r"(?:^|\s)(-?\d+): ")
+    ids: Set[int] = set()
+    with open(path, encoding="utf8", errors="replace") as file:
+        for line in file:
+            match = pattern.search(line)
+            if match is not None:
+                ids.add(int(match.group(1)))
+    return ids
+
+
+def uses_dumps(save: SaveFiles) -> bool:
+    """ Checks if `SanitySaverDump` covers the given save, i.e. if it isn't a bank or the stash. """
+    return not save.name.endswith(BANK_SUFFIX) and save.name != STASH_NAME
+
+
+def item_type(data: ItemData) -> str:
+    """ Works out a rough category for an item, based on the package of it's definitions. """
+    for field, kind in (
+        ("WeaponTypeDefinition", "Weapon"),
+        ("ItemDefinition", "Item"),
+        ("BalanceDefinition", None),
+    ):
+        val = data.get(field)
+        if isinstance(val, str):
+            package = val.split(".")[0]
+            return package if kind is None else f"{kind}: {package}"
+    # Items only store parts which need replacing, so most don't have any of these
+    if any(field in data for field in ("BodyPartDefinition", "BarrelPartDefinition")):
+        return "Weapon: unknown"
+    return "unknown"
+
+
+def _encoded_size(data: Any) -> int:
+    return len(json.dumps(data, separators=(",", ":")).encode("utf8"))
+
+
+# ==================================================================================================
+
+
+class SaveReport(NamedTuple):
+    name: str
+    version: int
+    items: int
+    file_bytes: int
+    items_by_type: Counter
+    bytes_by_type: Counter
+    journal_records: int
+    stale_journal: bool
+    outdated_file: bool
+    temp_files: int
+    duplicate_ids: Set[int]
+    unreachable_ids: Set[int]
+    all_ids: Set[int]
+
+
+def check_save(save: SaveFiles, dumped_ids: Optional[Set[int]]) -> SaveReport:
+    """ Streams through a save, collecting statistics and problems. """
+    records, stale_journal = read_valid_journal(save)
+    journal: Dict[int, Optional[ItemData]] = dict(records or [])
+
+    items_by_type: Counter = Counter()
+    bytes_by_type: Counter = Counter()
+    seen_ids: Set[int] = set()
+    duplicate_ids: Set[int] = set()
+
+    def count(data: ItemData) -> None:
+        kind = item_type(data)
+        items_by_type[kind] += 1
+        bytes_by_type[kind] += _encoded_size(data)
+
+    version = SAVE_VERSION
+    if save.current is not None:
+        reader = SaveReader(save.current)
+        for unique_id, data in reader:
+            # Only count duplicates once, the mod only ever loads one of them
+            if unique_id in seen_ids:
+                duplicate_ids.add(unique_id)
+                continue
+            seen_ids.add(unique_id)
+            if unique_id not in journal:
+                count(data)
+        version = reader.version
+
+    for unique_id, maybe_data in journal.items():
+        if maybe_data is None:
+            seen_ids.discard(unique_id)
+        else:
+            seen_ids.add(unique_id)
+            count(maybe_data)
+
+    return SaveReport(
+        name=save.name,
+        version=version,
+        items=len(seen_ids),
+        file_bytes=sum(
+            file.stat().st_size
+            for file in (save.current, save.outdated, save.journal)
+            if file is not None and file.is_file()
+        ),
+        items_by_type=items_by_type,
+        bytes_by_type=bytes_by_type,
+        journal_records=0 if records is None else len(records),
+        stale_journal=stale_journal,
+        outdated_file=save.outdated is not None,
+        temp_files=len(save.temp_files),
+        duplicate_ids=duplicate_ids,
+        unreachable_ids=set() if dumped_ids is None else seen_ids - dumped_ids,
+        all_ids=seen_ids
+    )
+
+
+# ==================================================================================================
+
+
+def _write_item(file: IO[str], unique_id: int, data: ItemData, compress: bool, first: bool) -> None:
+    # Matches the formatting `json.dumps` uses when the mod writes the whole save at once
+    if compress:
+        file.write(("" if first else ",") + json.dumps(str(unique_id)) + ":")
+        file.write(json.dumps(data, separators=(",", ":")))
+    else:
+        encoded = json.dumps(data, indent=4, separators=(",", ": ")).replace("\n", "\n" + " " * 8)
+        file.write(("\n" if first else ",\n") + " " * 8 + json.dumps(str(unique_id)) + ": ")
+        file.write(encoded)
+
+
+def _write_json(
+    path: Path,
+    file_format: str,
+    extra: "OrderedDict[str, Any]",
+    items: Iterator[Tuple[int, ItemData]]
+) -> int:
+    compress = file_format != FORMAT_JSON
+    item_count = 0
+    with _open_text(path, "w", file_format) as file:
+        # Write everything but the closing brace, then add the items on the end
+        if compress:
+            file.write(json.dumps(extra, separators=(",", ":"))[:-1])
+            file.write("," + json.dumps(ITEMS_KEY) + ":{")
+        else:
+            file.write(json.dumps(extra, indent=4, separators=(",", ": "))[:-2])
+            file.write(",\n    " + json.dumps(ITEMS_KEY) + ": {")
+
+        for unique_id, data in items:
+            _write_item(file, unique_id, data, compress, item_count == 0)
+            item_count += 1
+
+        if compress:
+            file.write("}}")
+        else:
+            file.write("\n    }\n}" if item_count > 0 else "}\n}")
+    return item_count
+
+
+def _write_binary(
+    path: Path,
+    extra: "OrderedDict[str, Any]",
+    items: Iterator[Tuple[int, ItemData]]
+) -> int:
+    # The string table goes first, so records need to be spooled somewhere until we've seen them all
+    item_count = 0
+    leftover: Dict[str, ItemData] = OrderedDict()
+    with tempfile.TemporaryFile() as records, open(path, "wb") as file:
+        encoder = binary_format.Encoder(records)
+        for unique_id, data in items:
+            if not encoder.add(unique_id, data):
+                leftover[str(unique_id)] = data
+            item_count += 1
+
+        document = OrderedDict(extra)
+        document[ITEMS_KEY] = leftover
+        encoder.finish(file, document)
+    return item_count
+
+
+def compact_save(save: SaveFiles, file_format: Optional[str], keep_ids: Optional[Set[int]]) -> int:
+    """
+    Rewrites a save, folding in it's journal and dropping duplicate or unreachable items. Writes it
+    in the given format, or the same one as the current file if None. Returns the new file size.
+    """
+    if keep_ids is not None and not uses_dumps(save):
+        raise ValueError(f"{save.name} isn't included in item dumps, so can't be pruned")
+    if file_format is None:
+        file_format = FORMAT_GZIP if save.current is None else detect_format(save.current)
+
+    records, _ = read_valid_journal(save)
+    journal: "OrderedDict[int, Optional[ItemData]]" = OrderedDict(records or [])
+
+    # Duplicates get resolved like `json.load` does, the last one wins, so need to find them first
+    last_index: Dict[int, int] = {}
+    reader = None
+    if save.current is not None:
+        reader = SaveReader(save.current)
+        for index, (unique_id, _) in enumerate(reader):
+            last_index[unique_id] = index
+        if reader.version < SAVE_VERSION:
+            raise ValueError(f"{save.name} is an old version, load it in game to upgrade it first")
+
+    base = save.journal.with_name(save.name + SAVE_SUFFIX)
+    output = base if file_format == FORMAT_JSON else base.with_name(base.name + COMPRESSED_SUFFIX)
+    temp_file = output.with_name(output.name + TEMP_SUFFIX)
+
+    def iter_items() -> Iterator[Tuple[int, ItemData]]:
+        if reader is not None:
+            for index, (unique_id, data) in enumerate(reader):
+                if last_index[unique_id] != index:
+                    continue
+                if unique_id in journal:
+                    maybe_data = journal.pop(unique_id)
+                    if maybe_data is None:
+                        continue
+                    data = maybe_data
+                if keep_ids is None or unique_id in keep_ids:
+                    yield unique_id, data
+        for unique_id, maybe_data in journal.items():
+            if maybe_data is not None and (keep_ids is None or unique_id in keep_ids):
+                yield unique_id, maybe_data
+
+    extra: "OrderedDict[str, Any]" = OrderedDict([(SAVE_VERSION_KEY, SAVE_VERSION)])
+    if reader is not None:
+        # Reading all the items first fills this in
+        extra.update(reader.extra)
+
+    try:
+        if file_format == FORMAT_BINARY:
+            item_count = _write_binary(temp_file, extra, iter_items())
+        else:
+            item_count = _write_json(temp_file, file_format, extra, iter_items())
+
+        # Compressed files only finish writing on close, so can only sync after
+        with open(temp_file, "r+b") as file:
+            os.fsync(file.fileno())
+        os.replace(temp_file, output)
+    except BaseException:
+        try:
+            temp_file.unlink()
+        except OSError:
+            pass
+        raise
+
+    # Same as the mod, an empty save is just deleted
+    if item_count == 0:
+        output.unlink()
+
+    for outdated in [save.current, save.outdated, save.journal, *save.temp_files]:
+        if outdated is not None and outdated != output:
+            try:
+                outdated.unlink()
+            except FileNotFoundError:
+                pass
+
+    return output.stat().st_size if item_count > 0 else 0
+
+
+# ==================================================================================================
+
+
+def _format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size}B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f}KiB"
+    return f"{size / (1024 * 1024):.1f}MiB"
+
+
+def check_command(args: argparse.Namespace, saves: List[SaveFiles]) -> int:
+    dumped_ids = None if args.ids is None else read_dumped_ids(args.ids)
+
+    total_items: Counter = Counter()
+    total_bytes: Counter = Counter()
+    owners: Dict[int, List[str]] = {}
+    problems = 0
+
+    for save in saves:
+        try:
+            report = check_save(save, dumped_ids)
+        except READ_ERRORS as ex:
+            print(f"{save.name}: couldn't be read: {ex}")
+            problems += 1
+            continue
+
+        print(
+            f"{report.name}: {report.items:,} items, {_format_size(report.file_bytes)} on disk"
+            + (f", {report.journal_records:,} journal records" if report.journal_records else "")
+        )
+        notes = []
+        if report.version < SAVE_VERSION:
+            notes.append(f"is save version {report.version}, load it in game to upgrade it")
+        if report.stale_journal:
+            notes.append("has an out of date journal, which will be ignored")
+        if report.outdated_file:
+            notes.append("has both a compressed and an uncompressed version")
+        if report.temp_files:
+            notes.append(f"has {report.temp_files} leftover temp files")
+        if report.duplicate_ids:
+            notes.append(f"has {len(report.duplicate_ids)} duplicate unique ids")
+        if report.unreachable_ids:
+            notes.append(f"has {len(report.unreachable_ids)} items which aren't on the character")
+        for note in notes:
+            print(f"    {note}")
+        problems += len(notes)
+
+        total_items.update(report.items_by_type)
+        total_bytes.update(report.bytes_by_type)
+        for unique_id in report.all_ids:
+            owners.setdefault(unique_id, []).append(report.name)
+
+    shared = sum(1 for names in owners.values() if len(names) > 1)
+    if shared:
+        print(f"{shared:,} unique ids are used in more than one save")
+
+    all_bytes = sum(total_bytes.values())
+    print()
+    print(f"{'Type':<40} {'Items':>8} {'Size':>12} {'Share':>6}")
+    for kind, size in total_bytes.most_common():
+        print(
+            f"{kind:<40} {total_items[kind]:>8,} {_format_size(size):>12}"
+            f" {size / max(all_bytes, 1):>6.1%}"
+        )
+
+    return 1 if problems else 0
+
+
+def compact_command(args: argparse.Namespace, saves: List[SaveFiles]) -> int:
+    keep_ids = None if args.prune is None else read_dumped_ids(args.prune)
+    failed = 0
+
+    for save in saves:
+        before = sum(
+            file.stat().st_size
+            for file in (save.current, save.outdated, save.journal, *save.temp_files)
+            if file is not None and file.is_file()
+        )
+        try:
+            after = compact_save(save, args.format, keep_ids)
+        except READ_ERRORS as ex:
+            print(f"{save.name}: couldn't be compacted: {ex}")
+            failed += 1
+            continue
+        print(f"{save.name}: {_format_size(before)} -> {_format_size(after)}")
+
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspects and compacts Sanity Saver save files.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    check_parser = subparsers.add_parser("check", help="Reports sizes and problems with saves.")
+    check_parser.add_argument(
+        "--ids",
+        type=Path,
+        help=(
+            "A log containing the output of `SanitySaverDump`, to check for items which aren't on"
+            " the character anymore."
+        )
+    )
+
+    compact_parser = subparsers.add_parser("compact", help="Rewrites saves as small as possible.")
+    compression = compact_parser.add_mutually_exclusive_group()
+    compression.add_argument(
+        "--compress",
+        action="store_const",
+        const=FORMAT_GZIP,
+        dest="format",
+        help="Compress the saves using gzip. By default, keeps their current format."
+    )
+    compression.add_argument(
+        "--dictionary",
+        action="store_const",
+        const=FORMAT_DICTIONARY,
+        dest="format",
+        help="Compress the saves using the preset dictionary."
+    )
+    compression.add_argument(
+        "--binary",
+        action="store_const",
+        const=FORMAT_BINARY,
+        dest="format",
+        help="Convert the saves to the binary format."
+    )
+    compression.add_argument(
+        "--decompress",
+        action="store_const",
+        const=FORMAT_JSON,
+        dest="format",
+        help="Decompress the saves."
+    )
+    compact_parser.add_argument(
+        "--prune",
+        type=Path,
+        help="A log containing the output of `SanitySaverDump`, all items not in it get removed."
+    )
+
+    for subparser in (check_parser, compact_parser):
+        subparser.add_argument(
+            "saves",
+            nargs="*",
+            type=Path,
+            default=[DEFAULT_SAVES_DIR],
+            help="The save files, or folders containing them, to process."
+        )
+
+    args = parser.parse_args()
+
+    saves = find_saves(args.saves)
+    if not saves:
+        print("No saves found.")
+        return 1
+
+    if len(saves) > 1 and (getattr(args, "ids", None) or getattr(args, "prune", None)):
+        parser.error("item dumps only apply to a single character, pass the save to use it on")
+    if (getattr(args, "ids", None) or getattr(args, "prune", None)) and not uses_dumps(saves[0]):
+        parser.error("item dumps don't include the bank or stash, they can't be used on them")
+
+    if args.command == "check":
+        return check_command(args, saves)
+    return compact_command(args, saves)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 from mods_base import build_mod
 
-from . import bugfix, editor, hooks, item_codes
+from . import bugfix, bulk, duplicates, editor, hooks, item_codes
 from .editor import open_editor_menu
 
 __version__: str
@@ -20,5 +20,10 @@ mod = build_mod(
     hooks=(
         *hooks.hooks,
         *bugfix.hooks,
+        *item_codes.hooks,
+    ),
+    commands=(
+        *bulk.commands,
+        *duplicates.commands,
     ),
 )
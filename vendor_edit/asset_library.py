@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Like `codec.py`, this module must stay importable from a regular interpreter - no sdk imports, no
+# relative imports.
+
+__all__: tuple[str, ...] = ("AssetLibrary",)
+
+
+class AssetLibrary:
+    """
+    An offline copy of the game's asset library, used to convert serial number indexes to objects.
+
+    This is loaded from one of Gibbed's `Asset Library Manager.json` dumps (see the links in
+    `item_codes.py`). The nested json is flattened on load, so that lookups are just a couple of
+    tuple indexes.
+    """
+
+    # library -> set id -> (sublibrary start offsets, flat list of asset paths)
+    _libraries: dict[str, dict[int, tuple[tuple[int, ...], tuple[str, ...]]]]
+
+    def __init__(self, data: dict[str, Any]) -> None:
+        """
+        Creates a new asset library.
+
+        Args:
+            data: The parsed asset library json.
+        """
+        self._libraries = {}
+
+        for set_idx, asset_set in enumerate(data["sets"]):
+            set_id: int = asset_set.get("id", set_idx)
+
+            for lib_name, library in asset_set["libraries"].items():
+                offsets: list[int] = []
+                paths: list[str] = []
+                for sublibrary in library["sublibraries"]:
+                    offsets.append(len(paths))
+                    package: str = sublibrary["package"]
+                    paths.extend(f"{package}.{asset}" for asset in sublibrary["assets"])
+                # Add a trailing offset, so we can always bounds check using the next entry
+                offsets.append(len(paths))
+
+                self._libraries.setdefault(lib_name, {})[set_id] = (tuple(offsets), tuple(paths))
+
+    @classmethod
+    def load(cls, path: Path) -> AssetLibrary:
+        """
+        Loads an asset library from a json file.
+
+        Args:
+            path: The path to the json file.
+        Returns:
+            The new asset library.
+        """
+        with path.open(encoding="utf8") as file:
+            return cls(json.load(file))
+
+    def lookup(self, library: str, set_id: int, sublibrary: int, asset: int) -> str | None:
+        """
+        Looks up the path name of an asset.
+
+        Args:
+            library: The library to look in.
+            set_id: The set to look in.
+            sublibrary: The index of the sublibrary.
+            asset: The index of the asset within the sublibrary.
+        Returns:
+            The asset's path name, or None if it doesn't exist.
+        """
+        try:
+            offsets, paths = self._libraries[library][set_id]
+        except KeyError:
+            return None
+
+        if not (0 <= sublibrary < len(offsets) - 1):
+            return None
+        start = offsets[sublibrary]
+        if not (0 <= asset < offsets[sublibrary + 1] - start):
+            return None
+        return paths[start + asset]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# ruff: noqa: T201, D103, S311
+from __future__ import annotations
+
+import random
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codec import calc_serial_checksum, calc_serial_checksums, gearbox_crc
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+NUM_SERIALS = 500
+REPEATS = 20
+
+
+def make_crc_table() -> tuple[int, ...]:
+    """Recreates the original 256-entry table, the standard reflected CRC32 one."""
+    table: list[int] = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ (0xEDB88320 if crc & 1 else 0)
+        table.append(crc)
+    return tuple(table)
+
+
+CRC_TABLE = make_crc_table()
+assert CRC_TABLE[:4] == (0x00000000, 0x77073096, 0xEE0E612C, 0x990951BA)
+assert CRC_TABLE[-4:] == (0xB40BBE37, 0xC30C8EA1, 0x5A05DF1B, 0x2D02EF8D)
+
+
+def reference_gearbox_crc(buffer: bytes | bytearray) -> int:
+    """The original table-at-a-time implementation."""
+    wip_hash = 0xFFFFFFFF
+    for byte in buffer.ljust(40, b"\xff"):
+        wip_hash = CRC_TABLE[(wip_hash ^ byte) & 0xFF] ^ (wip_hash >> 8)
+
+    return (~wip_hash) & 0xFFFFFFFF
+
+
+def reference_calc_serial_checksum(serial: bytes | bytearray) -> int:
+    crc = reference_gearbox_crc(serial)
+    return (crc >> 16) ^ (crc & 0xFFFF)
+
+
+def bench(name: str, func: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {NUM_SERIALS * REPEATS / elapsed:>12,.0f} codes/sec")
+
+
+rng = random.Random(1234)
+
+# Validate every length, including those longer than a real serial
+for length in range(48):
+    for _ in range(64):
+        buffer = bytearray(rng.randbytes(length))
+        assert gearbox_crc(buffer) == reference_gearbox_crc(buffer)
+        assert gearbox_crc(bytes(buffer)) == reference_gearbox_crc(buffer)
+
+corpus = [bytearray(rng.randbytes(40)) for _ in range(NUM_SERIALS)]
+for serial in corpus:
+    serial[5:7] = (0xFF, 0xFF)
+
+expected = [reference_calc_serial_checksum(x) for x in corpus]
+assert [calc_serial_checksum(x) for x in corpus] == expected
+assert calc_serial_checksums(corpus) == expected
+
+bench("reference calc_serial_checksum", lambda: [reference_calc_serial_checksum(x) for x in corpus])
+bench("calc_serial_checksum", lambda: [calc_serial_checksum(x) for x in corpus])
+bench("calc_serial_checksums", lambda: calc_serial_checksums(corpus))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# ruff: noqa: T201, D103, S311
+from __future__ import annotations
+
+import random
+import struct
+import sys
+import time
+from base64 import b64decode
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codec import decode_serial
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+NUM_SERIALS = 500
+REPEATS = 20
+
+
+def reference_decode_serial(encoded_serial: bytes | bytearray) -> bytearray:
+    """The original byte-at-a-time implementation."""
+    (key_and_steps,) = struct.unpack_from(">i", encoded_serial, 1)
+    key = key_and_steps >> 5
+
+    if key == 0:
+        return bytearray(encoded_serial)
+
+    xored = bytearray()
+    for byte in encoded_serial[5:]:
+        key = (key * 0x10A860C1) % 0xFFFFFFFB
+        xored.append((byte ^ key) & 0xFF)
+
+    steps = (key_and_steps & 0b11111) % len(xored)
+    return bytearray((encoded_serial[0], 0, 0, 0, 0)) + xored[-steps:] + xored[:-steps]
+
+
+def encode_serial(decoded: bytes, key_and_steps: int) -> bytes:
+    body = decoded[5:]
+    key = key_and_steps >> 5
+    if key == 0:
+        return bytes(decoded[:1]) + struct.pack(">i", key_and_steps) + body
+
+    steps = (key_and_steps & 0b11111) % len(body)
+    unrotated = body[steps:] + body[:steps]
+
+    encoded = bytearray()
+    for byte in unrotated:
+        key = (key * 0x10A860C1) % 0xFFFFFFFB
+        encoded.append((byte ^ key) & 0xFF)
+    return bytes(decoded[:1]) + struct.pack(">i", key_and_steps) + bytes(encoded)
+
+
+def make_corpus(rng: random.Random) -> list[bytes]:
+    corpus = [b64decode("BwAAAACAVwAHERCgAxIcDgHEA4QFhBzE//////////8VBDuEOsQ=")]
+    while len(corpus) < NUM_SERIALS:
+        length = rng.randint(8, 40)
+        decoded = bytes((rng.choice((0x07, 0x87)), 0, 0, 0, 0)) + rng.randbytes(length - 5)
+        corpus.append(encode_serial(decoded, rng.randrange(-0x80000000, 0x80000000)))
+    return corpus
+
+
+def bench(name: str, func: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {NUM_SERIALS * REPEATS / elapsed:>12,.0f} codes/sec")
+
+
+corpus = make_corpus(random.Random(1234))
+
+expected = [reference_decode_serial(x) for x in corpus]
+assert [decode_serial(x) for x in corpus] == expected
+assert all(
+    encode_serial(bytes(decoded), struct.unpack_from(">i", encoded, 1)[0]) == encoded
+    for decoded, encoded in zip(expected, corpus, strict=True)
+)
+
+bench("reference decode_serial", lambda: [reference_decode_serial(x) for x in corpus])
+bench("decode_serial", lambda: [decode_serial(x) for x in corpus])
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# ruff: noqa: T201, D102, D103
+from __future__ import annotations
+
+import enum
+import functools
+import importlib
+import struct
+import sys
+import time
+import types
+from base64 import b64decode, b64encode
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codec import (
+    ITEM_SERIAL_LAYOUT,
+    MODDED_CODE_V0,
+    MODDED_CODE_V1,
+    WEAPON_FIELDS,
+    WEAPON_SERIAL_LAYOUT,
+    AssetIndex,
+    calc_serial_checksum,
+    decode_serial,
+    iter_modded_replacements,
+    unpack_serial,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+VENDOR_EDIT_DIR = Path(__file__).parent.parent
+EXODUS_BIN = VENDOR_EDIT_DIR / "zdict_experiments" / "exodus.bin"
+REPEATS = 20
+
+# ==================================================================================================
+# Stand-in sdk. This implements just enough for `item_codes.py` to import, and for the pack/unpack
+# functions to behave like they do in game. Objects are identified purely by name, and a serial's
+# parts are named after the indexes they were read from, since we don't have an asset library.
+
+
+class FakeObject:
+    def __init__(self, path_name: str) -> None:
+        self.path_name = path_name
+
+    def _path_name(self) -> str:
+        return self.path_name
+
+    def __repr__(self) -> str:
+        return f"FakeObject({self.path_name!r})"
+
+
+_objects: dict[str, FakeObject] = {}
+
+
+def get_object(path_name: str) -> FakeObject:
+    if (obj := _objects.get(path_name.upper())) is None:
+        obj = _objects[path_name.upper()] = FakeObject(path_name)
+    return obj
+
+
+def find_object(_cls: str, path_name: str) -> FakeObject:
+    # Modded parts only exist if they were registered beforehand
+    if (obj := _objects.get(path_name.upper())) is None:
+        raise ValueError(f"couldn't find object '{path_name}'")
+    return obj
+
+
+WEAPON_DEF_DATA = get_object("WillowGame.WillowWeaponTypes:WeaponDefinitionData")
+ITEM_DEF_DATA = get_object("WillowGame.WillowItemTypes:ItemDefinitionData")
+
+
+class FakeDefData:
+    def __init__(self, struct_type: FakeObject, serial: bytes) -> None:
+        self._type = struct_type
+        # The game would re-pack all the fields, but we only ever pack def data we just unpacked,
+        # so can just keep the serial it came from instead
+        self._serial = serial
+
+
+# The real unpack is native, and a lot faster than ours, so cache it to avoid it dominating the
+# benchmarks
+cached_unpack_serial = functools.cache(unpack_serial)
+
+
+def fake_unpack(args: types.SimpleNamespace) -> tuple[bool, None, FakeDefData]:
+    serial = bytes(args.SerialNumber.Buffer)
+    unpacked = cached_unpack_serial(serial)
+    assert unpacked is not None
+
+    def_data = FakeDefData(WEAPON_DEF_DATA if unpacked.is_weapon else ITEM_DEF_DATA, serial)
+    for field in WEAPON_SERIAL_LAYOUT if unpacked.is_weapon else ITEM_SERIAL_LAYOUT:
+        value = unpacked.fields[field.name]
+        if isinstance(value, AssetIndex):
+            value = get_object(f"{field.library}.{value.sublibrary}.{value.asset}")
+        setattr(def_data, field.name, value)
+
+    return True, None, def_data
+
+
+def fake_pack(def_data: FakeDefData) -> tuple[types.SimpleNamespace, None]:
+    # Like the game, return the serial with a key that hasn't been applied yet, no checksum, and
+    # padding
+    serial = bytearray(def_data._serial)
+    serial[1:7] = b"\x12\x34\x56\x78\xff\xff"
+    serial += b"\xff" * (40 - len(serial))
+    return types.SimpleNamespace(Buffer=serial), None
+
+
+class FakeFunction:
+    def __init__(self, func: Callable[..., Any]) -> None:
+        self.func = self
+        self._impl = func
+
+    def __call__(self, *args: Any) -> Any:
+        return self._impl(*args)
+
+
+class FakeWrappedStruct:
+    def __init__(self, _func: FakeFunction) -> None:
+        self.SerialNumber = types.SimpleNamespace(Buffer=b"", State=0)
+
+
+class FakeHook:
+    def __init__(self, func: Callable[..., Any]) -> None:
+        self.func = func
+
+    def enable(self) -> None:
+        pass
+
+    def disable(self) -> None:
+        pass
+
+
+class FakeGame(enum.Enum):
+    BL2 = enum.auto()
+    TPS = enum.auto()
+    AoDK = enum.auto()
+
+    @staticmethod
+    def get_current() -> FakeGame:
+        return FakeGame.BL2
+
+
+def fake_find_class(name: str) -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        ClassDefaultObject=types.SimpleNamespace(
+            PackSerialNumber=FakeFunction(fake_pack),
+            UnpackSerialNumber=FakeFunction(fake_unpack),
+            PeekIsWeapon=FakeFunction(lambda *_: name == "WillowWeapon"),
+        ),
+    )
+
+
+def fake_open_in_mod_dir(path: Path, binary: bool = False) -> IO[Any]:
+    return path.open("rb" if binary else "r")
+
+
+def install_stand_in_sdk() -> types.ModuleType:
+    unrealsdk = types.ModuleType("unrealsdk")
+    unrealsdk.find_object = find_object  # type: ignore
+    unrealsdk.find_class = fake_find_class  # type: ignore
+    unrealsdk.find_enum = lambda _: types.SimpleNamespace(SNS_Full=2)  # type: ignore
+    unrealsdk.logging = types.SimpleNamespace(  # type: ignore
+        info=lambda _: None,
+        warning=lambda _: None,
+        error=lambda _: None,
+    )
+
+    unreal = types.ModuleType("unrealsdk.unreal")
+    unreal.UObject = FakeObject  # type: ignore
+    unreal.WrappedStruct = FakeWrappedStruct  # type: ignore
+    unreal.WeakPointer = lambda obj: lambda: obj  # type: ignore
+    unreal.BoundFunction = FakeFunction  # type: ignore
+    unrealsdk.unreal = unreal  # type: ignore
+
+    mods_base = types.ModuleType("mods_base")
+    mods_base.Game = FakeGame  # type: ignore
+    mods_base.HookType = FakeHook  # type: ignore
+    mods_base.hook = lambda *_, **__: FakeHook  # type: ignore
+    mods_base.open_in_mod_dir = fake_open_in_mod_dir  # type: ignore
+
+    # Create the package without running it's `__init__.py`, so we only import what we need
+    vendor_edit = types.ModuleType("vendor_edit")
+    vendor_edit.__path__ = [str(VENDOR_EDIT_DIR)]
+
+    sys.modules.update(
+        {
+            "unrealsdk": unrealsdk,
+            "unrealsdk.unreal": unreal,
+            "mods_base": mods_base,
+            "vendor_edit": vendor_edit,
+        },
+    )
+    return importlib.import_module("vendor_edit.item_codes")
+
+
+# ==================================================================================================
+
+
+def encode_serial(decoded: bytes) -> bytes:
+    # Leave the key at 0, since decoding it is benchmarked separately, but fix the checksum
+    serial = bytearray(decoded)
+    serial[1:7] = b"\x00\x00\x00\x00\xff\xff"
+    struct.pack_into(">H", serial, 5, calc_serial_checksum(serial))
+    return bytes(serial)
+
+
+# The example from `item_codes.py`, and the example weapon from `_pack_item_code_impl`
+BASE_SERIALS = (
+    encode_serial(
+        decode_serial(b64decode("BwAAAACAVwAHERCgAxIcDgHEA4QFhBzE//////////8VBDuEOsQ=")),
+    ),
+    encode_serial(
+        bytes.fromhex(
+            "87000000004a7e0081c7034004e10198c3708541000302c6ff7f09181b30feff9fc36082310ce3",
+        ),
+    ),
+)
+
+
+def iter_exodus() -> Iterator[bytes]:
+    # See `zdict_experiments/Readme.md` - this is a list of length-prefixed v0 replacement lists
+    data = EXODUS_BIN.read_bytes()
+    pos = 0
+    while pos < len(data):
+        (length,) = struct.unpack_from("<H", data, pos)
+        pos += 2
+        yield data[pos : pos + length]
+        pos += length
+
+
+def to_b64(serial: bytes) -> str:
+    return b64encode(serial.rstrip(b"\xff")).decode()
+
+
+def make_corpus(item_codes: types.ModuleType) -> tuple[list[str], list[str]]:
+    base_codes = [f"BL2({to_b64(serial)})" for serial in BASE_SERIALS]
+
+    # The exodus lists are all weapons, so attach them to the weapon serial. Also need to register
+    # all their parts, so that they can actually be found.
+    weapon_serial = to_b64(BASE_SERIALS[1])
+    modded_codes: list[str] = []
+    for replacements in iter_exodus():
+        values = list(iter_modded_replacements(replacements, WEAPON_FIELDS, MODDED_CODE_V0))
+        for _, value in values:
+            if isinstance(value, bytes):
+                get_object(value.decode())
+
+        for version in (MODDED_CODE_V0, MODDED_CODE_V1):
+            compressed = item_codes._codec.compressor.compress(
+                item_codes.encode_modded_replacements(values, version),
+                version,
+            )
+            modded_codes.append(f"BL2MODDED[{weapon_serial}|{b64encode(compressed).decode()}]")
+
+    return base_codes, modded_codes
+
+
+def bench(name: str, count: int, func: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<48} {count * REPEATS / elapsed:>12,.0f} codes/sec")
+
+
+start = time.perf_counter()
+item_codes = install_stand_in_sdk()
+import_time = time.perf_counter() - start
+start = time.perf_counter()
+item_codes.warm_up()
+warm_up_time = time.perf_counter() - start
+
+base_codes, modded_codes = make_corpus(item_codes)
+all_codes = base_codes * (len(modded_codes) // len(base_codes)) + modded_codes
+
+parsed = [item_codes.parse_item_code(code) for code in all_codes]
+encoded_serials = [serial for serial, _ in parsed]
+compressed_replacements = [replacements for _, replacements in parsed if replacements is not None]
+decompressed = [item_codes._codec.compressor.decompress(x) for x in compressed_replacements]
+replacement_lists = [
+    tuple(iter_modded_replacements(replacements, WEAPON_FIELDS, version))
+    for version, replacements in decompressed
+]
+
+# Make sure everything round trips - v1 codes should come back exactly the same
+def_datas: list[FakeDefData] = []
+for code in all_codes:
+    result, def_data = item_codes.unpack_item_code(code)
+    assert result in {item_codes.UnpackResult.FULL_ITEM, item_codes.UnpackResult.FULL_WEAPON}
+    def_datas.append(def_data)
+    repacked = item_codes.pack_item_code(def_data)
+    if "MODDED" not in code or b64decode(code.split("|")[1])[0] == MODDED_CODE_V1:
+        assert repacked == code, (code, repacked)
+
+
+def unpack_all_uncached() -> None:
+    for code in all_codes:
+        item_codes.clear_caches()
+        item_codes.unpack_item_code(code)
+
+
+def apply_all() -> None:
+    def_data = fake_unpack(
+        types.SimpleNamespace(SerialNumber=types.SimpleNamespace(Buffer=BASE_SERIALS[1])),
+    )[2]
+    for replacements in replacement_lists:
+        item_codes.apply_modded_replacements(def_data, replacements)
+
+
+def round_trip_all() -> None:
+    for code in all_codes:
+        item_codes.pack_item_code(item_codes.unpack_item_code(code)[1])
+
+
+print(f"import: {import_time * 1000:.2f}ms, warm_up: {warm_up_time * 1000:.2f}ms")
+print(f"{len(base_codes)} base codes, {len(modded_codes)} modded codes")
+bench(
+    "parse_item_code",
+    len(all_codes),
+    lambda: [item_codes.parse_item_code(code) for code in all_codes],
+)
+bench(
+    "validate_and_decode_serial_number",
+    len(encoded_serials),
+    lambda: [item_codes.validate_and_decode_serial_number(x) for x in encoded_serials],
+)
+bench(
+    "ReplacementsCompressor.decompress",
+    len(compressed_replacements),
+    lambda: [item_codes._codec.compressor.decompress(x) for x in compressed_replacements],
+)
+bench("apply_modded_replacements", len(replacement_lists), apply_all)
+bench("unpack_item_code (uncached)", len(all_codes), unpack_all_uncached)
+bench(
+    "unpack_item_code (cached)",
+    len(all_codes),
+    lambda: [item_codes.unpack_item_code(code) for code in all_codes],
+)
+bench(
+    "pack_item_code",
+    len(all_codes),
+    lambda: [item_codes.pack_item_code(def_data) for def_data in def_datas],
+)
+bench("round trip", len(all_codes), round_trip_all)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# ruff: noqa: T201, D103
+from __future__ import annotations
+
+import struct
+import sys
+import time
+from base64 import b64encode
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codec import (
+    ITEM_FIELDS,
+    MODDED_CODE_V0,
+    MODDED_CODE_V1,
+    ReplacementsCompressor,
+    encode_modded_replacements,
+    iter_modded_replacements,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+VENDOR_EDIT_DIR = Path(__file__).parent.parent
+EXODUS_BIN = VENDOR_EDIT_DIR / "zdict_experiments" / "exodus.bin"
+REPEATS = 50
+
+VERSIONS = (MODDED_CODE_V0, MODDED_CODE_V1)
+
+
+def load_exodus() -> list[bytes]:
+    # See `zdict_experiments/Readme.md` - this is a list of length-prefixed v0 replacement lists
+    data = EXODUS_BIN.read_bytes()
+    replacements: list[bytes] = []
+    pos = 0
+    while pos < len(data):
+        (length,) = struct.unpack_from("<H", data, pos)
+        pos += 2
+        replacements.append(data[pos : pos + length])
+        pos += length
+    return replacements
+
+
+def bench(name: str, count: int, func: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {count * REPEATS / elapsed:>12,.0f} codes/sec")
+
+
+compressor = ReplacementsCompressor((VENDOR_EDIT_DIR / "zdict").read_bytes())
+
+# The weapon and item fields share the same layout, it doesn't matter which we use here
+parsed = [
+    list(iter_modded_replacements(buffer, ITEM_FIELDS, MODDED_CODE_V0)) for buffer in load_exodus()
+]
+
+compressed: dict[int, list[bytes]] = {
+    version: [
+        compressor.compress(encode_modded_replacements(replacements, version), version)
+        for replacements in parsed
+    ]
+    for version in VERSIONS
+}
+
+for version, codes in compressed.items():
+    for code, replacements in zip(codes, parsed, strict=True):
+        decompressed = compressor.decompress(code)
+        assert decompressed is not None
+        assert decompressed[0] == version
+        assert list(iter_modded_replacements(decompressed[1], ITEM_FIELDS, version)) == replacements
+
+print(f"{len(parsed)} codes from {EXODUS_BIN.name}")
+for version, codes in compressed.items():
+    total_bytes = sum(len(code) for code in codes)
+    total_chars = sum(len(b64encode(code)) for code in codes)
+    print(
+        f"v{version}: {total_bytes:>6} bytes, {total_chars:>6} b64 chars,"
+        f" {total_chars / len(codes):.1f} chars/code",
+    )
+
+for version, codes in compressed.items():
+
+    def decode(codes: list[bytes] = codes) -> None:
+        for code in codes:
+            decompressed = compressor.decompress(code)
+            assert decompressed is not None
+            list(iter_modded_replacements(decompressed[1], ITEM_FIELDS, decompressed[0]))
+
+    bench(f"v{version} decode", len(codes), decode)
+
+for version in VERSIONS:
+
+    def encode(version: int = version) -> None:
+        for replacements in parsed:
+            compressor.compress(encode_modded_replacements(replacements, version), version)
+
+    bench(f"v{version} encode", len(parsed), encode)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# ruff: noqa: T201, D103, S311
+from __future__ import annotations
+
+import random
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from codec import (
+    ITEM_FIELDS,
+    MODDED_CODE_V0,
+    MODDED_CODE_V1,
+    WEAPON_FIELDS,
+    FieldData,
+    encode_modded_replacements,
+    iter_modded_replacements,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    Replacements = list[tuple[FieldData, int | bytes | None]]
+
+NUM_FUZZ_CASES = 20_000
+NUM_LISTS = 200
+REPEATS = 20
+LONG_PATH_LEN = 250
+VERY_LONG_PATH_LEN = 2000
+
+
+def reference_iter_modded_replacements(
+    replacements: bytearray,
+    fields: tuple[FieldData, ...],
+) -> Replacements:
+    """The original reslicing implementation, with the object lookup stripped out."""
+    (replacements_bitmap,) = struct.unpack_from("<H", replacements, 0)
+    replacements = replacements[2:]
+
+    output: Replacements = []
+    replacement_fields = (f for f in fields if (f.mask & replacements_bitmap) != 0)
+    for field in replacement_fields:
+        value: int | bytes | None
+        if field.is_int:
+            (value,) = struct.unpack_from("<i", replacements)
+            replacements = replacements[4:]
+        else:
+            obj_name, _, replacements = replacements.partition(b"\x00")
+            value = bytes(obj_name) if obj_name else None
+        output.append((field, value))
+    return output
+
+
+def random_path(rng: random.Random, length: int) -> bytes:
+    chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.Ä©"
+    return "".join(rng.choice(chars) for _ in range(length)).encode("utf8")
+
+
+def random_replacements(
+    rng: random.Random,
+    fields: tuple[FieldData, ...],
+    path_len: int,
+) -> Replacements:
+    replacements: Replacements = []
+    for field in fields:
+        if rng.random() < 0.5:  # noqa: PLR2004
+            continue
+        if field.is_int:
+            replacements.append((field, rng.randrange(-0x80000000, 0x80000000)))
+        elif rng.random() < 0.1:  # noqa: PLR2004
+            replacements.append((field, None))
+        else:
+            replacements.append((field, random_path(rng, rng.randint(1, path_len))))
+    return replacements
+
+
+def run_either(
+    func: Callable[[bytearray, tuple[FieldData, ...]], Replacements],
+    buffer: bytearray,
+    fields: tuple[FieldData, ...],
+) -> Replacements | type[Exception]:
+    try:
+        return func(buffer, fields)
+    except struct.error:
+        return struct.error
+
+
+def parse_v0(buffer: bytearray, fields: tuple[FieldData, ...]) -> Replacements:
+    return list(iter_modded_replacements(buffer, fields, MODDED_CODE_V0))
+
+
+def fuzz(rng: random.Random) -> None:
+    for _ in range(NUM_FUZZ_CASES):
+        fields = rng.choice((WEAPON_FIELDS, ITEM_FIELDS))
+        replacements = random_replacements(rng, fields, 40)
+
+        # Valid lists should round trip in all versions
+        for version in (MODDED_CODE_V0, MODDED_CODE_V1):
+            encoded = encode_modded_replacements(replacements, version)
+            assert list(iter_modded_replacements(encoded, fields, version)) == replacements
+
+        # Only v0 is supported by the reference, so compare against it on some broken lists
+        buffer = bytearray(encode_modded_replacements(replacements, MODDED_CODE_V0))
+        match rng.randrange(3):
+            case 0:
+                pass
+            case 1:
+                del buffer[rng.randrange(len(buffer) + 1) :]
+            case _:
+                buffer = bytearray(rng.randbytes(rng.randrange(64)))
+                for idx in range(len(buffer)):
+                    if rng.random() < 0.2:  # noqa: PLR2004
+                        buffer[idx] = 0
+
+        expected = run_either(reference_iter_modded_replacements, buffer, fields)
+        actual = run_either(parse_v0, buffer, fields)
+        assert actual == expected, (bytes(buffer), expected, actual)
+
+
+def bench(name: str, func: Callable[[], object]) -> None:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<44} {NUM_LISTS * REPEATS / elapsed:>12,.0f} lists/sec")
+
+
+rng = random.Random(1234)
+fuzz(rng)
+
+for path_len in (40, LONG_PATH_LEN, VERY_LONG_PATH_LEN):
+    corpus: list[tuple[bytes, tuple[FieldData, ...]]] = []
+    for _ in range(NUM_LISTS):
+        fields = rng.choice((WEAPON_FIELDS, ITEM_FIELDS))
+        replacements = random_replacements(rng, fields, path_len)
+        corpus.append((encode_modded_replacements(replacements, MODDED_CODE_V0), fields))
+
+    # The original was always called with a fresh bytearray, so include that in it's time
+    bench(
+        f"reference parse, paths <= {path_len}",
+        lambda: [
+            reference_iter_modded_replacements(bytearray(b), f)
+            for b, f in corpus  # noqa: B023
+        ],
+    )
+    bench(
+        f"iter_modded_replacements, paths <= {path_len}",
+        lambda: [list(iter_modded_replacements(b, f, MODDED_CODE_V0)) for b, f in corpus],  # noqa: B023
+    )
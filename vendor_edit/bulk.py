@@ -0,0 +1,207 @@
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+from mods_base import AbstractCommand, command, get_pc, hook
+from unrealsdk import logging
+
+from .inventory import iter_bank_items, iter_carried_items, spawn_in_backpack
+from .item_codes import UnpackResult, pack_item_code, unpack_item_code
+
+if TYPE_CHECKING:
+    import argparse
+
+__all__: tuple[str, ...] = ("commands",)
+
+
+@command(
+    "vendor_edit_export",
+    description=(
+        "Exports item codes for all your equipped and backpack items to a file, one per line. If"
+        " your bank is currently open, also exports everything in it."
+    ),
+)
+def export_codes(args: argparse.Namespace) -> None:
+    if (pawn := get_pc().Pawn) is None:
+        logging.error("Can only export items while in game.")
+        return
+    inv_manager = pawn.InvManager
+
+    sources = [iter_carried_items(inv_manager)]
+    if (bank_items := iter_bank_items(inv_manager)) is None:
+        logging.info("Your bank isn't open, so it won't be exported.")
+    else:
+        sources.append(bank_items)
+
+    path: Path = args.file
+    exported = 0
+    failed = 0
+    with path.open("w", encoding="utf8") as file:
+        for source in sources:
+            for item in source:
+                try:
+                    code = pack_item_code(item.DefinitionData)
+                except RuntimeError:
+                    name = item.GetShortHumanReadableName()
+                    logging.warning(f"Couldn't create a code for {name}")
+                    failed += 1
+                    continue
+
+                file.write(code + "\n")
+                exported += 1
+
+    logging.info(f"Exported {exported} items to {path.resolve()}")
+    if failed > 0:
+        logging.warning(f"Failed to export {failed} items")
+
+
+export_codes.add_argument("file", type=Path, help="The file to write the codes to.")
+
+
+@dataclass
+class PendingImport:
+    path: Path
+    file: IO[bytes]
+    size: int
+    batch_size: int
+
+    line_num: int = 0
+    results: Counter[UnpackResult] = field(default_factory=Counter[UnpackResult])
+    # Lines which raised while unpacking or spawning
+    failed: int = 0
+
+    @property
+    def processed(self) -> int:
+        """The number of codes processed so far, including failed ones."""
+        return self.results.total() + self.failed
+
+
+# Creating items is relatively slow, so we only import one batch each tick, to keep the game
+# responsive during large imports
+_pending_import: PendingImport | None = None
+
+
+@command(
+    "vendor_edit_import",
+    description=(
+        "Imports item codes from a file, one per line, adding them all to your backpack. Large"
+        " files are imported over multiple frames."
+    ),
+)
+def import_codes(args: argparse.Namespace) -> None:
+    global _pending_import
+
+    if _pending_import is not None:
+        logging.error(f"Already importing from {_pending_import.path}")
+        return
+    if get_pc().Pawn is None:
+        logging.error("Can only import items while in game.")
+        return
+    if args.batch_size <= 0:
+        logging.error("Batch size must be positive.")
+        return
+
+    path: Path = args.file
+    try:
+        file = path.open("rb")
+    except OSError as ex:
+        logging.error(f"Couldn't open {path}: {ex}")
+        return
+
+    _pending_import = PendingImport(
+        path=path,
+        file=file,
+        size=path.stat().st_size,
+        batch_size=args.batch_size,
+    )
+    import_tick.enable()
+    logging.info(f"Importing from {path.resolve()}")
+
+
+import_codes.add_argument("file", type=Path, help="The file to read codes from.")
+import_codes.add_argument(
+    "-b",
+    "--batch-size",
+    type=int,
+    default=20,
+    help="How many codes to import each frame.",
+)
+
+
+def finish_import(pending: PendingImport) -> None:
+    """
+    Finishes an import, logging the final results.
+
+    Args:
+        pending: The import to finish.
+    """
+    global _pending_import
+    _pending_import = None
+    import_tick.disable()
+    pending.file.close()
+
+    total = pending.processed
+    imported = sum(
+        pending.results[result]
+        for result in (
+            UnpackResult.FULL_WEAPON,
+            UnpackResult.FULL_ITEM,
+            UnpackResult.PARTIAL_WEAPON,
+            UnpackResult.PARTIAL_ITEM,
+        )
+    )
+    logging.info(f"Imported {imported}/{total} codes from {pending.path.name}:")
+    for result, count in pending.results.most_common():
+        logging.info(f"    {result.name}: {count}")
+    if pending.failed > 0:
+        logging.info(f"    FAILED: {pending.failed}")
+
+
+@hook("WillowGame.WillowGameViewportClient:Tick")
+def import_tick(*_: Any) -> None:
+    pending = _pending_import
+    if pending is None:
+        import_tick.disable()
+        return
+
+    # Wait until we're in game again if we got interrupted by a map change
+    if (pawn := get_pc().Pawn) is None:
+        return
+
+    for _ in range(pending.batch_size):
+        line = pending.file.readline()
+        if not line:
+            finish_import(pending)
+            return
+        pending.line_num += 1
+
+        code = line.decode("utf8", errors="replace").strip()
+        if not code:
+            continue
+
+        # Don't let one bad line take the rest of the batch down with it
+        try:
+            result, def_data = unpack_item_code(code)
+            spawn_in_backpack(pawn, result, def_data)
+        except Exception:  # noqa: BLE001
+            logging.error(f"Line {pending.line_num}: failed to import")
+            logging.dev_warning(traceback.format_exc())
+            pending.failed += 1
+            continue
+        pending.results[result] += 1
+
+        match result:
+            case UnpackResult.FULL_WEAPON | UnpackResult.FULL_ITEM:
+                pass
+            case UnpackResult.PARTIAL_WEAPON | UnpackResult.PARTIAL_ITEM:
+                logging.warning(f"Line {pending.line_num}: some modded parts were not found")
+            case _:
+                logging.warning(f"Line {pending.line_num}: {result.name}")
+
+    progress = pending.file.tell() / max(pending.size, 1)
+    logging.info(f"Processed {pending.processed} codes ({progress:.0%})")
+
+
+commands: tuple[AbstractCommand, ...] = (export_codes, import_codes)
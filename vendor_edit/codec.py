@@ -0,0 +1,579 @@
+from __future__ import annotations
+
+import re
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+# This module holds the parts of the item code format which don't need the game. It must not import
+# unrealsdk or mods_base (or use relative imports), so that it can also be imported from a regular
+# interpreter, for offline tools and benchmarks.
+
+__all__: tuple[str, ...] = (
+    "ITEM_FIELDS",
+    "ITEM_SERIAL_LAYOUT",
+    "MODDED_CODE_V0",
+    "MODDED_CODE_V1",
+    "MODDED_CODE_VERSION",
+    "RE_ITEM_CODE",
+    "WEAPON_FIELDS",
+    "WEAPON_SERIAL_LAYOUT",
+    "AssetIndex",
+    "FieldData",
+    "ReplacementsCompressor",
+    "SerialField",
+    "UnpackedSerial",
+    "calc_serial_checksum",
+    "calc_serial_checksums",
+    "decode_serial",
+    "encode_modded_replacements",
+    "gearbox_crc",
+    "iter_modded_replacements",
+    "unpack_serial",
+    "validate_and_decode_serial_number",
+)
+
+RE_ITEM_CODE = re.compile(
+    r"^(\w+)(?:\((.+?)\)|MODDED\[(.+?)\|(.+?)\])$",
+    flags=re.I,
+)
+
+# This code all ported from Gibbed's editor.
+# https://github.com/gibbed/Gibbed.Gearbox/blob/cdb03b048e4989c2272162ebc40f5f34f14712fd/Gibbed.Gearbox.Common/CRC32.cs#L38
+
+KEY_MULTIPLIER = 0x10A860C1
+KEY_MODULUS = 0xFFFFFFFB
+
+# The key stream is a simple LCG, `key = (key * MULT) % MOD`, run once per byte. Rather than
+# stepping it one byte at a time, we can precompute `MULT ** n % MOD`, after which the n-th key is
+# just `(initial * table[n]) % MOD`. Better yet, we can pack the entire table into a single big int,
+# with each entry in it's own 64-bit lane, and then work on every lane at once using a handful of
+# big int operations - which is a lot cheaper than looping in Python.
+MAX_SERIAL_LEN = 40
+_LANE_BITS = 64
+_NUM_LANES = MAX_SERIAL_LEN
+
+_KEY_STEP_LANES = sum(
+    pow(KEY_MULTIPLIER, n + 1, KEY_MODULUS) << (n * _LANE_BITS) for n in range(_NUM_LANES)
+)
+_LOW_32_LANES = sum(0xFFFFFFFF << (n * _LANE_BITS) for n in range(_NUM_LANES))
+_ONE_LANES = sum(1 << (n * _LANE_BITS) for n in range(_NUM_LANES))
+_FIVE_LANES = _ONE_LANES * 5
+
+
+def _key_stream(key: int, length: int) -> bytes:
+    """
+    Generates the bytes to xor a serial with.
+
+    Args:
+        key: The initial key.
+        length: How many bytes to generate.
+    Returns:
+        The key stream.
+    """
+    if length > _NUM_LANES:
+        # Anything this long isn't a valid serial, but support it anyway to match the original
+        # algorithm
+        stream = bytearray()
+        for _ in range(length):
+            key = (key * KEY_MULTIPLIER) % KEY_MODULUS
+            stream.append(key & 0xFF)
+        return bytes(stream)
+
+    # Reducing the key first means each lane's product fits in 64 bits
+    lanes = (key % KEY_MODULUS) * _KEY_STEP_LANES
+
+    # The modulus is `2**32 - 5`, so `x = hi * 2**32 + lo` is congruent to `hi * 5 + lo`. Two rounds
+    # of this brings every lane down to at most `2**32 + 30`, without ever carrying between lanes.
+    lanes = ((lanes >> 32) & _LOW_32_LANES) * 5 + (lanes & _LOW_32_LANES)
+    lanes = ((lanes >> 32) & _LOW_32_LANES) * 5 + (lanes & _LOW_32_LANES)
+
+    # Lanes which are still >= the modulus need one more subtraction. Adding 5 overflows into bit
+    # 32 exactly for those lanes - and since we only care about the low byte, subtracting the
+    # modulus is the same as adding 5.
+    lanes += (((lanes + _FIVE_LANES) >> 32) & _ONE_LANES) * 5
+
+    # Finally, grab the low byte of each lane
+    return lanes.to_bytes(_NUM_LANES * _LANE_BITS // 8, "little")[: length * _LANE_BITS // 8 : 8]
+
+
+def decode_serial(encoded_serial: bytes | bytearray) -> bytearray:
+    """
+    Decode an encoded serial number.
+
+    Args:
+        encoded_serial: The encoded serial number.
+    Returns:
+        The decoded serial number.
+    """
+    (key_and_steps,) = struct.unpack_from(">i", encoded_serial, 1)
+    key = key_and_steps >> 5
+
+    if key == 0:
+        return bytearray(encoded_serial)
+
+    length = len(encoded_serial) - 5
+    xored = (
+        int.from_bytes(encoded_serial[5:], "little")
+        ^ int.from_bytes(_key_stream(key, length), "little")
+    ).to_bytes(length, "little")
+
+    steps = (key_and_steps & 0b11111) % length
+    return bytearray((encoded_serial[0], 0, 0, 0, 0)) + xored[-steps:] + xored[:-steps]
+
+
+# Checksums are always calculated over a full 40 byte buffer, padded with 0xFF
+_CHECKSUM_PADDING = memoryview(b"\xff" * MAX_SERIAL_LEN)
+
+
+def calc_serial_checksum(serial: bytes | bytearray) -> int:
+    """
+    Calculates the 16-bit checksum stored in bytes 5 and 6 of a serial number.
+
+    Args:
+        serial: The serial number to calculate the checksum of.
+    Returns:
+        The checksum
+    """
+    crc = gearbox_crc(serial)
+    return (crc >> 16) ^ (crc & 0xFFFF)
+
+
+def calc_serial_checksums(serials: Iterable[bytes | bytearray]) -> list[int]:
+    """
+    Calculates the checksums of many serial numbers at once.
+
+    Args:
+        serials: The serial numbers to calculate the checksums of.
+    Returns:
+        A list of the checksums, in the same order.
+    """
+    crc32 = zlib.crc32
+    padding = _CHECKSUM_PADDING
+
+    output: list[int] = []
+    for serial in serials:
+        crc = crc32(padding[len(serial) :], crc32(serial))
+        output.append((crc >> 16) ^ (crc & 0xFFFF))
+    return output
+
+
+def gearbox_crc(buffer: bytes | bytearray) -> int:
+    """
+    Calculates a crc using gearbox's special settings.
+
+    Args:
+        buffer: The bytes to crc.
+    Returns:
+        The crc, as an integer.
+    """
+    # Gearbox's "special settings" turn out to just be standard (reflected) CRC32 - the same table,
+    # initial value, and final xor - run over a buffer padded to 40 bytes. This means we can hand it
+    # straight off to zlib.
+    return zlib.crc32(_CHECKSUM_PADDING[len(buffer) :], zlib.crc32(buffer))
+
+
+def validate_and_decode_serial_number(encoded_serial: bytes) -> bytearray | None:
+    """
+    Decodes a serial number, and validates that it looks sane.
+
+    Args:
+        encoded_serial: The encoded serial number to decode.
+    Returns:
+        The decoded serial number, padded to 40 bytes, or None on error.
+    """
+    # 1 byte prefix, 4 byte key, 2 byte checksum, and assume at least 1 byte of data = 8 min
+    # The buffer it's going into accepts 40 max
+    if len(encoded_serial) not in range(8, MAX_SERIAL_LEN + 1):
+        return None
+
+    decoded_buffer = decode_serial(encoded_serial).ljust(MAX_SERIAL_LEN, b"\xff")
+
+    # Make sure the checksum is valid
+    (original_check,) = struct.unpack_from(">H", decoded_buffer, 5)
+
+    decoded_buffer[5:7] = (0xFF, 0xFF)
+    check = calc_serial_checksum(decoded_buffer)
+
+    if check != original_check:
+        return None
+
+    return decoded_buffer
+
+
+class SerialField(NamedTuple):
+    name: str
+    # The asset library the field is looked up in, or None if it's a raw int
+    library: str | None
+    asset_bits: int
+    sublibrary_bits: int = 0
+
+
+# See the format description in `item_codes.py`
+SERIAL_VERSION = 7
+
+WEAPON_SERIAL_LAYOUT: tuple[SerialField, ...] = (
+    SerialField("WeaponTypeDefinition", "WeaponTypes", 6, 7),
+    SerialField("BalanceDefinition", "BalanceDefs", 10, 10),
+    SerialField("ManufacturerDefinition", "Manufacturers", 7, 4),
+    SerialField("ManufacturerGradeIndex", None, 7),
+    SerialField("GameStage", None, 7),
+    SerialField("BodyPartDefinition", "WeaponParts", 11, 6),
+    SerialField("GripPartDefinition", "WeaponParts", 11, 6),
+    SerialField("BarrelPartDefinition", "WeaponParts", 11, 6),
+    SerialField("SightPartDefinition", "WeaponParts", 11, 6),
+    SerialField("StockPartDefinition", "WeaponParts", 11, 6),
+    SerialField("ElementalPartDefinition", "WeaponParts", 11, 6),
+    SerialField("Accessory1PartDefinition", "WeaponParts", 11, 6),
+    SerialField("Accessory2PartDefinition", "WeaponParts", 11, 6),
+    SerialField("MaterialPartDefinition", "WeaponParts", 11, 6),
+    SerialField("PrefixPartDefinition", "WeaponParts", 11, 6),
+    SerialField("TitlePartDefinition", "WeaponParts", 11, 6),
+)
+
+ITEM_SERIAL_LAYOUT: tuple[SerialField, ...] = (
+    SerialField("ItemDefinition", "ItemTypes", 8, 9),
+    SerialField("BalanceDefinition", "BalanceDefs", 10, 10),
+    SerialField("ManufacturerDefinition", "Manufacturers", 7, 4),
+    SerialField("ManufacturerGradeIndex", None, 7),
+    SerialField("GameStage", None, 7),
+    SerialField("AlphaItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("BetaItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("GammaItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("DeltaItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("EpsilonItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("ZetaItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("EtaItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("ThetaItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("MaterialItemPartDefinition", "ItemParts", 10, 6),
+    SerialField("PrefixItemNamePartDefinition", "ItemParts", 10, 6),
+    SerialField("TitleItemNamePartDefinition", "ItemParts", 10, 6),
+)
+
+
+class AssetIndex(NamedTuple):
+    sublibrary: int
+    asset: int
+    # If set, the asset is looked up in the serial's set, otherwise it's in the base set (0)
+    use_set_id: bool
+
+
+class UnpackedSerial(NamedTuple):
+    is_weapon: bool
+    set_id: int
+    # Field name -> the raw int, the asset index, or None if the slot is empty
+    fields: dict[str, int | AssetIndex | None]
+
+
+def unpack_serial(decoded_serial: bytes | bytearray) -> UnpackedSerial | None:
+    """
+    Unpacks the bit stream in a decoded serial number into it's raw field values.
+
+    This only reads the serial, it doesn't look anything up in the asset library.
+
+    Args:
+        decoded_serial: The decoded serial number.
+    Returns:
+        The unpacked serial, or None if it's not a version we understand.
+    """
+    if len(decoded_serial) < 8 or (decoded_serial[0] & 0x7F) != SERIAL_VERSION:  # noqa: PLR2004
+        return None
+
+    is_weapon = (decoded_serial[0] >> 7) != 0
+    layout = WEAPON_SERIAL_LAYOUT if is_weapon else ITEM_SERIAL_LAYOUT
+
+    # Since fields are read starting from the LSB, treating the whole stream as one little endian
+    # int lets us just mask and shift them off the bottom
+    bits = int.from_bytes(decoded_serial[8:], "little")
+
+    fields: dict[str, int | AssetIndex | None] = {}
+    for name, library, asset_bits, sublibrary_bits in layout:
+        width = asset_bits + sublibrary_bits
+        mask = (1 << width) - 1
+        value = bits & mask
+        bits >>= width
+
+        if library is None:
+            fields[name] = value
+        elif value == mask:
+            fields[name] = None
+        else:
+            sublibrary = value >> asset_bits
+            set_id_bit = 1 << (sublibrary_bits - 1)
+            fields[name] = AssetIndex(
+                sublibrary & ~set_id_bit,
+                value & ((1 << asset_bits) - 1),
+                (sublibrary & set_id_bit) != 0,
+            )
+
+    return UnpackedSerial(is_weapon, decoded_serial[7], fields)
+
+
+@dataclass
+class FieldData:
+    name: str
+    mask: int
+    is_int: bool = False
+
+
+# See `modded_item_codes.md`
+WEAPON_FIELDS = (
+    FieldData("WeaponTypeDefinition", 0x8000),
+    FieldData("BalanceDefinition", 0x4000),
+    FieldData("ManufacturerDefinition", 0x2000),
+    FieldData("ManufacturerGradeIndex", 0x1000, is_int=True),
+    FieldData("BodyPartDefinition", 0x0800),
+    FieldData("GripPartDefinition", 0x0400),
+    FieldData("BarrelPartDefinition", 0x0200),
+    FieldData("SightPartDefinition", 0x0100),
+    FieldData("StockPartDefinition", 0x0080),
+    FieldData("ElementalPartDefinition", 0x0040),
+    FieldData("Accessory1PartDefinition", 0x0020),
+    FieldData("Accessory2PartDefinition", 0x0010),
+    FieldData("MaterialPartDefinition", 0x0008),
+    FieldData("PrefixPartDefinition", 0x0004),
+    FieldData("TitlePartDefinition", 0x0002),
+    FieldData("GameStage", 0x0001, is_int=True),
+)
+
+ITEM_FIELDS = (
+    FieldData("ItemDefinition", 0x8000),
+    FieldData("BalanceDefinition", 0x4000),
+    FieldData("ManufacturerDefinition", 0x2000),
+    FieldData("ManufacturerGradeIndex", 0x1000, is_int=True),
+    FieldData("AlphaItemPartDefinition", 0x0800),
+    FieldData("BetaItemPartDefinition", 0x0400),
+    FieldData("GammaItemPartDefinition", 0x0200),
+    FieldData("DeltaItemPartDefinition", 0x0100),
+    FieldData("EpsilonItemPartDefinition", 0x0080),
+    FieldData("ZetaItemPartDefinition", 0x0040),
+    FieldData("EtaItemPartDefinition", 0x0020),
+    FieldData("ThetaItemPartDefinition", 0x0010),
+    FieldData("MaterialItemPartDefinition", 0x0008),
+    FieldData("PrefixItemNamePartDefinition", 0x0004),
+    FieldData("TitleItemNamePartDefinition", 0x0002),
+    FieldData("GameStage", 0x0001, is_int=True),
+)
+
+# See `modded_item_codes.md`
+MODDED_CODE_V0 = 0
+MODDED_CODE_V1 = 1
+MODDED_CODE_VERSION = MODDED_CODE_V1
+
+_REPLACEMENT_BITMAP = struct.Struct("<H")
+_REPLACEMENT_INT = struct.Struct("<i")
+_INT32_MIN = -(1 << 31)
+_INT32_MAX = (1 << 31) - 1
+_MAX_VARINT_BYTES = 5
+
+
+def _encode_varint(value: int) -> bytes:
+    """
+    Encodes an int as a zig-zag LEB128 varint.
+
+    Args:
+        value: The int to encode.
+    Returns:
+        The encoded bytes.
+    """
+    value = (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+    output = bytearray()
+    while value >= 0x80:  # noqa: PLR2004
+        output.append((value & 0x7F) | 0x80)
+        value >>= 7
+    output.append(value)
+    return bytes(output)
+
+
+def _decode_varint(buffer: bytes, pos: int) -> tuple[int, int]:
+    """
+    Decodes a zig-zag LEB128 varint.
+
+    Args:
+        buffer: The buffer to decode from.
+        pos: The offset to start decoding at.
+    Returns:
+        A tuple of the decoded int, and the offset of the next byte after it.
+    """
+    value = 0
+    for idx in range(_MAX_VARINT_BYTES):
+        if pos >= len(buffer):
+            raise ValueError("truncated varint in modded replacements")
+        byte = buffer[pos]
+        pos += 1
+        value |= (byte & 0x7F) << (7 * idx)
+        if byte < 0x80:  # noqa: PLR2004
+            break
+    else:
+        raise ValueError("overlong varint in modded replacements")
+
+    value = (value >> 1) ^ -(value & 1)
+    if not (_INT32_MIN <= value <= _INT32_MAX):
+        raise ValueError("varint in modded replacements is out of range")
+    return value, pos
+
+
+def iter_modded_replacements(
+    replacements: bytes | bytearray,
+    fields: tuple[FieldData, ...],
+    version: int,
+) -> Iterator[tuple[FieldData, int | bytes | None]]:
+    """
+    Iterates through the values in a decompressed modded replacements list.
+
+    This walks a cursor through the buffer, rather than slicing off each field as it's read, so the
+    only copies made are of the part names themselves.
+
+    Args:
+        replacements: The decompressed modded replacements list.
+        fields: The set of fields which apply to this item.
+        version: The modded code version the list was encoded with.
+    Yields:
+        Tuples of each field which has a replacement, and it's new value. This is an int for int
+        fields, and either the encoded part path name, or None, for object fields.
+    """
+    # Slicing a bytes object gives us the name directly, without going through an intermediate
+    # memoryview/bytearray object
+    if not isinstance(replacements, bytes):
+        replacements = bytes(replacements)
+
+    (replacements_bitmap,) = _REPLACEMENT_BITMAP.unpack_from(replacements, 0)
+
+    pos = _REPLACEMENT_BITMAP.size
+    for field in fields:
+        if (field.mask & replacements_bitmap) == 0:
+            continue
+
+        if field.is_int:
+            if version == MODDED_CODE_V0:
+                (value,) = _REPLACEMENT_INT.unpack_from(replacements, pos)
+                pos += _REPLACEMENT_INT.size
+            else:
+                value, pos = _decode_varint(replacements, pos)
+            yield field, value
+        else:
+            # If the last string is missing it's terminator, treat it as running to the end
+            if (terminator := replacements.find(0, pos)) < 0:
+                terminator = len(replacements)
+            yield field, replacements[pos:terminator] or None
+            pos = terminator + 1
+
+
+def encode_modded_replacements(
+    replacements: Iterable[tuple[FieldData, int | bytes | None]],
+    version: int = MODDED_CODE_VERSION,
+) -> bytes:
+    """
+    Encodes a modded replacements list, before compression.
+
+    This is the inverse of `iter_modded_replacements`.
+
+    Args:
+        replacements: Tuples of each field which needs a replacement and it's new value. Must be
+                      given in the same order as the fields are defined.
+        version: The modded code version to encode with.
+    Returns:
+        The encoded replacements list.
+    """
+    replacements_bitmap = 0
+    data: list[bytes] = []
+    for field, value in replacements:
+        replacements_bitmap |= field.mask
+        if field.is_int:
+            assert isinstance(value, int)
+            if version == MODDED_CODE_V0:
+                data.append(_REPLACEMENT_INT.pack(value))
+            else:
+                data.append(_encode_varint(value))
+        else:
+            assert not isinstance(value, int)
+            if value is not None:
+                data.append(value)
+            data.append(b"\x00")
+
+    return _REPLACEMENT_BITMAP.pack(replacements_bitmap) + b"".join(data)
+
+
+class ReplacementsCompressor:
+    """
+    Compresses and decompresses modded replacement lists, using the custom zlib dictionary.
+
+    Setting the dictionary up is relatively slow, so this does it once, and then just copies the
+    (de)compressor objects on each call.
+    """
+
+    def __init__(self, zdict: bytes) -> None:
+        """
+        Creates a new compressor.
+
+        Args:
+            zdict: The zlib dictionary to use.
+        """
+        # v0 uses a full zlib stream. v1 uses a raw deflate stream, dropping the zlib header, dict
+        # id, and adler32 checksum, which saves 10 bytes per code.
+        wbits = {MODDED_CODE_V0: zlib.MAX_WBITS, MODDED_CODE_V1: -zlib.MAX_WBITS}
+        self._compressors = {
+            version: zlib.compressobj(level=zlib.Z_BEST_COMPRESSION, wbits=bits, zdict=zdict)
+            for version, bits in wbits.items()
+        }
+        self._decompressors = {
+            version: zlib.decompressobj(wbits=bits, zdict=zdict) for version, bits in wbits.items()
+        }
+
+    def compress(self, replacements: bytes, version: int = MODDED_CODE_VERSION) -> bytes:
+        """
+        Compresses an encoded modded replacements list.
+
+        Args:
+            replacements: The encoded replacements list.
+            version: The modded code version to compress with.
+        Returns:
+            The compressed buffer, including the leading version byte.
+        """
+        compressor = self._compressors[version].copy()
+        return bytes((version,)) + compressor.compress(replacements) + compressor.flush()
+
+    def decompress(self, compressed_replacements: bytes) -> tuple[int, bytes] | None:
+        """
+        Decompresses a modded replacements list, and validates that it looks sane.
+
+        Args:
+            compressed_replacements: The compressed buffer, including the leading version byte.
+        Returns:
+            A tuple of the version and the decompressed replacements list, or None on error.
+        """
+        if not compressed_replacements:
+            return None
+        version = compressed_replacements[0]
+
+        match version:
+            # 2 byte zlib header, 4 byte zlib dict id, 4 byte zlib adler, and assume at least 1 byte
+            # of compressed data
+            case 0 if len(compressed_replacements) < 12:  # noqa: PLR2004
+                return None
+            # Raw deflate has no framing, but still needs at least 1 byte of data
+            case 1 if len(compressed_replacements) < 2:  # noqa: PLR2004
+                return None
+            case 0 | 1:
+                pass
+            case _:
+                return None
+
+        decompressor = self._decompressors[version].copy()
+        try:
+            decompressed = decompressor.decompress(compressed_replacements[1:])
+            decompressed += decompressor.flush()
+        except zlib.error:
+            return None
+
+        # Raw deflate streams don't have a checksum, so at least make sure the stream ended exactly
+        # where the buffer did
+        if version == MODDED_CODE_V1 and (not decompressor.eof or decompressor.unused_data):
+            return None
+
+        return version, decompressed
@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING
+
+from mods_base import AbstractCommand, command, get_pc
+from unrealsdk import logging
+from unrealsdk.unreal import UObject
+
+from .inventory import iter_bank_items, iter_carried_items, iter_stash_items
+from .item_codes import canonical_item_key
+
+if TYPE_CHECKING:
+    import argparse
+    from collections.abc import Iterator
+
+type WillowInventory = UObject
+
+__all__: tuple[str, ...] = ("commands",)
+
+
+@command(
+    "vendor_edit_duplicates",
+    description=(
+        "Finds exact duplicates of items across your equipped items and backpack, as well as your"
+        " bank and stash if they're currently open."
+    ),
+)
+def find_duplicates(_: argparse.Namespace) -> None:
+    if (pawn := get_pc().Pawn) is None:
+        logging.error("Can only search for duplicates while in game.")
+        return
+    inv_manager = pawn.InvManager
+
+    sources: dict[str, Iterator[WillowInventory]] = {"carried": iter_carried_items(inv_manager)}
+    for location, items in (
+        ("bank", iter_bank_items(inv_manager)),
+        ("stash", iter_stash_items(inv_manager)),
+    ):
+        if items is None:
+            logging.info(f"Your {location} isn't open, so it won't be searched.")
+        else:
+            sources[location] = items
+
+    # Two items are exact duplicates exactly when they'd create the same item code, so we can find
+    # them all in one pass just by grouping on the canonical item data
+    copies: defaultdict[bytes, list[tuple[str, WillowInventory]]] = defaultdict(list)
+    failed = 0
+    for location, items in sources.items():
+        for item in items:
+            try:
+                key = canonical_item_key(item.DefinitionData)
+            except RuntimeError:
+                failed += 1
+                continue
+            copies[key].append((location, item))
+
+    total = sum(len(item_copies) for item_copies in copies.values())
+    duplicates = sorted(
+        (item_copies for item_copies in copies.values() if len(item_copies) > 1),
+        key=len,
+        reverse=True,
+    )
+    if not duplicates:
+        logging.info(f"Found no duplicates in {total} items.")
+    else:
+        extra = sum(len(item_copies) - 1 for item_copies in duplicates)
+        logging.info(f"Found {len(duplicates)} duplicated items in {total}, {extra} extra copies:")
+        for item_copies in duplicates:
+            name = item_copies[0][1].GetShortHumanReadableName()
+            locations = Counter(location for location, _ in item_copies)
+            where = ", ".join(f"{count} {location}" for location, count in locations.items())
+            logging.info(f"    {len(item_copies)}x {name} ({where})")
+
+    if failed > 0:
+        logging.warning(f"Couldn't check {failed} items")
+
+
+commands: tuple[AbstractCommand, ...] = (find_duplicates,)
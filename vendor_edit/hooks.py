@@ -1,6 +1,5 @@
 from typing import Any
 
-import unrealsdk
 from mods_base import (
     BaseOption,
     EInputEvent,
@@ -15,6 +14,7 @@ from unrealsdk.hooks import Block, Type, Unset, prevent_hooking_direct_calls
 from unrealsdk.unreal import BoundFunction, UObject, WrappedStruct
 
 from .editor import EBackButtonScreen, open_editor_menu
+from .inventory import spawn_in_backpack
 from .item_codes import UnpackResult, pack_item_code, unpack_item_code
 
 type StatusMenuExGFxMovie = UObject
@@ -234,10 +234,6 @@ def chat_error_for_item_paste(result: UnpackResult) -> None:
     show_chat_message(msg, user="[Vendor Edit]", timestamp=None)
 
 
-CREATE_WEAPON_FROM_DEF = unrealsdk.find_class("WillowWeapon").ClassDefaultObject.CreateWeaponFromDef
-CREATE_ITEM_FROM_DEF = unrealsdk.find_class("WillowItem").ClassDefaultObject.CreateItemFromDef
-
-
 def handle_paste_press(obj: StatusMenuExGFxMovie) -> tuple[type[Block], bool] | None:
     """
     Handles a "Paste Code" press.
@@ -255,28 +251,9 @@ def handle_paste_press(obj: StatusMenuExGFxMovie) -> tuple[type[Block], bool] |
     result, def_data = unpack_item_code(code)
     chat_error_for_item_paste(result)
 
-    owner = obj.WPCOwner.Pawn
-
-    match result:
-        case UnpackResult.FULL_WEAPON | UnpackResult.PARTIAL_WEAPON:
-            item = CREATE_WEAPON_FROM_DEF(
-                NewWeaponDef=def_data,
-                PlayerOwner=owner,
-                bForceSelectNameParts=True,
-            )
-        case UnpackResult.FULL_ITEM | UnpackResult.PARTIAL_ITEM:
-            item = CREATE_ITEM_FROM_DEF(
-                NewItemDef=def_data,
-                PlayerOwner=owner,
-                NewQuantity=1,
-                bForceSelectNameParts=True,
-            )
-
-        case _:
-            return Block, True
-
-    owner.InvManager.AddInventoryToBackpack(item)
-    item.Owner = owner
+    item = spawn_in_backpack(obj.WPCOwner.Pawn, result, def_data)
+    if item is None:
+        return Block, True
 
     global _item_to_edit
     _item_to_edit = item
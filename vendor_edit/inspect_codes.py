@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+
+# This file is a standalone tool to decode item codes into their parts, without needing the game. It
+# should be run in a regular interpreter, it (obviously) won't do anything from inside the game.
+#
+# It needs a copy of the relevant game's asset library json, see the links in `item_codes.py`.
+#
+#   python inspect_codes.py -l "Asset Library Manager.json" codes.txt
+#   python inspect_codes.py -l "Asset Library Manager.json" --json < codes.txt
+from __future__ import annotations
+
+import binascii
+import json
+import struct
+import sys
+import time
+from argparse import ArgumentParser, FileType
+from base64 import b64decode
+from collections import Counter
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+from asset_library import AssetLibrary
+from codec import (
+    ITEM_FIELDS,
+    ITEM_SERIAL_LAYOUT,
+    RE_ITEM_CODE,
+    WEAPON_FIELDS,
+    WEAPON_SERIAL_LAYOUT,
+    AssetIndex,
+    ReplacementsCompressor,
+    UnpackedSerial,
+    iter_modded_replacements,
+    unpack_serial,
+    validate_and_decode_serial_number,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+def lookup_base_parts(
+    unpacked: UnpackedSerial,
+    library: AssetLibrary,
+) -> tuple[dict[str, str | int | None], set[str]]:
+    """
+    Looks up all the parts in an unpacked serial.
+
+    Args:
+        unpacked: The unpacked serial.
+        library: The asset library to look up parts in.
+    Returns:
+        A tuple of the field name -> part dict, and the set of fields whose parts weren't found.
+    """
+    missing: set[str] = set()
+    parts: dict[str, str | int | None] = {}
+    for field in WEAPON_SERIAL_LAYOUT if unpacked.is_weapon else ITEM_SERIAL_LAYOUT:
+        value = unpacked.fields[field.name]
+        if field.library is not None and isinstance(value, AssetIndex):
+            path = library.lookup(
+                field.library,
+                unpacked.set_id if value.use_set_id else 0,
+                value.sublibrary,
+                value.asset,
+            )
+            if path is None:
+                missing.add(field.name)
+                path = f"<unknown {value.sublibrary}/{value.asset}>"
+            parts[field.name] = path
+        else:
+            parts[field.name] = value
+    return parts, missing
+
+
+def read_modded_parts(
+    compressed_replacements: bytes,
+    is_weapon: bool,
+    compressor: ReplacementsCompressor,
+) -> tuple[int, dict[str, str | int | None]] | None:
+    """
+    Reads the parts out of a modded replacements list.
+
+    Args:
+        compressed_replacements: The compressed replacements list.
+        is_weapon: True if the code is for a weapon.
+        compressor: The compressor to decompress the replacements with.
+    Returns:
+        A tuple of the modded code version and the field name -> replaced part dict, or None if the
+        replacements were malformed.
+    """
+    decompressed = compressor.decompress(compressed_replacements)
+    if decompressed is None:
+        return None
+    version, replacements = decompressed
+
+    parts: dict[str, str | int | None] = {}
+    try:
+        for field, value in iter_modded_replacements(
+            replacements,
+            WEAPON_FIELDS if is_weapon else ITEM_FIELDS,
+            version,
+        ):
+            parts[field.name] = (
+                value.decode("utf8", errors="replace") if isinstance(value, bytes) else value
+            )
+    except struct.error, ValueError:
+        return None
+    return version, parts
+
+
+def inspect_code(
+    code: str,
+    library: AssetLibrary,
+    compressor: ReplacementsCompressor,
+) -> dict[str, Any]:
+    """
+    Decodes a single item code.
+
+    Args:
+        code: The item code.
+        library: The asset library to look up parts in.
+        compressor: The compressor to decompress modded replacements with.
+    Returns:
+        A json-compatible dict describing the code.
+    """
+    output: dict[str, Any] = {"code": code}
+
+    match = RE_ITEM_CODE.match(code)
+    if match is None:
+        output["result"] = "no_match"
+        return output
+
+    output["prefix"] = match.group(1)
+    output["modded"] = match.group(3) is not None
+
+    try:
+        encoded_serial = b64decode(match.group(2) or match.group(3), validate=True)
+        compressed_replacements = (
+            None if match.group(4) is None else b64decode(match.group(4), validate=True)
+        )
+    except binascii.Error:
+        output["result"] = "malformed_code"
+        return output
+
+    decoded = validate_and_decode_serial_number(encoded_serial)
+    unpacked = None if decoded is None else unpack_serial(decoded)
+    if unpacked is None:
+        output["result"] = "malformed_code"
+        return output
+
+    output["is_weapon"] = unpacked.is_weapon
+    output["set_id"] = unpacked.set_id
+
+    parts, missing = lookup_base_parts(unpacked, library)
+
+    if compressed_replacements is not None:
+        modded = read_modded_parts(compressed_replacements, unpacked.is_weapon, compressor)
+        if modded is None:
+            output["result"] = "malformed_code"
+            return output
+        output["modded_version"], modded_parts = modded
+
+        # Modded parts aren't in the asset library, so we have no way to check if they exist
+        parts.update(modded_parts)
+        missing.difference_update(modded_parts)
+
+    output["parts"] = parts
+    output["result"] = "unknown_asset" if missing else "ok"
+    return output
+
+
+def iter_codes(files: list[IO[str]]) -> Iterator[str]:
+    """
+    Iterates through all codes in the given files, one per line.
+
+    Args:
+        files: The files to read.
+    Yields:
+        Each non-empty line, stripped.
+    """
+    for file in files:
+        for line in file:
+            if stripped := line.strip():
+                yield stripped
+
+
+def write_text(info: dict[str, Any], out: IO[str]) -> None:
+    """
+    Writes a decoded code in a human readable format.
+
+    Args:
+        info: The decoded code info.
+        out: The stream to write to.
+    """
+    out.write(info["code"] + "\n")
+    if info["result"] in {"no_match", "malformed_code"}:
+        out.write(f"    {info['result']}\n\n")
+        return
+
+    kind = "Weapon" if info["is_weapon"] else "Item"
+    modded = f", modded v{info['modded_version']}" if info["modded"] else ""
+    out.write(f"    {kind}, set {info['set_id']}{modded}\n")
+    for name, value in info["parts"].items():
+        out.write(f"    {name + ':':<31} {value}\n")
+    out.write("\n")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Decodes item codes into their parts, outside of the game.")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        type=FileType(encoding="utf8"),
+        help="Files containing item codes, one per line. Reads from stdin if not given.",
+    )
+    parser.add_argument(
+        "-l",
+        "--library",
+        required=True,
+        type=Path,
+        help="Path to the game's 'Asset Library Manager.json'.",
+    )
+    parser.add_argument(
+        "-z",
+        "--zdict",
+        default=Path(__file__).parent / "zdict",
+        type=Path,
+        help="Path to the modded code zlib dictionary. Defaults to the one next to this script.",
+    )
+    parser.add_argument(
+        "-j",
+        "--json",
+        action="store_true",
+        help="Output json lines instead of human readable text.",
+    )
+    args = parser.parse_args()
+
+    library = AssetLibrary.load(args.library)
+    compressor = ReplacementsCompressor(args.zdict.read_bytes())
+
+    results: Counter[str] = Counter()
+    start = time.perf_counter()
+    for code in iter_codes(args.files or [sys.stdin]):
+        info = inspect_code(code, library, compressor)
+        results[info["result"]] += 1
+
+        if args.json:
+            sys.stdout.write(json.dumps(info) + "\n")
+        else:
+            write_text(info, sys.stdout)
+    elapsed = time.perf_counter() - start
+
+    total = results.total()
+    summary = ", ".join(f"{count} {result}" for result, count in results.most_common())
+    rate = total / max(elapsed, 1e-9)
+    sys.stderr.write(f"Decoded {total} codes in {elapsed:.3f}s ({rate:,.0f}/s): {summary}\n")
@@ -0,0 +1,123 @@
+from typing import TYPE_CHECKING
+
+import unrealsdk
+from unrealsdk.unreal import UObject, WrappedStruct
+
+from .item_codes import UnpackResult
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+type ItemDefinitionData = WrappedStruct
+type WeaponDefinitionData = WrappedStruct
+type WillowInventory = UObject
+type WillowInventoryManager = UObject
+type WillowInventoryStorage = UObject
+type WillowPawn = UObject
+
+__all__: tuple[str, ...] = (
+    "iter_bank_items",
+    "iter_carried_items",
+    "iter_stash_items",
+    "spawn_in_backpack",
+)
+
+CREATE_WEAPON_FROM_DEF = unrealsdk.find_class("WillowWeapon").ClassDefaultObject.CreateWeaponFromDef
+CREATE_ITEM_FROM_DEF = unrealsdk.find_class("WillowItem").ClassDefaultObject.CreateItemFromDef
+
+
+def iter_carried_items(inv_manager: WillowInventoryManager) -> Iterator[WillowInventory]:
+    """
+    Iterates through all items the player is carrying, both equipped and in their backpack.
+
+    Args:
+        inv_manager: The player's inventory manager.
+    Yields:
+        Each item, equipped weapons first, then equipped items, then the backpack.
+    """
+    seen: set[WillowInventory] = set()
+
+    for item in (inv_manager.InventoryChain, inv_manager.ItemChain):
+        while item is not None:
+            if item not in seen:
+                seen.add(item)
+                yield item
+            item = item.Inventory
+
+    for item in inv_manager.Backpack:
+        if item is not None and item not in seen:
+            seen.add(item)
+            yield item
+
+
+def _iter_storage_items(storage: WillowInventoryStorage | None) -> Iterator[WillowInventory] | None:
+    if storage is None or not storage.ChestIsOpen:
+        return None
+    return (
+        chest_data.Inventory for chest_data in storage.TheChest if chest_data.Inventory is not None
+    )
+
+
+def iter_bank_items(inv_manager: WillowInventoryManager) -> Iterator[WillowInventory] | None:
+    """
+    Iterates through all items in the player's bank.
+
+    The bank's items only exist as objects while it's open, so this only works while it is.
+
+    Args:
+        inv_manager: The player's inventory manager.
+    Returns:
+        An iterator over the items in the bank, or None if the bank isn't open.
+    """
+    return _iter_storage_items(inv_manager.TheBank)
+
+
+def iter_stash_items(inv_manager: WillowInventoryManager) -> Iterator[WillowInventory] | None:
+    """
+    Iterates through all items in the shared stash.
+
+    Like the bank, this only works while the stash is open.
+
+    Args:
+        inv_manager: The player's inventory manager.
+    Returns:
+        An iterator over the items in the stash, or None if the stash isn't open.
+    """
+    return _iter_storage_items(inv_manager.TheStash)
+
+
+def spawn_in_backpack(
+    owner: WillowPawn,
+    result: UnpackResult,
+    def_data: ItemDefinitionData | WeaponDefinitionData | None,
+) -> WillowInventory | None:
+    """
+    Spawns an item unpacked from an item code, and adds it to a player's backpack.
+
+    Args:
+        owner: The pawn to give the item to.
+        result: The result of unpacking the item code.
+        def_data: The unpacked definition data.
+    Returns:
+        The new item, or None if the code couldn't be unpacked.
+    """
+    match result:
+        case UnpackResult.FULL_WEAPON | UnpackResult.PARTIAL_WEAPON:
+            item = CREATE_WEAPON_FROM_DEF(
+                NewWeaponDef=def_data,
+                PlayerOwner=owner,
+                bForceSelectNameParts=True,
+            )
+        case UnpackResult.FULL_ITEM | UnpackResult.PARTIAL_ITEM:
+            item = CREATE_ITEM_FROM_DEF(
+                NewItemDef=def_data,
+                PlayerOwner=owner,
+                NewQuantity=1,
+                bForceSelectNameParts=True,
+            )
+        case _:
+            return None
+
+    owner.InvManager.AddInventoryToBackpack(item)
+    item.Owner = owner
+    return item